@@ -2,14 +2,152 @@
 from pathlib import Path
 import pickle
 
+import numpy as np
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 MODEL_PATH = BASE_DIR / "color_model.pkl"
+# flattened copy of MODEL_PATH written by train_model.py; served without sklearn
+FOREST_PATH = BASE_DIR / "color_model.npz"
 
-trained_model = None
-try:
+
+class FlatForest:
+    """
+    A fitted RandomForestRegressor flattened into contiguous node arrays.
+
+    Trees are concatenated with global child indices; leaves have
+    left == right == -1. predict() walks every tree at once with NumPy and
+    matches sklearn's RandomForestRegressor.predict().
+    """
+
+    FIELDS = ("feature", "threshold", "left", "right", "value", "roots")
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth):
+        self.feature = np.asarray(feature, dtype=np.int64)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.int64)
+        self.right = np.asarray(right, dtype=np.int64)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.int64)
+        self.max_depth = int(max_depth)
+        self.n_trees = len(self.roots)
+        # leaves point at themselves so the walk can step every tree in
+        # lockstep; children[2 * node + went_right] is the next node
+        is_leaf = self.left == -1
+        own = np.arange(len(self.left))
+        self._children = np.column_stack([
+            np.where(is_leaf, own, self.left),
+            np.where(is_leaf, own, self.right),
+        ]).ravel()
+
+    @classmethod
+    def from_sklearn(cls, model):
+        feature, threshold, left, right, value, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for est in model.estimators_:
+            tree = est.tree_
+            roots.append(offset)
+            is_leaf = tree.children_left == -1
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            left.append(np.where(is_leaf, -1, tree.children_left + offset))
+            right.append(np.where(is_leaf, -1, tree.children_right + offset))
+            value.append(tree.value[:, 0, 0])
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+        return cls(
+            np.concatenate(feature), np.concatenate(threshold),
+            np.concatenate(left), np.concatenate(right),
+            np.concatenate(value), roots, max_depth,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(*(data[name] for name in cls.FIELDS), data["max_depth"])
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            feature=self.feature.astype(np.int32),
+            threshold=self.threshold,
+            left=self.left.astype(np.int32),
+            right=self.right.astype(np.int32),
+            value=self.value,
+            roots=self.roots.astype(np.int32),
+            max_depth=np.int32(self.max_depth),
+        )
+
+    def predict(self, X, chunk: int = 1024):
+        """Average of every tree's leaf value for each row of X (N, n_features)."""
+        # sklearn casts inputs to float32 and compares them to float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        out = np.empty(len(X))
+        for start in range(0, len(X), chunk):
+            block = X[start:start + chunk]
+            n = len(block)
+            # tree-major walk: position t * n + i is tree t on row i
+            columns = block.T.ravel()
+            row = np.tile(np.arange(n), self.n_trees)
+            node = np.repeat(self.roots, n)
+            for _ in range(self.max_depth):
+                went_right = ~(columns[self.feature[node] * n + row] <= self.threshold[node])
+                node = self._children[2 * node + went_right]
+            leaf_values = self.value[node].reshape(self.n_trees, n)
+            # accumulate tree by tree like sklearn so the float sums agree
+            total = np.zeros(n)
+            for values in leaf_values:
+                total += values
+            out[start:start + n] = total / self.n_trees
+        return out
+
+    def upper_bound(self, lo, hi):
+        """
+        Upper bound on predict() for every row of feature boxes.
+
+        lo/hi are (N, n_features) arrays of per-feature lower/upper limits.
+        Each tree is walked down every branch the box can reach and its
+        largest reachable leaf is kept, so no input inside the box can
+        predict more than the returned value.
+        """
+        lo = np.asarray(lo, dtype=np.float32)
+        hi = np.asarray(hi, dtype=np.float32)
+        n_rows = len(lo)
+
+        best = np.full((n_rows, self.n_trees), -np.inf)
+        row = np.repeat(np.arange(n_rows), self.n_trees)
+        tree = np.tile(np.arange(self.n_trees), n_rows)
+        node = self.roots[tree]
+        while len(node):
+            leaf = self.left[node] == -1
+            np.maximum.at(best, (row[leaf], tree[leaf]), self.value[node[leaf]])
+            row, tree, node = row[~leaf], tree[~leaf], node[~leaf]
+            feat = self.feature[node]
+            thr = self.threshold[node]
+            go_left = lo[row, feat] <= thr
+            go_right = hi[row, feat] > thr
+            row = np.concatenate([row[go_left], row[go_right]])
+            tree = np.concatenate([tree[go_left], tree[go_right]])
+            node = np.concatenate([self.left[node[go_left]], self.right[node[go_right]]])
+        return best.sum(axis=1) / self.n_trees
+
+
+def load_model():
+    """Load the flat forest, falling back to flattening the sklearn pickle."""
+    if FOREST_PATH.exists():
+        model = FlatForest.load(FOREST_PATH)
+        print(f"✅ Loaded trained model from {FOREST_PATH}")
+        return model
     with open(MODEL_PATH, "rb") as f:
-        trained_model = pickle.load(f)
+        model = FlatForest.from_sklearn(pickle.load(f))
     print(f"✅ Loaded trained model from {MODEL_PATH}")
+    print(f"   Run `python train_model.py --export` to write {FOREST_PATH.name} and skip sklearn at startup")
+    return model
+
+
+trained_model = None
+try:
+    trained_model = load_model()
 except Exception as e:
     print(f"⚠️ No trained model found at {MODEL_PATH}. Will use placeholder scoring.")
     print(f"Model load error: {e}")
@@ -111,21 +249,123 @@ def extract_features(hsvs: list[str]) -> list[float]:
     ]
 
 
+# hue-distance pairs in the order extract_features() computes them
+# (columns are top=0, bottom=1, outer=2, shoes=3)
+_HUE_PAIRS = ((0, 1), (0, 3), (1, 3), (0, 2), (1, 2), (3, 2))
+# saturation/value are summed as top, bottom, shoes, outer like extract_features()
+_SCORED_ORDER = [0, 1, 3, 2]
+
+
+def parse_hsv_rows(rows):
+    """
+    Parse [top, bottom, outer, shoes] HSV string rows into the arrays
+    score_outfits_ml_batch() takes.
+
+    Returns (hsv_matrix, missing): an (N, 4, 3) float array with zeros for
+    unparseable/missing pieces and an (N, 4) bool mask marking them.
+    """
+    hsv_matrix = np.zeros((len(rows), 4, 3))
+    missing = np.ones((len(rows), 4), dtype=bool)
+    for i, hsvs in enumerate(rows):
+        for j, hsv_str in enumerate(hsvs):
+            if not hsv_str:
+                continue
+            try:
+                parts = hsv_str.split(",")
+                hsv_matrix[i, j] = (float(parts[0]), float(parts[1]), float(parts[2]))
+                missing[i, j] = False
+            except (ValueError, IndexError):
+                pass
+    return hsv_matrix, missing
+
+
+def extract_features_batch(hsv_matrix, missing=None):
+    """
+    Vectorised extract_features() for many outfits at once.
+
+    Args:
+        hsv_matrix: (N, 4, 3) array of H, S, V per piece in
+            top/bottom/outer/shoes order
+        missing: optional (N, 4) bool mask of pieces with no HSV; those are
+            scored as black like extract_features() does
+
+    Returns:
+        (N, 6) float array, one row of model features per outfit
+    """
+    hsv = np.asarray(hsv_matrix, dtype=float)
+    if missing is None:
+        missing = np.zeros(hsv.shape[:2], dtype=bool)
+    hsv = np.where(missing[:, :, None], 0.0, hsv)
+
+    hue = hsv[:, :, 0]
+    dist = np.abs(hue[:, [i for i, _ in _HUE_PAIRS]] - hue[:, [j for _, j in _HUE_PAIRS]])
+    dist = np.minimum(dist, 360 - dist)
+
+    sat = hsv[:, _SCORED_ORDER, 1]
+    val = hsv[:, _SCORED_ORDER, 2]
+    # top/bottom/shoes always count (missing ones as black), outer only if present
+    counted = np.ones(sat.shape, dtype=bool)
+    counted[:, 3] = ~missing[:, 2]
+
+    avg_saturation = np.where(counted, sat, 0.0).sum(axis=1) / counted.sum(axis=1)
+    high_sat_count = (counted & (sat >= 60)).sum(axis=1)
+    neutral_count = (counted & (sat < 20)).sum(axis=1)
+    has_light = (counted & (val > 70)).any(axis=1)
+    has_dark = (counted & (val < 30)).any(axis=1)
+
+    return np.column_stack([
+        dist.sum(axis=1) / dist.shape[1],
+        dist.max(axis=1),
+        avg_saturation,
+        high_sat_count,
+        neutral_count,
+        (has_light & has_dark).astype(float),
+    ])
+
+
+def score_features_ml_batch(X):
+    """
+    Run the model once over an (N, 6) feature matrix.
+
+    Returns raw predictions, or None when no model is loaded.
+    """
+    if trained_model is None:
+        return None
+    return trained_model.predict(np.asarray(X, dtype=float).reshape(-1, 6))
+
+
+def score_outfits_ml_batch(hsv_matrix, missing=None):
+    """
+    Score many outfits with a single model call.
+
+    Args:
+        hsv_matrix: (N, 4, 3) array of H, S, V per piece (top, bottom, outer, shoes)
+        missing: optional (N, 4) bool mask of pieces with no HSV
+
+    Returns:
+        (N,) array of scores clamped to 0-10 and rounded to one decimal,
+        or 5.0 everywhere when no model is loaded
+    """
+    X = extract_features_batch(hsv_matrix, missing)
+    if trained_model is None:
+        return np.full(len(X), 5.0)
+    # outfits built from the same colours share a feature row — predict each once
+    uniq, inverse = np.unique(X, axis=0, return_inverse=True)
+    preds = score_features_ml_batch(uniq)
+    return np.round(np.clip(preds, 0.0, 10.0), 1)[inverse.ravel()]
+
+
 def score_outfit_ml(colors: list[str], hsvs: list[str], verbose: bool = True) -> float:
     """Score an outfit using ML model based on color harmony features."""
-    features = extract_features(hsvs)
-    
+    hsv_matrix, missing = parse_hsv_rows([hsvs])
+
     # Use trained model if available, otherwise return placeholder
     if trained_model is not None:
-        import warnings
-        # Suppress the feature names warning since we're passing features in correct order
-        with warnings.catch_warnings():
-            warnings.filterwarnings("ignore", message="X does not have valid feature names")
-            score = trained_model.predict([features])[0]  # Model returns array, get first element
-        score = round(max(0.0, min(score, 10.0)), 1)  # Clamp to 0-10 range
-        
+        score = float(score_outfits_ml_batch(hsv_matrix, missing)[0])
+
         # Print detailed prediction info only if verbose
         if verbose:
+            features = extract_features_batch(hsv_matrix, missing)[0]
             print("\n" + "="*60)
             print(" ML MODEL PREDICTION")
             print("="*60)
@@ -140,7 +380,7 @@ def score_outfit_ml(colors: list[str], hsvs: list[str], verbose: bool = True) ->
             print(f"  • has_contrast     : {int(features[5])}  (light+dark pair present)")
             print(f"\n FINAL SCORE: {score}/10")
             print("="*60 + "\n")
-        
+
         return score
     else:
         if verbose:
@@ -148,6 +388,16 @@ def score_outfit_ml(colors: list[str], hsvs: list[str], verbose: bool = True) ->
         return 5.0  # Neutral score until model is trained
 
 
+def forest_upper_bound(lo, hi):
+    """
+    Upper bound on the model prediction for every row of (N, 6) feature
+    boxes, see FlatForest.upper_bound(). Returns None when no model is loaded.
+    """
+    if trained_model is None:
+        return None
+    return trained_model.upper_bound(lo, hi)
+
+
 # Global list to collect training examples in memory
 _training_batch = []
 
@@ -1,15 +1,18 @@
 import os
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from .db import get_session
-from . import crud
+from .db import get_async_session, get_session
+from . import crud, crud_async
+from .models import User
+from .services.principal_cache import cached_principal, store_principal
 
 SECRET_KEY = os.getenv("SECRET_KEY", "change-this-secret-key-in-production")
 ALGORITHM = "HS256"
@@ -27,24 +30,63 @@ def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
 
-def create_access_token(user_id: int) -> str:
+def create_access_token(user_id: int, token_version: int = 0) -> str:
     expire = datetime.utcnow() + timedelta(days=ACCESS_TOKEN_EXPIRE_DAYS)
-    payload = {"sub": str(user_id), "exp": expire}
+    payload = {"sub": str(user_id), "ver": token_version, "exp": expire}
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
-    session: Session = Depends(get_session),
-):
+def _token_claims(credentials: Optional[HTTPAuthorizationCredentials]) -> Tuple[int, int]:
+    """(user id, token version) from a valid bearer token; tokens from before versioning count as 0."""
     if not credentials:
         raise HTTPException(status_code=401, detail="Not authenticated")
     try:
         payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = int(payload["sub"])
-    except (JWTError, ValueError, KeyError):
+        return int(payload["sub"]), int(payload.get("ver", 0))
+    except (JWTError, ValueError, KeyError, TypeError):
         raise HTTPException(status_code=401, detail="Invalid or expired token")
-    user = crud.get_user(session, user_id)
+
+
+def _authorize(request: Request, user: Optional[User], token_version: int) -> User:
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
+    if user.token_version != token_version:
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    request.state.user = user
     return user
+
+
+def get_current_user(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+    session: Session = Depends(get_session),
+):
+    """
+    The token's user, from the principal cache when possible. The returned
+    User is detached and shared between requests (also set on
+    request.state.user): read it, but load a fresh copy to modify it.
+    """
+    user_id, token_version = _token_claims(credentials)
+    user, generation = cached_principal(user_id)
+    if user is None:
+        user = crud.get_user(session, user_id)
+        if user is not None:
+            session.expunge(user)
+            store_principal(user, generation)
+    return _authorize(request, user, token_version)
+
+
+async def get_current_user_async(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """get_current_user() for async handlers; shares the request's AsyncSession."""
+    user_id, token_version = _token_claims(credentials)
+    user, generation = cached_principal(user_id)
+    if user is None:
+        user = await crud_async.get_user(session, user_id)
+        if user is not None:
+            session.expunge(user)
+            store_principal(user, generation)
+    return _authorize(request, user, token_version)
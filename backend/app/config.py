@@ -21,5 +21,44 @@ class Settings:
     def __init__(self):
         self.openai_api_key = os.getenv("OPENAI_API_KEY", "")
         self.auto_classify_on_upload = os.getenv("AUTO_CLASSIFY_ON_UPLOAD", "false").lower() == "true"
+        # background classification workers (each runs one vision call at a time)
+        self.classify_concurrency = int(os.getenv("CLASSIFY_CONCURRENCY", "2") or 2)
+        # classify-batch: parallel vision calls, provider calls per second, retries per item
+        self.classify_batch_concurrency = int(os.getenv("CLASSIFY_BATCH_CONCURRENCY", "8") or 8)
+        self.classify_rate_limit = float(os.getenv("CLASSIFY_RATE_LIMIT", "5") or 5)
+        self.classify_max_retries = int(os.getenv("CLASSIFY_MAX_RETRIES", "3") or 3)
+        # 0 = off; 4 covers every 2-4 colour palette (~46k entries, <1s to build)
+        self.rule_score_lut_max_colors = int(os.getenv("RULE_SCORE_LUT_MAX_COLORS", "0") or 0)
+        # uploads larger than this are rejected with 413
+        self.max_upload_bytes = int(float(os.getenv("MAX_UPLOAD_MB", "20") or 20) * (1 << 20))
+        # limit for a whole .zip sent to the bulk upload endpoint
+        self.max_bulk_upload_bytes = int(float(os.getenv("MAX_BULK_UPLOAD_MB", "500") or 500) * (1 << 20))
+        # vision providers tried in order until one answers (see vision.PROVIDERS)
+        self.vision_providers = os.getenv("VISION_PROVIDERS", "openai,local")
+        self.openai_timeout = float(os.getenv("VISION_OPENAI_TIMEOUT", "20") or 20)
+        self.openai_concurrency = int(os.getenv("VISION_OPENAI_CONCURRENCY", "4") or 4)
+        # images sent to the vision provider are downscaled to this longest edge (px)
+        self.vision_max_edge = int(os.getenv("VISION_MAX_EDGE", "1024") or 1024)
+        self.vision_jpeg_quality = int(os.getenv("VISION_JPEG_QUALITY", "85") or 85)
+        # WEBP thumbnail widths (px) served at /thumbs for grids and outfit cards
+        self.thumbnail_widths = sorted(
+            int(w) for w in (os.getenv("THUMBNAIL_WIDTHS", "160,320,640") or "160,320,640").split(",") if w.strip()
+        )
+        self.thumbnail_quality = int(os.getenv("THUMBNAIL_QUALITY", "80") or 80)
+        # SQLite connection pragmas (see db_config.py); WAL makes commits cheaper and lets readers run alongside a writer
+        self.sqlite_journal_mode = os.getenv("SQLITE_JOURNAL_MODE", "WAL") or "WAL"
+        self.sqlite_synchronous = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL") or "NORMAL"
+        self.sqlite_busy_timeout_ms = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000") or 5000)
+        self.sqlite_cache_size_mb = int(os.getenv("SQLITE_CACHE_SIZE_MB", "64") or 64)
+        self.sqlite_mmap_size_mb = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256") or 256)
+        # connection pool; the default covers request threads plus both classification worker pools
+        self.db_pool_size = int(
+            os.getenv("DB_POOL_SIZE", "")
+            or 8 + self.classify_concurrency + self.classify_batch_concurrency
+        )
+        self.db_max_overflow = int(os.getenv("DB_MAX_OVERFLOW", "10") or 10)
+        self.db_pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", "30") or 30)
+        # Postgres only: reopen connections older than this (s), before a server or proxy idle timeout
+        self.db_pool_recycle = int(os.getenv("DB_POOL_RECYCLE", "1800") or 1800)
 
 settings = Settings()
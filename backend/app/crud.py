@@ -1,13 +1,25 @@
 import os
+from datetime import datetime
 from pathlib import Path
 from typing import Iterable, Optional, List
-import uuid
 
 from sqlmodel import Session, select
 
-from .models import User, Item, Outfit, Feedback
+from .db_config import dialect_insert
+from .enums import OutfitPart
+from .models import User, Item, Outfit, Feedback, ClassificationJob
+from .services.blob_store import release_blob, remove_released, store_blob
+from .services.item_features import refresh_color_features
+from .services.principal_cache import invalidate_principal
+from .services.wardrobe_cache import invalidate_wardrobe
 
 STORAGE_ROOT = Path(os.getenv("STORAGE_ROOT", "/data/storage"))
+# classification_status values written by _apply_classification(): answered
+# by the primary vision provider, or only guessed by a fallback provider
+# (still worth reclassifying)
+CLASSIFIED = "done"
+CLASSIFIED_FALLBACK = "fallback"
+OUTFIT_PARTS = {p.value for p in OutfitPart}
 
 
 def create_user(
@@ -79,6 +91,18 @@ def update_user(
     session.add(user)
     session.commit()
     session.refresh(user)
+    invalidate_principal(user.id)
+    return user
+
+
+def change_password(session: Session, user: User, hashed_password: str) -> User:
+    """Store a new password hash and bump token_version, revoking older tokens."""
+    user.hashed_password = hashed_password
+    user.token_version = (user.token_version or 0) + 1
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    invalidate_principal(user.id)
     return user
 
 
@@ -87,27 +111,65 @@ def create_item_with_file(
     session: Session,
     user_id: int,
     filename: str,
-    content: bytes,
+    temp_path: Path,
     content_hash: str,
 ) -> Item:
-    user_dir = STORAGE_ROOT / str(user_id)
-    user_dir.mkdir(parents=True, exist_ok=True)
-    ext = (Path(filename).suffix or ".jpg").lower()
-    rel = Path(str(user_id)) / f"{uuid.uuid4().hex}{ext}"
-    abs_path = STORAGE_ROOT / rel
-    abs_path.write_bytes(content)
-
-    item = Item(
-        user_id=user_id,
-        image_url=str(rel).replace("\\", "/"),
-        original_filename=filename,
-        content_hash=content_hash,
-    )
-    session.add(item)
-    session.commit()
+    """Move an uploaded temp file (services/upload_stream.py) into the blob store and add its item."""
+    rel, created = store_blob(session, STORAGE_ROOT, temp_path, content_hash, filename)
+    try:
+        item = Item(
+            user_id=user_id,
+            image_url=rel,
+            original_filename=filename,
+            content_hash=content_hash,
+        )
+        session.add(item)
+        session.commit()
+    except Exception:
+        session.rollback()
+        if created:
+            (STORAGE_ROOT / rel).unlink(missing_ok=True)
+        raise
+    invalidate_wardrobe(user_id)
     session.refresh(item)
     return item
 
+def create_items_with_files(session: Session, user_id: int, entries: List[dict]) -> List[Item]:
+    """
+    create_item_with_file() for many uploads in one transaction. Each entry
+    has "filename", "tmp" (temp path), "hash" and optionally "colors"
+    (services/color_analysis.py output).
+    """
+    if not entries:
+        return []
+    items, created = [], []
+    try:
+        for entry in entries:
+            rel, new_file = store_blob(session, STORAGE_ROOT, entry["tmp"], entry["hash"], entry["filename"])
+            if new_file:
+                created.append(STORAGE_ROOT / rel)
+            item = Item(
+                user_id=user_id,
+                image_url=rel,
+                original_filename=entry["filename"],
+                content_hash=entry["hash"],
+            )
+            if entry.get("colors"):
+                _apply_colors(item, entry["colors"])
+            session.add(item)
+            items.append(item)
+        session.commit()
+    except Exception:
+        session.rollback()
+        for path in created:
+            path.unlink(missing_ok=True)
+        raise
+    invalidate_wardrobe(user_id)
+    for item in items:
+        session.refresh(item)
+    return items
+
+
 def find_item_by_hash(
     session: Session,
     user_id: int,
@@ -121,6 +183,22 @@ def find_item_by_hash(
   return session.exec(stmt).first()
 
 
+def find_items_by_hashes(session: Session, user_id: int, hashes: Iterable[str]) -> dict:
+    """{content_hash: item id} for the user's items with any of ``hashes`` (one query)."""
+    hashes = list(hashes)
+    if not hashes:
+        return {}
+    rows = session.exec(
+        select(Item.content_hash, Item.id)
+        .where(Item.user_id == user_id, Item.content_hash.in_(hashes))
+        .order_by(Item.id)
+    ).all()
+    found = {}
+    for content_hash, item_id in rows:
+        found.setdefault(content_hash, item_id)
+    return found
+
+
 def list_items_for_user(session: Session, user_id: int) -> List[Item]:
     stmt = (
         select(Item)
@@ -138,31 +216,50 @@ def update_item(session: Session, item: Item, **fields) -> Item:
     for k, v in fields.items():
         if v is not None:
             setattr(item, k, v)
+    refresh_color_features(item)
     session.add(item)
     session.commit()
+    invalidate_wardrobe(item.user_id)
     session.refresh(item)
     return item
 
 
 def delete_item(session: Session, item: Item) -> None:
-    file_path = STORAGE_ROOT / item.image_url
-    try:
-        file_path.unlink(missing_ok=True)
-    except Exception:
-        pass
-
+    # shared blobs (services/blob_store.py) go only with their last item
+    released = release_blob(session, STORAGE_ROOT, item.content_hash)
+    if not item.image_url.startswith("blobs/"):
+        try:
+            (STORAGE_ROOT / item.image_url).unlink(missing_ok=True)
+        except Exception:
+            pass
+
+    for job in session.exec(select(ClassificationJob).where(ClassificationJob.item_id == item.id)).all():
+        session.delete(job)
+    user_id = item.user_id
     session.delete(item)
     session.commit()
+    remove_released(session, [released])
+    invalidate_wardrobe(user_id)
 
 
 # --- helper for classification updates ---
-def update_item_classification(session: Session, item_id: int, data: dict) -> Item:
-    """Map vision output to DB columns + normalize enums."""
-    item = session.get(Item, item_id)
-    if not item:
-        raise ValueError("item not found")
-
-    if data.get("outfit_part"):
+def is_fallback_prediction(data: dict) -> bool:
+    from .vision import PROVIDER  # vision imports crud (via image_prep)
+    return data.get("provider", PROVIDER) != PROVIDER
+
+
+def _apply_classification(item: Item, data: dict) -> None:
+    """
+    Map vision output to DB columns + normalize enums (no commit). A
+    fallback provider's prediction is stored with status "fallback" and
+    never replaces an earlier primary-provider result.
+    """
+    fallback = is_fallback_prediction(data)
+    if fallback and item.classification_status == CLASSIFIED:
+        return
+
+    # vision answers "other" when unsure; that's not a column value
+    if data.get("outfit_part") in OUTFIT_PARTS:
         item.outfit_part = data["outfit_part"]
 
     # direct
@@ -196,12 +293,76 @@ def update_item_classification(session: Session, item_id: int, data: dict) -> It
         f = f.replace("-", "_").replace(" ", "_")  # business casual → business_casual
         item.formality = f
 
+    item.classification_status = CLASSIFIED_FALLBACK if fallback else CLASSIFIED
+    refresh_color_features(item)
+
+
+def update_item_classification(session: Session, item_id: int, data: dict) -> Item:
+    """Store one vision prediction on an item."""
+    item = session.get(Item, item_id)
+    if not item:
+        raise ValueError("item not found")
+    _apply_classification(item, data)
+    session.add(item)
+    session.commit()
+    invalidate_wardrobe(item.user_id)
+    session.refresh(item)
+    return item
+
+
+def apply_classifications(session: Session, results: dict, failed: Iterable[int] = ()) -> None:
+    """
+    Store many predictions ({item_id: prediction}) in one transaction and
+    mark the ``failed`` item ids as such. Missing items are skipped.
+    """
+    user_ids = set()
+    for item_id, data in results.items():
+        item = session.get(Item, item_id)
+        if item is None:
+            continue
+        _apply_classification(item, data)
+        session.add(item)
+        user_ids.add(item.user_id)
+    for item_id in failed:
+        item = session.get(Item, item_id)
+        if item is not None:
+            item.classification_status = "failed"
+            session.add(item)
+    session.commit()
+    for user_id in user_ids:
+        invalidate_wardrobe(user_id)
+
+
+def _apply_colors(item: Item, colors: dict) -> None:
+    item.primary_color = colors["color"]
+    item.primary_color_hex = colors["color_hex"]
+    item.primary_color_hsv = colors["color_hsv"]
+    item.secondary_color = colors.get("secondary_color") or None
+    refresh_color_features(item)
+
+
+def update_item_colors(session: Session, item: Item, colors: dict) -> Item:
+    """Store measured colours (services/color_analysis.py output) on an item."""
+    _apply_colors(item, colors)
     session.add(item)
     session.commit()
+    invalidate_wardrobe(item.user_id)
     session.refresh(item)
     return item
 
 
+def update_items_colors(session: Session, colors_by_item: List[tuple]) -> None:
+    """update_item_colors() for many (item, colors) pairs in one transaction."""
+    user_ids = set()
+    for item, colors in colors_by_item:
+        _apply_colors(item, colors)
+        session.add(item)
+        user_ids.add(item.user_id)
+    session.commit()
+    for user_id in user_ids:
+        invalidate_wardrobe(user_id)
+
+
 # ---------- User helpers ----------
 
 def update_user(session: Session, user: User, **kwargs) -> User:
@@ -212,6 +373,7 @@ def update_user(session: Session, user: User, **kwargs) -> User:
     session.add(user)
     session.commit()
     session.refresh(user)
+    invalidate_principal(user.id)
     return user
 
 
@@ -232,8 +394,11 @@ def delete_user(session: Session, user: User) -> None:
     for item in items:
         delete_item(session, item)
 
+    user_id = user.id
     session.delete(user)
     session.commit()
+    invalidate_wardrobe(user_id)
+    invalidate_principal(user_id)
 
 
 # ---------- Optional: explicit file + item creation helpers ----------
@@ -328,6 +493,28 @@ def delete_outfit(session: Session, outfit: Outfit) -> None:
     session.commit()
 
 
+# ---------- Liked / disliked combos ----------
+
+def add_combo(session: Session, model, user_id: int, color_fingerprint: str) -> Optional[int]:
+    """
+    Record a liked/disliked colour combo (``model`` is LikedOutfit or
+    DislikedOutfit) and commit. A single INSERT ... ON CONFLICT DO NOTHING on
+    the unique user/fingerprint index, so concurrent requests can't race;
+    returns the new row id, or None if the user already had it.
+    """
+    insert = dialect_insert(session.get_bind())
+    stmt = (
+        insert(model)
+        .values(user_id=user_id, color_fingerprint=color_fingerprint, created_at=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=["user_id", "color_fingerprint"])
+        .returning(model.id)
+    )
+    new_id = session.exec(stmt).scalar()
+    session.commit()
+    return new_id
+
+
+
 # ---------- Feedback CRUD ----------
 
 def create_feedback(
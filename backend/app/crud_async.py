@@ -0,0 +1,65 @@
+"""
+Async counterparts of the crud functions used by the hot request handlers
+(outfit suggest and score, item list and upload), for an AsyncSession from
+db.get_async_session().
+
+Reads are native async queries. Writes that share logic with the sync path
+(blob store, colour features, classification queue) run the sync crud
+function through AsyncSession.run_sync, which drives the same ORM code on
+the event loop without a worker thread, so each write has one
+implementation.
+"""
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from . import crud
+from .models import Item, OutfitHistory, User
+
+
+async def get_user(session: AsyncSession, user_id: int) -> Optional[User]:
+    return await session.get(User, user_id)
+
+
+async def get_item(session: AsyncSession, item_id: int) -> Optional[Item]:
+    return await session.get(Item, item_id)
+
+
+async def get_items(session: AsyncSession, item_ids: Iterable[int]) -> Dict[int, Item]:
+    """Items by id in one query; missing ids are simply absent."""
+    ids = {i for i in item_ids if i}
+    if not ids:
+        return {}
+    rows = (await session.exec(select(Item).where(Item.id.in_(ids)))).all()
+    return {item.id: item for item in rows}
+
+
+async def list_items_for_user(session: AsyncSession, user_id: int) -> List[Item]:
+    stmt = select(Item).where(Item.user_id == user_id).order_by(Item.id.desc())
+    return (await session.exec(stmt)).all()
+
+
+async def find_item_by_hash(session: AsyncSession, user_id: int, content_hash: str) -> Optional[Item]:
+    stmt = select(Item).where(Item.user_id == user_id, Item.content_hash == content_hash).limit(1)
+    return (await session.exec(stmt)).first()
+
+
+async def create_item_with_file(
+    session: AsyncSession, user_id: int, filename: str, temp_path: Path, content_hash: str,
+) -> Item:
+    return await session.run_sync(crud.create_item_with_file, user_id, filename, temp_path, content_hash)
+
+
+async def update_item_colors(session: AsyncSession, item: Item, colors: dict) -> Item:
+    return await session.run_sync(crud.update_item_colors, item, colors)
+
+
+async def add_outfit_history(session: AsyncSession, history: OutfitHistory) -> OutfitHistory:
+    """Insert ``history`` and return it detached and fully loaded (no refresh query)."""
+    session.add(history)
+    await session.flush()
+    session.expunge(history)
+    await session.commit()
+    return history
@@ -1,13 +1,32 @@
-from sqlmodel import SQLModel, create_engine, Session
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 import os
 
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:////data/outfitmaker.sqlite")
+from .db_config import async_url, engine_options, install_sqlite_pragmas, is_sqlite, normalize_url
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# SQLite file by default; a postgresql:// URL for multi-worker deployments (see db_config.py)
+DATABASE_URL = normalize_url(os.getenv("DATABASE_URL", "sqlite:////data/outfitmaker.sqlite"))
+# the hot request handlers use this engine; defaults to DATABASE_URL through its async driver
+ASYNC_DATABASE_URL = normalize_url(os.getenv("ASYNC_DATABASE_URL", "")) or async_url(DATABASE_URL)
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL))
+if is_sqlite(DATABASE_URL):
+    install_sqlite_pragmas(engine)
+if is_sqlite(ASYNC_DATABASE_URL):
+    install_sqlite_pragmas(async_engine.sync_engine)
 
 def init_db() -> None:
-    SQLModel.metadata.create_all(engine)
+    """Create or upgrade the schema (see migrations.py)."""
+    from .migrations import run_migrations
+    run_migrations(engine)
 
 def get_session():
     with Session(engine) as session:
-        yield session
\ No newline at end of file
+        yield session
+
+async def get_async_session():
+    # no expiry on commit: lazy reloads can't happen outside the async context
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
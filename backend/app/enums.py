@@ -1,4 +1,5 @@
 from enum import Enum
+from typing import Optional
 
 class Season(str, Enum):
     spring = "spring"
@@ -57,3 +58,15 @@ class Category(str, Enum):
     bag = "bag"
     jewelry = "jewelry"
     watch = "watch"
+
+
+FORMALITY_ORDER = ["casual", "smart_casual", "polished"]
+
+
+def formality_rank(val: Optional[str]) -> int:
+    if not val:
+        return 0
+    try:
+        return FORMALITY_ORDER.index(val)
+    except ValueError:
+        return 0
@@ -1,24 +1,47 @@
 import random
-import requests
-import hashlib
-from datetime import date, datetime
-from fastapi import FastAPI, Depends, UploadFile, File, HTTPException
+from datetime import date, datetime, timedelta
+from fastapi import FastAPI, Depends, UploadFile, File, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 from sqlmodel import Session, select
 from typing import List, Optional
 from pathlib import Path
 
-from .db import init_db, get_session
-from .schemas import UserCreate, UserRead, UserUpdate, ItemRead, ItemUpdate, SignupRequest, LoginRequest, TokenResponse
-from . import crud
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .db import init_db, get_async_session, get_session
+from .db_config import database_info
+from .schemas import UserCreate, UserRead, UserUpdate, ItemRead, ItemUpdate, SignupRequest, LoginRequest, PasswordChangeRequest, TokenResponse, ClassifyBatchRequest
+from . import crud, crud_async
 from .config import settings
-from .vision import classify_image
-from .aimodel import score_outfit_ml
-from .models import User, OutfitHistory, LikedOutfit, DislikedOutfit
+from .models import Blob, User, OutfitHistory, LikedOutfit, DislikedOutfit
 from .services.gap_recommendations import compute_gap_recommendations
-from .aimodel import score_outfit_ml, extract_features, hue_distance, trained_model
-from .auth import hash_password, verify_password, create_access_token, get_current_user
+from .services.weather import cached_weather, get_weather, get_weather_range, weather_cache_info, FORECAST_HORIZON_DAYS
+from .vision import PROVIDER_CHAIN
+from .services.color_analysis import analyze_item_color
+from .services.blob_store import BLOB_DIRNAME, blob_store_info
+from .services.thumbnails import (
+    IMMUTABLE_CACHE_CONTROL, is_content_hash, make_thumbnails, remove_thumbnails, thumbnail_etag, thumbnail_path,
+    thumbnail_urls,
+)
+from .services.upload_stream import IMAGE_EXTENSIONS, UploadTooLarge, discard_upload, stream_upload
+from .services.bulk_upload import collect_uploads, store_uploads
+from .services.batch_classify import classify_batch, select_items
+from .services.classification_cache import classify_cached, classification_cache_info
+from .services.classification_queue import enqueue_classification, classification_progress, start_workers, stop_workers
+from .services.wardrobe_cache import get_wardrobe, invalidate_wardrobe, record_outfit_history, wardrobe_cache_info
+from .services.principal_cache import principal_cache_info
+from .services.color_rules import score_outfit_colors, build_rule_score_lut, rule_score_cache_info
+from .services.item_features import hsv_matrix
+from .services.outfit_search import OutfitSearch, BNB_MIN_COMBOS, outfit_color_fingerprint
+from .aimodel import (
+    score_outfit_ml, hue_distance,
+    extract_features_batch, score_outfits_ml_batch,
+)
+from .enums import formality_rank as _formality_rank
+from .auth import hash_password, verify_password, create_access_token, get_current_user, get_current_user_async
 from fastapi import Query
 
 import os
@@ -36,64 +59,54 @@ app.add_middleware(
 # serve uploaded images
 STORAGE_DIR = Path(os.getenv("STORAGE_ROOT", "/data/storage"))
 STORAGE_DIR.mkdir(parents=True, exist_ok=True)
-app.mount("/storage", StaticFiles(directory=str(STORAGE_DIR)), name="storage")
 
 
-def _migrate_formality_values() -> None:
-    """
-    One-time idempotent migration: normalize legacy formality values in the
-    Item table to the 3-level system (casual / smart_casual / polished).
-    Runs at startup before any ORM reads so SQLModel never sees removed enum
-    values.
-    """
-    from sqlalchemy import text
-    from .db import engine
-    with engine.begin() as conn:
-        conn.execute(text("UPDATE item SET formality = 'casual'      WHERE formality = 'sporty'"))
-        conn.execute(text("UPDATE item SET formality = 'smart_casual' WHERE formality = 'business_casual'"))
-        conn.execute(text("UPDATE item SET formality = 'polished'     WHERE formality IN ('semi_formal', 'formal')"))
-
-
-def _migrate_add_auth_columns() -> None:
-    """Add email and hashed_password columns to the user table if they don't exist."""
-    from sqlalchemy import text
-    from .db import engine
-    with engine.begin() as conn:
-        result = conn.execute(text("PRAGMA table_info(\"user\")"))
-        existing_cols = {row[1] for row in result.fetchall()}
+class StorageFiles(StaticFiles):
+    """Static /storage; blob paths are named by their content hash, so they never change."""
 
-        if "email" not in existing_cols:
-            conn.execute(text('ALTER TABLE "user" ADD COLUMN email TEXT'))
-            print("✓ Migration: added email column to user table")
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if f"/{BLOB_DIRNAME}/" in str(full_path).replace("\\", "/"):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
 
-        if "hashed_password" not in existing_cols:
-            conn.execute(text('ALTER TABLE "user" ADD COLUMN hashed_password TEXT'))
-            print("✓ Migration: added hashed_password column to user table")
 
-        # Unique index on email (partial — NULL emails don't conflict)
-        conn.execute(text(
-            'CREATE UNIQUE INDEX IF NOT EXISTS ix_user_email ON "user"(email) WHERE email IS NOT NULL'
-        ))
+app.mount("/storage", StorageFiles(directory=str(STORAGE_DIR)), name="storage")
 
 
 @app.on_event("startup")
 def on_startup():
     init_db()
-    _migrate_add_auth_columns()
-    _migrate_formality_values()
+    if settings.rule_score_lut_max_colors >= 2:
+        n = build_rule_score_lut(settings.rule_score_lut_max_colors)
+        print(f"✅ Precomputed {n} rule-based colour scores")
+
+
+@app.on_event("startup")
+async def start_classification_workers():
+    await start_workers(settings.classify_concurrency)
+
+
+@app.on_event("shutdown")
+async def stop_classification_workers():
+    await stop_workers()
 
 
 # ---- Auth ----
 
+def _check_password_rules(password: str) -> None:
+    if len(password) < 8:
+        raise HTTPException(400, "Password must be at least 8 characters")
+    if not any(c.isdigit() for c in password):
+        raise HTTPException(400, "Password must contain at least one number")
+
+
 @app.post("/auth/signup", response_model=TokenResponse)
 def signup(payload: SignupRequest, session: Session = Depends(get_session)):
     email = payload.email.lower().strip()
     if not email or "@" not in email:
         raise HTTPException(400, "Invalid email address")
-    if len(payload.password) < 8:
-        raise HTTPException(400, "Password must be at least 8 characters")
-    if not any(c.isdigit() for c in payload.password):
-        raise HTTPException(400, "Password must contain at least one number")
+    _check_password_rules(payload.password)
     if not payload.city.strip():
         raise HTTPException(400, "City is required")
     if crud.get_user_by_email(session, email):
@@ -112,7 +125,23 @@ def login(payload: LoginRequest, session: Session = Depends(get_session)):
         raise HTTPException(401, "Invalid email or password")
     if not verify_password(payload.password, user.hashed_password):
         raise HTTPException(401, "Invalid email or password")
-    token = create_access_token(user.id)
+    token = create_access_token(user.id, user.token_version)
+    return {"token": token, "user": user}
+
+
+@app.post("/auth/password", response_model=TokenResponse)
+def change_password(
+    payload: PasswordChangeRequest,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """Set a new password and revoke every token issued before it; returns a fresh token."""
+    user = crud.get_user(session, current_user.id)
+    if not user.hashed_password or not verify_password(payload.current_password, user.hashed_password):
+        raise HTTPException(401, "Current password is incorrect")
+    _check_password_rules(payload.new_password)
+    user = crud.change_password(session, user, hash_password(payload.new_password))
+    token = create_access_token(user.id, user.token_version)
     return {"token": token, "user": user}
 
 
@@ -128,18 +157,6 @@ def list_users(session: Session = Depends(get_session)):
     return crud.list_users(session)
 
 
-FORMALITY_ORDER = ["casual", "smart_casual", "polished"]
-
-
-def _formality_rank(val: Optional[str]) -> int:
-    if not val:
-        return 0
-    try:
-        return FORMALITY_ORDER.index(val)
-    except ValueError:
-        return 0
-
-
 @app.post("/users", response_model=UserRead)
 def create_user(payload: UserCreate, session: Session = Depends(get_session)):
     try:
@@ -177,25 +194,27 @@ async def upload_item(
     user_id: int,
     file: UploadFile = File(...),
     allow_duplicate: bool = Query(False),
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user_async),
 ):
     if current_user.id != user_id:
         raise HTTPException(403, "Access denied")
 
-    user = crud.get_user(session, user_id)
-    if not user:
-        raise HTTPException(404, "User not found")
 
     filename_lower = (file.filename or "").lower()
-    if not any(filename_lower.endswith(ext) for ext in (".jpg", ".jpeg", ".png", ".webp")):
+    if not filename_lower.endswith(IMAGE_EXTENSIONS):
         raise HTTPException(status_code=400, detail="Only JPG, PNG, or WEBP images are allowed")
 
-    content = await file.read()
-    content_hash = hashlib.sha256(content).hexdigest()
+    try:
+        tmp_path, content_hash, _ = await stream_upload(
+            file, crud.STORAGE_ROOT / str(user_id), settings.max_upload_bytes
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
 
-    existing = crud.find_item_by_hash(session, user_id, content_hash)
+    existing = await crud_async.find_item_by_hash(session, user_id, content_hash)
     if existing and not allow_duplicate:
+        discard_upload(tmp_path)
         raise HTTPException(
             status_code=409,
             detail={
@@ -205,7 +224,17 @@ async def upload_item(
             },
         )
 
-    item = crud.create_item_with_file(session, user_id, file.filename, content, content_hash)
+    try:
+        item = await crud_async.create_item_with_file(session, user_id, file.filename, tmp_path, content_hash)
+    except Exception:
+        discard_upload(tmp_path)
+        raise
+
+    # colour is measured locally (tens of ms), so even unclassified items can be scored
+    colors = await run_in_threadpool(analyze_item_color, str(crud.STORAGE_ROOT / item.image_url))
+    if colors:
+        item = await crud_async.update_item_colors(session, item, colors)
+    await run_in_threadpool(make_thumbnails, str(crud.STORAGE_ROOT / item.image_url), content_hash)
 
     print(
         "auto_classify_on_upload =",
@@ -215,28 +244,67 @@ async def upload_item(
     )
 
     if settings.auto_classify_on_upload:
-        try:
-            abs_path = (STORAGE_DIR / item.image_url).resolve()
-            pred = classify_image(str(abs_path))
-            print(pred)
-            item = crud.update_item_classification(session, item.id, pred)
-            print(f"✓ Item classified - Color: {pred.get('color', 'N/A')} | Hex: {pred.get('color_hex', 'N/A')} | HSV: {pred.get('color_hsv', 'N/A')}")
-            print(item)
-        except Exception as e:
-            print("auto-classify failed:", e)
+        # classified by a background worker; poll the item or /classification/status
+        job = await session.run_sync(enqueue_classification, item)
+        print(f"⏳ Item {item.id} queued for classification (job {job.id})")
 
     return item
 
 
-@app.get("/users/{user_id}/items", response_model=List[ItemRead])
-def list_items(
+@app.post("/users/{user_id}/items/bulk")
+async def upload_items_bulk(
     user_id: int,
+    files: List[UploadFile] = File(...),
+    allow_duplicate: bool = Query(False),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
+    """Upload many images (or .zip archives of images) at once; returns an outcome per file."""
     if current_user.id != user_id:
         raise HTTPException(403, "Access denied")
-    return crud.list_items_for_user(session, user_id)
+
+    entries = await collect_uploads(files, crud.STORAGE_ROOT / str(user_id))
+    # colour analysis + one DB transaction; keep it off the event loop
+    return await run_in_threadpool(store_uploads, session, user_id, entries, allow_duplicate)
+
+
+@app.get("/thumbs/{content_hash}/{width}.webp")
+async def get_thumbnail(
+    content_hash: str,
+    width: int,
+    request: Request,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """WEBP thumbnail of a stored image, made on first request and cached on disk."""
+    if width not in settings.thumbnail_widths:
+        raise HTTPException(status_code=404, detail="Unknown thumbnail width")
+    if not is_content_hash(content_hash):
+        raise HTTPException(status_code=404, detail="Image not found")
+    blob = await session.get(Blob, content_hash)
+    if blob is None:
+        remove_thumbnails(content_hash)
+        raise HTTPException(status_code=404, detail="Image not found")
+    headers = {"ETag": thumbnail_etag(content_hash, width), "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+
+    path = thumbnail_path(content_hash, width)
+    if not path.exists():
+        await run_in_threadpool(make_thumbnails, str(crud.STORAGE_ROOT / blob.path), content_hash, [width])
+        if not path.exists():
+            raise HTTPException(status_code=404, detail="Image could not be thumbnailed")
+    return FileResponse(path, media_type="image/webp", headers=headers)
+
+
+@app.get("/users/{user_id}/items", response_model=List[ItemRead])
+async def list_items(
+    user_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user_async),
+):
+    if current_user.id != user_id:
+        raise HTTPException(403, "Access denied")
+    return await crud_async.list_items_for_user(session, user_id)
 
 
 @app.patch("/items/{item_id}", response_model=ItemRead)
@@ -274,6 +342,8 @@ def delete_item(
 @app.post("/items/{item_id}/classify", response_model=ItemRead)
 def classify_item(
     item_id: int,
+    background: bool = Query(False),
+    refresh: bool = Query(False),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
@@ -289,9 +359,13 @@ def classify_item(
     if not abs_path.exists():
         raise HTTPException(status_code=404, detail="Image file missing")
 
+    if background:
+        enqueue_classification(session, item)
+        return item
+
     print("CLASSIFY → item:", item_id, "| path:", str(abs_path))
     try:
-        pred = classify_image(str(abs_path))
+        pred = classify_cached(str(abs_path), item.content_hash, refresh=refresh)
         print("CLASSIFY ← prediction:", pred)
         print(f"✓ Color values - Name: {pred.get('color', 'N/A')} | Hex: {pred.get('color_hex', 'N/A')} | HSV: {pred.get('color_hsv', 'N/A')}")
         updated = crud.update_item_classification(session, item_id, pred)
@@ -303,107 +377,34 @@ def classify_item(
         raise HTTPException(status_code=500, detail=f"classification failed: {e}")
 
 
-# ---- Weather API ----
-
-def _weather_condition_from_code(code: Optional[int]) -> str:
-    if code is None:
-        return "unknown"
-    if code in {0, 1}:
-        return "clear"
-    if code in {2, 3, 45, 48}:
-        return "cloudy"
-    if code in {51, 53, 55, 56, 57, 61, 63, 65, 66, 67, 80, 81, 82}:
-        return "rain"
-    if code in {71, 73, 75, 77, 85, 86}:
-        return "snow"
-    if code in {95, 96, 99}:
-        return "storm"
-    return "unknown"
-
-
-def get_weather(city: str, target_date: date) -> dict:
-    try:
-        geo_url = "https://geocoding-api.open-meteo.com/v1/search"
-        geo_resp = requests.get(
-            geo_url,
-            params={"name": city, "count": 1, "language": "en", "format": "json"},
-            timeout=5
-        )
-        geo_data = geo_resp.json()
-
-        if not geo_data.get("results"):
-            raise ValueError(f"City '{city}' not found")
-
-        lat = geo_data["results"][0]["latitude"]
-        lon = geo_data["results"][0]["longitude"]
-
-        weather_url = "https://api.open-meteo.com/v1/forecast"
-        weather_resp = requests.get(
-            weather_url,
-            params={
-                "latitude": lat,
-                "longitude": lon,
-                "daily": "temperature_2m_max,temperature_2m_min,weathercode",
-                "start_date": target_date.isoformat(),
-                "end_date": target_date.isoformat(),
-                "timezone": "auto"
-            },
-            timeout=5
-        )
-        weather_data = weather_resp.json()
-
-        daily = weather_data.get("daily", {})
-        if not daily or "time" not in daily:
-            raise ValueError("Invalid weather response")
-
-        idx = daily["time"].index(target_date.isoformat())
-        temp_max = daily["temperature_2m_max"][idx]
-        temp_min = daily["temperature_2m_min"][idx]
-        weather_codes = daily.get("weathercode") or daily.get("weather_code") or []
-        weather_code = weather_codes[idx] if idx < len(weather_codes) else None
-        weather_condition = _weather_condition_from_code(weather_code)
-
-        temp = temp_min * 0.7 + temp_max * 0.3
-
-        if temp < 5:
-            season = "winter"
-        elif temp < 12:
-            season = "fall"
-        elif temp < 20:
-            season = "spring"
-        else:
-            season = "summer"
-
-        return {
-            "temperature": round(temp, 1),
-            "temp_min": temp_min,
-            "temp_max": temp_max,
-            "season": season,
-            "city": city,
-            "condition": weather_condition,
-        }
+@app.post("/users/{user_id}/items/classify-batch")
+def classify_items_batch(
+    user_id: int,
+    payload: ClassifyBatchRequest,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """Classify many items in parallel (bounded, rate-limited) and report per-item status."""
+    if current_user.id != user_id:
+        raise HTTPException(403, "Access denied")
+    items = select_items(session, user_id, payload.item_ids, payload.only_missing)
+    if payload.item_ids:
+        found = {item.id for item in items}
+        missing = [i for i in payload.item_ids if i not in found]
+        if missing:
+            raise HTTPException(404, detail={"reason": "items_not_found", "item_ids": missing})
+    return classify_batch(session, items, refresh=payload.refresh)
 
-    except Exception as e:
-        print(f"Weather API failed: {e}. Using calendar-based fallback.")
-        month = target_date.month
-
-        if month in [12, 1, 2]:
-            season, temp = "winter", 0
-        elif month in [3, 4, 5]:
-            season, temp = "spring", 12
-        elif month in [6, 7, 8]:
-            season, temp = "summer", 22
-        else:
-            season, temp = "fall", 10
 
-        return {
-            "temperature": temp,
-            "temp_min": temp - 5,
-            "temp_max": temp + 5,
-            "season": season,
-            "city": city,
-            "condition": "unknown",
-        }
+@app.get("/users/{user_id}/classification/status")
+def classification_status(
+    user_id: int,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    if current_user.id != user_id:
+        raise HTTPException(403, "Access denied")
+    return classification_progress(session, user_id)
 
 
 # ---- rule-based outfit suggestions ----
@@ -433,144 +434,6 @@ def _fits_formality(item, desired: Optional[str]) -> bool:
     return abs(r_item - r_desired) <= 1
 
 
-def _color_key(c: Optional[str]) -> str:
-    return (c or "").lower().strip()
-
-
-COLOR_HEX_MAP = {
-    "black": "#000000", "white": "#ffffff", "gray": "#808080", "grey": "#808080",
-    "navy": "#000080", "blue": "#0000ff", "light blue": "#87ceeb", "dark blue": "#00008b",
-    "red": "#ff0000", "dark red": "#8b0000", "burgundy": "#800020", "green": "#008000",
-    "dark green": "#006400", "olive": "#808000", "yellow": "#ffff00", "orange": "#ffa500",
-    "brown": "#a52a2a", "beige": "#f5f5dc", "tan": "#d2b48c", "cream": "#fffdd0",
-    "pink": "#ffc0cb", "purple": "#800080", "lavender": "#e6e6fa", "maroon": "#800000",
-    "teal": "#008080", "khaki": "#f0e68c", "ivory": "#fffff0", "gold": "#ffd700",
-    "silver": "#c0c0c0", "multicolor": "#808080",
-}
-
-
-def hex_to_hsl(hex_color: str):
-    hex_color = hex_color.lstrip("#")
-    r = int(hex_color[0:2], 16) / 255.0
-    g = int(hex_color[2:4], 16) / 255.0
-    b = int(hex_color[4:6], 16) / 255.0
-    c_max = max(r, g, b)
-    c_min = min(r, g, b)
-    delta = c_max - c_min
-    l = (c_max + c_min) / 2.0
-    if delta == 0:
-        return 0.0, 0.0, l
-    s = delta / (1 - abs(2 * l - 1))
-    if c_max == r:
-        h = 60 * (((g - b) / delta) % 6)
-    elif c_max == g:
-        h = 60 * (((b - r) / delta) + 2)
-    else:
-        h = 60 * (((r - g) / delta) + 4)
-    return h, s, l
-
-
-def hue_distance(h1: float, h2: float) -> float:
-    d = abs(h1 - h2)
-    return min(d, 360 - d)
-
-
-def is_neutral_fallback(h: float, s: float, l: float) -> bool:
-    if s < 0.18:
-        return True
-    if 200 <= h <= 260 and l < 0.35 and s < 0.6:
-        return True
-    if 10 <= h <= 70 and s < 0.65 and 0.2 <= l <= 0.9:
-        return True
-    return False
-
-
-def score_outfit_colors(color_names: list[str]) -> float:
-    colors = [c for c in color_names if c]
-    if len(colors) < 2:
-        return 5.0
-    hex_colors = []
-    for color_name in colors:
-        key = _color_key(color_name)
-        hex_val = COLOR_HEX_MAP.get(key, "#808080")
-        hex_colors.append(hex_val)
-    hsl_colors = [hex_to_hsl(c) for c in hex_colors]
-    neutrals = 0
-    brights = 0
-    has_light = False
-    has_dark = False
-    hues = []
-    has_navy = False
-    has_white = False
-    earth_tones = 0
-
-    for i, (h, s, l) in enumerate(hsl_colors):
-        color_name = _color_key(colors[i])
-        if color_name in (
-            "black","white","grey","gray","navy","brown",
-            "beige","tan","khaki","cream","ivory",
-            "olive","silver","multicolor"
-        ):
-            neutrals += 1
-        elif is_neutral_fallback(h, s, l):
-            neutrals += 1
-        if (
-            s > 0.65 and 0.25 < l < 0.8
-            and color_name not in ("khaki","beige","tan","brown","olive","navy")
-        ):
-            brights += 1
-        if l > 0.7:
-            has_light = True
-        if l < 0.3:
-            has_dark = True
-        hues.append(h)
-        if color_name == "navy":
-            has_navy = True
-        if color_name in ("white", "cream", "ivory"):
-            has_white = True
-        if color_name in ("beige", "tan", "brown", "khaki", "olive"):
-            earth_tones += 1
-
-    score = 0.0
-    n = len(colors)
-    if n <= 3:
-        if neutrals >= 2:
-            score += 3
-        elif neutrals == 1:
-            score += 2
-    else:
-        if neutrals >= 3:
-            score += 4
-        elif neutrals == 2:
-            score += 3
-        elif neutrals == 1:
-            score += 1
-    if brights <= 1:
-        score += 3
-    elif brights == 2:
-        score += 1
-    if has_light and has_dark:
-        score += 2
-    complementary = False
-    analogous = False
-    for i in range(len(hues)):
-        for j in range(i + 1, len(hues)):
-            d = hue_distance(hues[i], hues[j])
-            if d <= 30:
-                analogous = True
-            if 150 <= d <= 210:
-                complementary = True
-    if analogous:
-        score += 1
-    if complementary:
-        score += 1
-    if earth_tones >= 2 and neutrals >= 2:
-        score += 1.5
-    if has_navy and has_white and neutrals >= 2:
-        score += 1
-    return round(min(score, 10.0), 1)
-
-
 def _get_color_score(top_color, bottom_color, outer_color=None, shoes_color=None) -> float:
     colors = [top_color, bottom_color, outer_color, shoes_color]
     return score_outfit_colors(colors)
@@ -671,25 +534,15 @@ def _score_outfit(top, bottom, outer, shoes, season, formality, verbose: bool =
     return final
 
 
-def _outfit_color_fingerprint(outfit: dict) -> str:
-    colors = sorted(
-        c for c in (
-            getattr(outfit.get("top"),    "primary_color", None),
-            getattr(outfit.get("bottom"), "primary_color", None),
-            getattr(outfit.get("outer"),  "primary_color", None),
-            getattr(outfit.get("shoes"),  "primary_color", None),
-        ) if c
-    )
-    return ",".join(colors)
-
-
 def _pick_outfit_legacy(
     tops, bottoms, outers, shoes,
     anchor_top, anchor_bottom, anchor_outer, anchor_shoes,
     season, formality,
     liked_fps: set = None,
+    search_mode: str = "auto",
+    feature_rows: Optional[dict] = None,
 ):
-    import itertools, time
+    import time
 
     def _want_outer() -> bool:
         if formality == "polished":
@@ -717,90 +570,25 @@ def _pick_outfit_legacy(
                 "outer": o or (outers[0] if outers and _want_outer() else None),
                 "shoes": s or (shoes[0] if shoes else None)}
 
-    MAX_COMBOS = 200
-    combos = list(itertools.product(t_list, b_list, o_list, s_list))
-    if len(combos) > MAX_COMBOS:
-        random.shuffle(combos)
-        combos = combos[:MAX_COMBOS]
-
     start = time.perf_counter()
 
-    compatible_combos = []
-    feature_rows = []
-    fallback_indices = []
-
-    for tc, bc, oc, sc in combos:
-        if not _compatible(tc, bc, oc, sc):
-            continue
-        top_hsv    = getattr(tc, "primary_color_hsv", None) if tc else None
-        bottom_hsv = getattr(bc, "primary_color_hsv", None) if bc else None
-        outer_hsv  = getattr(oc, "primary_color_hsv", None) if oc else None
-        shoes_hsv  = getattr(sc, "primary_color_hsv", None) if sc else None
-        hsvs = [top_hsv, bottom_hsv, outer_hsv, shoes_hsv]
-        compatible_combos.append((tc, bc, oc, sc, hsvs))
-        if top_hsv is not None and bottom_hsv is not None:
-            feature_rows.append(extract_features(hsvs))
-        else:
-            feature_rows.append(None)
-            fallback_indices.append(len(compatible_combos) - 1)
-
-    ml_indices = [i for i, f in enumerate(feature_rows) if f is not None]
-    ml_scores = {}
-    if ml_indices and trained_model is not None:
-        import warnings, numpy as np
-        X = np.array([feature_rows[i] for i in ml_indices])
-        with warnings.catch_warnings():
-            warnings.filterwarnings("ignore", message="X does not have valid feature names")
-            preds = trained_model.predict(X)
-        for idx, raw_score in zip(ml_indices, preds):
-            ml_scores[idx] = round(max(0.0, min(float(raw_score), 10.0)), 1)
-
-    scored = []
-    for i, (tc, bc, oc, sc, hsvs) in enumerate(compatible_combos):
-        if i in ml_scores:
-            color_score = ml_scores[i]
-        else:
-            cs = [c for c in [
-                  getattr(tc, "primary_color",   None) if tc else None,
-                  getattr(bc, "primary_color",   None) if bc else None,
-                  getattr(oc, "primary_color",   None) if oc else None,
-                  getattr(sc, "primary_color",   None) if sc else None,
-                  getattr(tc, "secondary_color", None) if tc else None,
-                  getattr(bc, "secondary_color", None) if bc else None,
-                  getattr(oc, "secondary_color", None) if oc else None,
-                  getattr(sc, "secondary_color", None) if sc else None,
-              ] if c]
-            color_score = score_outfit_colors(cs)
-
-        penalty = 0.0
-        for piece in (tc, bc, oc, sc):
-            if piece is None:
-                continue
-            penalty += _formality_penalty(piece, formality)
-
-        piece_ranks = [
-            _formality_rank(getattr(p, "formality", None))
-            for p in (tc, bc, oc, sc)
-            if p is not None and getattr(p, "formality", None) is not None
-        ]
-        if len(piece_ranks) >= 2:
-            spread = max(piece_ranks) - min(piece_ranks)
-            penalty += spread * 0.5
-
-        fp = _outfit_color_fingerprint({"top": tc, "bottom": bc, "outer": oc, "shoes": sc})
-        fp_penalized = liked_fps is not None and fp in liked_fps
-        if fp_penalized:
-            penalty += 10.0
-
-        scored.append({
-            "outfit": {"top": tc, "bottom": bc, "outer": oc, "shoes": sc},
-            "score": color_score - penalty,
-            "color_fingerprint": fp,
-            "fp_penalized": fp_penalized,
-        })
+    # score the full product (not a random sample) and keep the best TOP_K
+    search = OutfitSearch(
+        t_list, b_list, o_list, s_list,
+        formality=formality,
+        avoid_fps=liked_fps,
+        feature_rows=feature_rows,
+    )
+    if search_mode == "auto":
+        n_combos = len(t_list) * len(b_list) * len(o_list) * len(s_list)
+        anchored = t is not None or b is not None
+        search_mode = "bnb" if not anchored and n_combos >= BNB_MIN_COMBOS else "exhaustive"
+    if search_mode == "bnb":
+        scored = search.top_k_bnb()
+    else:
+        scored = search.top_k()
 
     elapsed = time.perf_counter() - start
-    scored.sort(key=lambda x: x["score"], reverse=True)
 
     if not scored:
         return []
@@ -841,7 +629,8 @@ def _pick_outfit_legacy(
 
     picked_set = set(id(e) for e in picked)
 
-    print(f"\n⚡ Evaluated {len(scored)} compatible combos in {elapsed:.2f}s")
+    print(f"\n⚡ Evaluated {search.evaluated} compatible combos in {elapsed:.2f}s "
+          f"({search_mode}, pruned {search.pruned_pairs} top/bottom pairs, showing top {len(scored)})")
     if liked_fps:
         print(f"🚫 Avoided fingerprints ({len(liked_fps)}):")
         for afp in sorted(liked_fps):
@@ -887,6 +676,9 @@ def _pick_outfit_legacy(
     return picked
 
 
+SEARCH_MODES = ("auto", "exhaustive", "bnb")
+
+
 def _parse_id_list(raw: Optional[str]) -> set[int]:
     if not raw:
         return set()
@@ -919,8 +711,8 @@ def _snapshot_fields(item, prefix: str) -> dict:
     }
 
 
-def _save_outfit_history(
-    session: Session,
+async def _save_outfit_history(
+    session: AsyncSession,
     user_id: int,
     requested_date: date,
     city: str,
@@ -949,51 +741,40 @@ def _save_outfit_history(
         **_snapshot_fields(outer, "outerwear"),
         **_snapshot_fields(shoes, "shoes"),
     )
-    session.add(history)
-    session.commit()
-    session.refresh(history)
+    # keep the loaded row (no refresh query) and hand it to the wardrobe cache
+    history = await crud_async.add_outfit_history(session, history)
+    record_outfit_history(user_id, history)
     return history
 
 
-@app.get("/users/{user_id}/outfits/suggest")
-def suggest_outfit(
-    user_id: int,
-    outfit_date: Optional[str] = None,
-    formality: Optional[str] = None,
-    anchor_ids: Optional[str] = None,
-    exclude_ids: Optional[str] = None,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
-):
-    if current_user.id != user_id:
-        raise HTTPException(403, "Access denied")
-
-    user = crud.get_user(session, user_id)
-    if not user:
-        raise HTTPException(404, "User not found")
-
-    if not user.city:
-        raise HTTPException(400, "User has no city set. Cannot determine weather.")
-
-    if outfit_date:
-        try:
-            target_date = datetime.strptime(outfit_date, "%Y-%m-%d").date()
-        except ValueError:
-            raise HTTPException(400, f"Invalid date format: {outfit_date}. Use YYYY-MM-DD")
-    else:
-        target_date = date.today()
-
-    weather = get_weather(user.city, target_date)
-    season = weather["season"]
+def _pack_item(it):
+    if not it:
+        return None
+    return {
+        "id": it.id,
+        "category": it.category,
+        "outfit_part": it.outfit_part,
+        "primary_color": it.primary_color,
+        "secondary_color": it.secondary_color,
+        "formality": it.formality,
+        "season": it.season,
+        "image_url": it.image_url,
+        "thumbnails": thumbnail_urls(it.content_hash),
+    }
 
-    print(f"📍 {weather['city']} on {target_date}")
-    print(f"🌡️  Temperature: {weather['temperature']}°C (range: {weather['temp_min']}-{weather['temp_max']}°C)")
-    print(f"🍂 Clothing season: {season}")
 
-    all_items = crud.list_items_for_user(session, user_id)
-    exclude_set = _parse_id_list(exclude_ids)
+def _rank_outfits(
+    wardrobe,
+    season: Optional[str],
+    formality: Optional[str],
+    anchor_set: set,
+    exclude_set: set,
+    avoid_fps: set,
+    search: str = "auto",
+) -> list:
+    """Build the candidate pools from a wardrobe snapshot and return the ranked outfits."""
+    all_items = wardrobe.items
     items = [i for i in all_items if i.id not in exclude_set]
-    anchor_set = _parse_id_list(anchor_ids)
     anchor_items = [i for i in items if i.id in anchor_set]
     anchor_top = next((i for i in anchor_items if i.outfit_part == "top"), None)
     anchor_bottom = next((i for i in anchor_items if i.outfit_part == "bottom"), None)
@@ -1031,27 +812,67 @@ def suggest_outfit(
     random.shuffle(outers)
     random.shuffle(shoes)
 
-    liked_fps = set(
-        row.color_fingerprint
-        for row in session.exec(
-            select(LikedOutfit).where(LikedOutfit.user_id == user_id)
-        ).all()
-        if row.color_fingerprint
-    )
-    disliked_fps = set(
-        row.color_fingerprint
-        for row in session.exec(
-            select(DislikedOutfit).where(DislikedOutfit.user_id == user_id)
-        ).all()
-        if row.color_fingerprint
-    )
-    avoid_fps = liked_fps | disliked_fps
-
     ranked = _pick_outfit_legacy(
         tops, bottoms, outers, shoes,
         anchor_top, anchor_bottom, anchor_outer, anchor_shoes,
         season, formality,
         liked_fps=avoid_fps,
+        search_mode=search,
+        feature_rows=wardrobe.feature_rows,
+    )
+    # a bare outfit dict comes back when a slot has no candidates at all
+    return ranked if isinstance(ranked, list) else []
+
+
+@app.get("/users/{user_id}/outfits/suggest")
+async def suggest_outfit(
+    user_id: int,
+    outfit_date: Optional[str] = None,
+    formality: Optional[str] = None,
+    anchor_ids: Optional[str] = None,
+    exclude_ids: Optional[str] = None,
+    search: str = "auto",
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user_async),
+):
+    if current_user.id != user_id:
+        raise HTTPException(403, "Access denied")
+
+    if search not in SEARCH_MODES:
+        raise HTTPException(400, f"Invalid search mode: {search}. Use one of {', '.join(SEARCH_MODES)}")
+
+    user = current_user
+
+    if not user.city:
+        raise HTTPException(400, "User has no city set. Cannot determine weather.")
+
+    if outfit_date:
+        try:
+            target_date = datetime.strptime(outfit_date, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(400, f"Invalid date format: {outfit_date}. Use YYYY-MM-DD")
+    else:
+        target_date = date.today()
+
+    # memory-cached weather stays on the event loop; a miss may call the API
+    weather = cached_weather(user.city, target_date) or await run_in_threadpool(get_weather, user.city, target_date)
+    season = weather["season"]
+
+    print(f"📍 {weather['city']} on {target_date}")
+    print(f"🌡️  Temperature: {weather['temperature']}°C (range: {weather['temp_min']}-{weather['temp_max']}°C)")
+    print(f"🍂 Clothing season: {season}")
+
+    wardrobe = await session.run_sync(get_wardrobe, user_id)
+    liked_fps = wardrobe.liked_fps
+    disliked_fps = wardrobe.disliked_fps
+    # the search is CPU-heavy (seconds for exhaustive on large wardrobes); keep it off the event loop
+    ranked = await run_in_threadpool(
+        _rank_outfits,
+        wardrobe, season, formality,
+        anchor_set=_parse_id_list(anchor_ids),
+        exclude_set=_parse_id_list(exclude_ids),
+        avoid_fps=liked_fps | disliked_fps,
+        search=search,
     )
 
     if not ranked or not any(
@@ -1067,23 +888,9 @@ def suggest_outfit(
         "top": None, "bottom": None, "outer": None, "shoes": None
     }
 
-    def _pack(it):
-        if not it:
-            return None
-        return {
-            "id": it.id,
-            "category": it.category,
-            "outfit_part": it.outfit_part,
-            "primary_color": it.primary_color,
-            "secondary_color": it.secondary_color,
-            "formality": it.formality,
-            "season": it.season,
-            "image_url": it.image_url,
-        }
-
-    packed_outfit = {k: _pack(v) for k, v in outfit.items()}
+    packed_outfit = {k: _pack_item(v) for k, v in outfit.items()}
 
-    _save_outfit_history(
+    await _save_outfit_history(
         session=session,
         user_id=user_id,
         requested_date=target_date,
@@ -1096,17 +903,20 @@ def suggest_outfit(
     outfits = []
     for i, entry in enumerate(ranked, 1):
         ranked_outfit = entry["outfit"]
-        fp = entry.get("color_fingerprint") or _outfit_color_fingerprint(ranked_outfit)
+        fp = entry.get("color_fingerprint") or outfit_color_fingerprint(ranked_outfit)
         outfits.append({
             "rank": i,
             "score": round(entry["score"], 1),
             "color_fingerprint": fp,
             "already_liked": fp in liked_fps,
             "already_disliked": fp in disliked_fps,
-            "outfit": {k: _pack(v) for k, v in ranked_outfit.items()},
+            "outfit": {k: _pack_item(v) for k, v in ranked_outfit.items()},
         })
 
-    gap_recommendations = compute_gap_recommendations(session, user_id, limit=6)
+    # wardrobe and history come from the snapshot, so this runs no queries
+    gap_recommendations = compute_gap_recommendations(
+        None, user_id, limit=6, wardrobe=wardrobe.items, history=wardrobe.history,
+    )
 
     return {
         "weather": weather,
@@ -1116,6 +926,75 @@ def suggest_outfit(
     }
 
 
+
+@app.get("/users/{user_id}/outfits/plan")
+def plan_outfits(
+    user_id: int,
+    start_date: Optional[str] = None,
+    days: int = Query(7, ge=1, le=FORECAST_HORIZON_DAYS),
+    formality: Optional[str] = None,
+    search: str = "auto",
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    One suggested outfit per day for the next ``days`` days.
+
+    The whole window's weather comes from one get_weather_range() call, and
+    colour combos already picked for an earlier day are avoided so the week
+    doesn't repeat itself. Nothing is written to outfit history.
+    """
+    if current_user.id != user_id:
+        raise HTTPException(403, "Access denied")
+
+    if search not in SEARCH_MODES:
+        raise HTTPException(400, f"Invalid search mode: {search}. Use one of {', '.join(SEARCH_MODES)}")
+
+    user = current_user
+    if not user.city:
+        raise HTTPException(400, "User has no city set. Cannot determine weather.")
+
+    if start_date:
+        try:
+            first_day = datetime.strptime(start_date, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(400, f"Invalid date format: {start_date}. Use YYYY-MM-DD")
+    else:
+        first_day = date.today()
+    last_day = first_day + timedelta(days=days - 1)
+
+    forecast = get_weather_range(user.city, first_day, last_day)
+    wardrobe = get_wardrobe(session, user_id)
+    avoid_fps = set(wardrobe.liked_fps | wardrobe.disliked_fps)
+
+    plan = []
+    for weather in forecast:
+        print(f"📅 {weather['date']}: {weather['temperature']}°C → {weather['season']}")
+        ranked = _rank_outfits(
+            wardrobe, weather["season"], formality,
+            anchor_set=set(), exclude_set=set(),
+            avoid_fps=avoid_fps, search=search,
+        )
+        entry = next(
+            (e for e in ranked if e["outfit"].get("top") or e["outfit"].get("bottom")),
+            None,
+        )
+        if entry is None:
+            plan.append({"date": weather["date"], "weather": weather, "outfit": None, "score": None})
+            continue
+        fp = entry.get("color_fingerprint") or outfit_color_fingerprint(entry["outfit"])
+        avoid_fps.add(fp)
+        plan.append({
+            "date": weather["date"],
+            "weather": weather,
+            "outfit": {k: _pack_item(v) for k, v in entry["outfit"].items()},
+            "score": round(entry["score"], 1),
+            "color_fingerprint": fp,
+        })
+
+    return {"city": user.city, "days": plan}
+
+
 from pydantic import BaseModel as _PydanticBase
 
 
@@ -1132,20 +1011,9 @@ def like_combo(
 ):
     if current_user.id != user_id:
         raise HTTPException(403, "Access denied")
-    user = crud.get_user(session, user_id)
-    if not user:
-        raise HTTPException(404, "User not found")
-    existing = session.exec(
-        select(LikedOutfit).where(
-            LikedOutfit.user_id == user_id,
-            LikedOutfit.color_fingerprint == payload.color_fingerprint,
-        )
-    ).first()
-    if existing:
+    if crud.add_combo(session, LikedOutfit, user_id, payload.color_fingerprint) is None:
         return {"status": "already_liked"}
-    record = LikedOutfit(user_id=user_id, color_fingerprint=payload.color_fingerprint)
-    session.add(record)
-    session.commit()
+    invalidate_wardrobe(user_id)
     return {"status": "liked"}
 
 
@@ -1157,9 +1025,6 @@ def list_disliked_combos(
 ):
     if current_user.id != user_id:
         raise HTTPException(403, "Access denied")
-    user = crud.get_user(session, user_id)
-    if not user:
-        raise HTTPException(404, "User not found")
     rows = session.exec(select(DislikedOutfit).where(DislikedOutfit.user_id == user_id)).all()
     return [{"id": r.id, "color_fingerprint": r.color_fingerprint, "created_at": r.created_at} for r in rows]
 
@@ -1173,27 +1038,18 @@ def dislike_combo(
 ):
     if current_user.id != user_id:
         raise HTTPException(403, "Access denied")
-    user = crud.get_user(session, user_id)
-    if not user:
-        raise HTTPException(404, "User not found")
     liked = session.exec(select(LikedOutfit).where(
         LikedOutfit.user_id == user_id,
         LikedOutfit.color_fingerprint == payload.color_fingerprint,
     )).first()
     if liked:
         session.delete(liked)
-    existing = session.exec(select(DislikedOutfit).where(
-        DislikedOutfit.user_id == user_id,
-        DislikedOutfit.color_fingerprint == payload.color_fingerprint,
-    )).first()
-    if existing:
-        session.commit()
+    record_id = crud.add_combo(session, DislikedOutfit, user_id, payload.color_fingerprint)
+    if liked or record_id is not None:
+        invalidate_wardrobe(user_id)
+    if record_id is None:
         return {"status": "already_disliked"}
-    record = DislikedOutfit(user_id=user_id, color_fingerprint=payload.color_fingerprint)
-    session.add(record)
-    session.commit()
-    session.refresh(record)
-    return {"status": "disliked", "id": record.id}
+    return {"status": "disliked", "id": record_id}
 
 
 @app.delete("/users/{user_id}/disliked-combos")
@@ -1205,9 +1061,6 @@ def undislike_combo(
 ):
     if current_user.id != user_id:
         raise HTTPException(403, "Access denied")
-    user = crud.get_user(session, user_id)
-    if not user:
-        raise HTTPException(404, "User not found")
     existing = session.exec(select(DislikedOutfit).where(
         DislikedOutfit.user_id == user_id,
         DislikedOutfit.color_fingerprint == payload.color_fingerprint,
@@ -1215,6 +1068,7 @@ def undislike_combo(
     if existing:
         session.delete(existing)
         session.commit()
+        invalidate_wardrobe(user_id)
     return {"status": "undisliked"}
 
 
@@ -1227,9 +1081,6 @@ def unlike_combo(
 ):
     if current_user.id != user_id:
         raise HTTPException(403, "Access denied")
-    user = crud.get_user(session, user_id)
-    if not user:
-        raise HTTPException(404, "User not found")
     existing = session.exec(
         select(LikedOutfit).where(
             LikedOutfit.user_id == user_id,
@@ -1239,6 +1090,7 @@ def unlike_combo(
     if existing:
         session.delete(existing)
         session.commit()
+        invalidate_wardrobe(user_id)
     return {"status": "unliked"}
 
 
@@ -1250,10 +1102,11 @@ def get_wardrobe_recommendations(
 ):
     if current_user.id != user_id:
         raise HTTPException(403, "Access denied")
-    user = crud.get_user(session, user_id)
-    if not user:
-        raise HTTPException(404, "User not found")
-    recommendations = compute_gap_recommendations(session=session, user_id=user_id, limit=6)
+    wardrobe = get_wardrobe(session, user_id)
+    recommendations = compute_gap_recommendations(
+        session=session, user_id=user_id, limit=6,
+        wardrobe=wardrobe.items, history=wardrobe.history,
+    )
     return {"recommendations": recommendations}
 
 
@@ -1261,9 +1114,27 @@ def get_wardrobe_recommendations(
 
 @app.get("/debug/env")
 def debug_env():
+    from .db import engine
     return {
         "auto_classify_on_upload": settings.auto_classify_on_upload,
         "has_openai_key": bool(settings.openai_api_key),
+        "vision_providers": [
+            {"name": p.name, "version": p.version, "timeout": p.timeout, "concurrency": p.concurrency}
+            for p in PROVIDER_CHAIN
+        ],
+        "database": database_info(engine),
+    }
+
+
+@app.get("/debug/caches")
+def debug_caches(session: Session = Depends(get_session)):
+    return {
+        "blobs": blob_store_info(session),
+        "rule_scores": rule_score_cache_info(),
+        "wardrobes": wardrobe_cache_info(),
+        "principals": principal_cache_info(),
+        "weather": weather_cache_info(),
+        "classifications": classification_cache_info(),
     }
 
 
@@ -1280,23 +1151,23 @@ class ScoreRequest(PydanticBaseModel):
 
 
 @app.post("/users/{user_id}/outfits/score")
-def score_outfit_endpoint(
+async def score_outfit_endpoint(
     user_id: int,
     payload: ScoreRequest,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user_async),
 ):
     if current_user.id != user_id:
         raise HTTPException(403, "Access denied")
 
-    user = crud.get_user(session, user_id)
-    if not user:
-        raise HTTPException(404, "User not found")
+    items = await crud_async.get_items(
+        session, [payload.top_id, payload.bottom_id, payload.outer_id, payload.shoes_id]
+    )
 
     def _get(item_id):
         if not item_id:
             return None
-        it = crud.get_item(session, item_id)
+        it = items.get(item_id)
         if it and it.user_id != user_id:
             raise HTTPException(403, f"Item {item_id} doesn't belong to this user")
         return it
@@ -1326,17 +1197,22 @@ def score_outfit_endpoint(
     bottom_hsv = hsvs[1]
     can_use_model = (top_hsv is not None and bottom_hsv is not None)
 
+    # the same matrix (from the items' cached HSV columns) feeds the model and the features
+    hsvs_parsed, missing = hsv_matrix([[top, bottom, outer, shoes]])
     if can_use_model:
-        score = score_outfit_ml(colors=colors, hsvs=hsvs, verbose=True)
+        score = float(score_outfits_ml_batch(hsvs_parsed, missing)[0])
     else:
         score = score_outfit_colors(colors)
 
-    features = extract_features(hsvs)
+    features = extract_features_batch(hsvs_parsed, missing)[0]
     feat_names = [
         "avg_hue_distance", "max_hue_distance", "avg_saturation",
         "high_sat_count", "neutral_count", "has_contrast",
     ]
-    feat_dict = dict(zip(feat_names, features))
+    feat_dict = {
+        name: (float(v) if i < 3 else int(v))
+        for i, (name, v) in enumerate(zip(feat_names, features))
+    }
 
     explanations = []
 
@@ -1393,16 +1269,10 @@ def score_outfit_endpoint(
                 continue
             break
 
-    parsed = []
-    for hsv_str in hsvs:
-        if hsv_str:
-            try:
-                parts = hsv_str.split(",")
-                parsed.append((float(parts[0]), float(parts[1]), float(parts[2])))
-            except Exception:
-                parsed.append(None)
-        else:
-            parsed.append(None)
+    parsed = [
+        None if missing[0, j] else tuple(float(x) for x in hsvs_parsed[0, j])
+        for j in range(4)
+    ]
 
     bright_pieces = sum(1 for p in parsed if p and p[1] >= 20)
     neutral_c = int(feat_dict["neutral_count"])
@@ -1501,6 +1371,7 @@ def score_outfit_endpoint(
             "formality": it.formality,
             "season": it.season,
             "image_url": it.image_url,
+            "thumbnails": thumbnail_urls(it.content_hash),
         }
 
     return {
@@ -0,0 +1,235 @@
+"""
+Versioned schema migrations.
+
+Each entry in MIGRATIONS runs exactly once per database, in its own
+transaction together with the schema_version row that records it, so a
+failed migration leaves nothing half-applied and is retried on the next
+start. That includes DDL: on SQLite the steps run on
+db_config.transactional_ddl_engine(), where ALTER/CREATE roll back too. A
+database already at LATEST_VERSION costs one SELECT at startup.
+
+A brand-new database gets the current schema from create_all() and is
+stamped with every version without running the steps. Databases made
+before the runner existed start at version 0; the early steps probe for
+what's already there, since the old startup code may have applied them.
+
+Migrations are plain SQLAlchemy/ANSI SQL and run on SQLite and Postgres.
+Workers starting together migrate one at a time (a Postgres advisory lock,
+SQLite's write lock) and skip the versions already applied meanwhile.
+
+To change the schema: append a (version, name, function) entry. Never
+edit or reorder an entry that has shipped. A step that also touches files
+must leave them usable if its transaction rolls back; it may return a
+callable that the runner calls once the transaction has committed (e.g.
+to delete files the new rows no longer reference).
+"""
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlmodel import Session, SQLModel
+
+from . import crud
+from .db_config import transactional_ddl_engine
+from .models import HOT_INDEXES, USER_EMAIL_INDEX, DislikedOutfit, LikedOutfit, SchemaVersion
+from .services.blob_store import migrate_files_to_blobs
+from .services.item_features import backfill_color_features
+
+
+def _add_missing_columns(conn: Connection, table: str, column_types: Dict[str, str]) -> None:
+    """ALTER TABLE ... ADD COLUMN for each name → SQL type not yet in ``table``."""
+    existing = {col["name"] for col in inspect(conn).get_columns(table)}
+    for name, sql_type in column_types.items():
+        if name not in existing:
+            conn.execute(text(f'ALTER TABLE "{table}" ADD COLUMN {name} {sql_type}'))
+            print(f"✓ Migration: added {name} column to {table} table")
+
+
+def _drop_columns(conn: Connection, table: str, names: List[str]) -> None:
+    """ALTER TABLE ... DROP COLUMN for each of ``names`` still in ``table``."""
+    existing = {col["name"] for col in inspect(conn).get_columns(table)}
+    for name in names:
+        if name in existing:
+            conn.execute(text(f'ALTER TABLE "{table}" DROP COLUMN {name}'))
+            print(f"✓ Migration: dropped {name} column from {table} table")
+
+
+def _create_tables(conn: Connection) -> None:
+    SQLModel.metadata.create_all(conn)
+
+
+def _auth_columns(conn: Connection) -> None:
+    _add_missing_columns(conn, "user", {"email": "TEXT", "hashed_password": "TEXT"})
+    USER_EMAIL_INDEX.create(conn, checkfirst=True)
+
+
+def _formality_values(conn: Connection) -> None:
+    """Map legacy formality values to the 3-level system before the ORM reads them."""
+    conn.execute(text("UPDATE item SET formality = 'casual'       WHERE formality = 'sporty'"))
+    conn.execute(text("UPDATE item SET formality = 'smart_casual' WHERE formality = 'business_casual'"))
+    conn.execute(text("UPDATE item SET formality = 'polished'     WHERE formality IN ('semi_formal', 'formal')"))
+
+
+def _color_detail_columns(conn: Connection) -> None:
+    # formerly the standalone migrate_add_color_fields.py script
+    _add_missing_columns(conn, "item", {"primary_color_hex": "TEXT", "primary_color_hsv": "TEXT"})
+
+
+def _classification_status_column(conn: Connection) -> None:
+    _add_missing_columns(conn, "item", {"classification_status": "VARCHAR"})
+
+
+def _item_feature_columns(conn: Connection) -> None:
+    # after every other item column: the backfill reads whole Item rows
+    column_types = {"color_hue": "FLOAT", "color_sat": "FLOAT", "color_val": "FLOAT", "formality_rank": "INTEGER"}
+    _add_missing_columns(conn, "item", column_types)
+    with Session(bind=conn) as session:
+        filled = backfill_color_features(session)
+    if filled:
+        print(f"✓ Migration: backfilled colour features for {filled} items")
+
+
+def _per_user_indexes(conn: Connection) -> None:
+    # the fingerprint indexes are unique; keep the oldest of any duplicate rows
+    for table in (LikedOutfit.__tablename__, DislikedOutfit.__tablename__):
+        removed = conn.execute(text(
+            f"DELETE FROM {table} WHERE id NOT IN "
+            f"(SELECT MIN(id) FROM {table} GROUP BY user_id, color_fingerprint)"
+        )).rowcount
+        if removed:
+            print(f"✓ Migration: removed {removed} duplicate {table} rows")
+    for index in HOT_INDEXES:
+        index.create(conn, checkfirst=True)
+    conn.execute(text("ANALYZE"))
+
+
+def _blob_store(conn: Connection) -> Callable[[], None]:
+    with Session(bind=conn) as session:
+        originals = migrate_files_to_blobs(session, crud.STORAGE_ROOT)
+    if originals:
+        print(f"✓ Migration: copied {len(originals)} item images into the blob store")
+
+    def remove_originals() -> None:
+        for path in originals:
+            try:
+                path.unlink(missing_ok=True)
+            except OSError as e:
+                print(f"⚠️ Could not remove {path}: {e}")
+    return remove_originals
+
+
+def _token_version_column(conn: Connection) -> None:
+    _add_missing_columns(conn, "user", {"token_version": "INTEGER NOT NULL DEFAULT 0"})
+
+
+def _drop_colour_flag_columns(conn: Connection) -> None:
+    # written by migration 6 before the flags were dropped; nothing ever read them
+    _drop_columns(conn, "item", ["color_is_neutral", "color_is_high_sat", "color_is_light", "color_is_dark"])
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], Optional[Callable[[], None]]]]] = [
+    (1, "create tables", _create_tables),
+    (2, "user auth columns", _auth_columns),
+    (3, "3-level formality values", _formality_values),
+    (4, "item colour hex/hsv columns", _color_detail_columns),
+    (5, "item classification_status column", _classification_status_column),
+    (6, "item colour feature columns", _item_feature_columns),
+    (7, "per-user composite indexes", _per_user_indexes),
+    (8, "content-addressed blob store", _blob_store),
+    (9, "user token_version column", _token_version_column),
+    (10, "drop unused item colour flag columns", _drop_colour_flag_columns),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+# arbitrary, app-wide key for pg_advisory_lock
+MIGRATION_LOCK_KEY = 0x0C10_5E7
+
+
+def current_version(engine: Engine) -> int:
+    """Highest applied migration; 0 for a database without a schema_version table."""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+    except DBAPIError:
+        return 0
+
+
+def _record(conn: Connection, version: int, name: str) -> None:
+    conn.execute(
+        SchemaVersion.__table__.insert().values(version=version, name=name, applied_at=datetime.utcnow())
+    )
+
+
+@contextmanager
+def _migration_lock(engine: Engine):
+    """Hold a session-level advisory lock on Postgres; SQLite relies on its write lock."""
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        conn.commit()
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            conn.commit()
+
+
+def run_migrations(engine: Engine) -> int:
+    """Bring the database up to LATEST_VERSION; returns how many migrations ran."""
+    if current_version(engine) >= LATEST_VERSION:
+        return 0
+    with _migration_lock(engine):
+        return _apply_pending(engine)
+
+
+def _apply_pending(engine: Engine) -> int:
+    ddl_engine = transactional_ddl_engine(engine)
+    try:
+        return _apply_pending_on(ddl_engine)
+    finally:
+        if ddl_engine is not engine:
+            ddl_engine.dispose()
+
+
+def _apply_pending_on(engine: Engine) -> int:
+    # re-read under the lock: another worker may have just finished
+    version = current_version(engine)
+    if version >= LATEST_VERSION:
+        return 0
+
+    if version == 0 and not inspect(engine).has_table("item"):
+        # empty database: create_all() already builds the latest schema
+        with engine.begin() as conn:
+            SQLModel.metadata.create_all(conn)
+            for v, name, _ in MIGRATIONS:
+                _record(conn, v, name)
+        print(f"✓ Created database schema at version {LATEST_VERSION}")
+        return 0
+
+    applied = 0
+    for v, name, migrate in MIGRATIONS:
+        if v <= version:
+            continue
+        try:
+            with engine.begin() as conn:
+                SchemaVersion.__table__.create(conn, checkfirst=True)
+                if (conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0) >= v:
+                    # another process applied it while we waited for the write lock
+                    continue
+                after_commit = migrate(conn)
+                _record(conn, v, name)
+        except IntegrityError:
+            if current_version(engine) < v:
+                raise
+            # another process applied this version first; its transaction won
+            print(f"ℹ️ Migration {v} ({name}) already applied by another process")
+            continue
+        if after_commit is not None:
+            after_commit()
+        print(f"✓ Migration {v}: {name}")
+        applied += 1
+    return applied
@@ -1,6 +1,7 @@
 from datetime import datetime, date
 from typing import Optional, List
 
+from sqlalchemy import Index, text
 from sqlmodel import SQLModel, Field, Relationship
 
 from .enums import Season, OutfitPart, Formality
@@ -11,6 +12,8 @@ class User(SQLModel, table=True):
     name: str
     email: Optional[str] = Field(default=None)
     hashed_password: Optional[str] = Field(default=None)
+    # bumped on password change; tokens carrying an older value are rejected
+    token_version: int = Field(default=0)
     city: str
     style_preferences: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -42,6 +45,14 @@ class Item(SQLModel, table=True):
     is_graphic: Optional[bool] = None
     notes: Optional[str] = None
     verified: bool = False
+    # pending / processing / done / failed while a background job owns the item
+    classification_status: Optional[str] = None
+
+    # parsed colour/formality features, kept in sync by crud (see services/item_features.py)
+    color_hue: Optional[float] = None
+    color_sat: Optional[float] = None
+    color_val: Optional[float] = None
+    formality_rank: Optional[int] = None
 
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -131,3 +142,78 @@ class OutfitHistory(SQLModel, table=True):
     shoes_formality: Optional[str] = None
 
     user: Optional["User"] = Relationship(back_populates="outfit_history")
+
+
+class ClassificationJob(SQLModel, table=True):
+    """Durable queue entry for background vision classification (see services/classification_queue.py)."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    item_id: int = Field(foreign_key="item.id", index=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    status: str = Field(default="pending", index=True)  # pending / running / done / failed
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class WeatherCacheEntry(SQLModel, table=True):
+    """Persistent level of the weather/geocoding cache (see services/weather.py)."""
+    key: str = Field(primary_key=True)  # "geo:<city>" or "forecast:<lat>,<lon>:<date>"
+    payload: str  # JSON
+    fetched_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: Optional[datetime] = None  # None = never expires
+
+
+class ClassificationCacheEntry(SQLModel, table=True):
+    """Stored vision predictions keyed by image content (see services/classification_cache.py)."""
+    content_hash: str = Field(primary_key=True)  # sha256 of the uploaded bytes
+    version: str = Field(primary_key=True)  # vision.CLASSIFIER_VERSION that produced it
+    prediction: str  # JSON of the normalized Prediction
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    hits: int = 0
+
+
+class Blob(SQLModel, table=True):
+    """One stored image file, shared by every item with the same bytes (see services/blob_store.py)."""
+    content_hash: str = Field(primary_key=True)
+    path: str  # relative to STORAGE_ROOT: blobs/<hash[:2]>/<hash><ext>
+    size: int = 0
+    refcount: int = 0  # items pointing at it; the file is removed when this hits 0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class SchemaVersion(SQLModel, table=True):
+    """One row per applied migration (see migrations.py)."""
+    __tablename__ = "schema_version"
+    version: int = Field(primary_key=True)
+    name: str
+    applied_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+# partial: users without an email don't conflict
+USER_EMAIL_INDEX = Index(
+    "ix_user_email", User.__table__.c.email, unique=True,
+    sqlite_where=text("email IS NOT NULL"), postgresql_where=text("email IS NOT NULL"),
+)
+
+# Composite indexes for the per-user queries (wardrobe snapshot, duplicate
+# check, like/dislike lookups, outfit history). create_all() adds them to new
+# databases; migration 7 in migrations.py adds them to existing ones.
+# test_query_plans.py fails if one of those queries goes back to a full scan.
+HOT_INDEXES = [
+    Index("ix_item_user_hash", Item.__table__.c.user_id, Item.__table__.c.content_hash),
+    Index("ix_item_user_id_desc", Item.__table__.c.user_id, Item.__table__.c.id.desc()),
+    Index(
+        "ix_outfithistory_user_created_desc",
+        OutfitHistory.__table__.c.user_id, OutfitHistory.__table__.c.created_at.desc(),
+    ),
+    Index(
+        "ux_likedoutfit_user_fingerprint",
+        LikedOutfit.__table__.c.user_id, LikedOutfit.__table__.c.color_fingerprint, unique=True,
+    ),
+    Index(
+        "ux_dislikedoutfit_user_fingerprint",
+        DislikedOutfit.__table__.c.user_id, DislikedOutfit.__table__.c.color_fingerprint, unique=True,
+    ),
+]
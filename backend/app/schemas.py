@@ -1,9 +1,10 @@
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, computed_field
 
 from .enums import Season, OutfitPart, Formality
+from .services.thumbnails import thumbnail_urls
 
 
 # ---------- Users ----------
@@ -45,6 +46,11 @@ class LoginRequest(BaseModel):
     password: str
 
 
+class PasswordChangeRequest(BaseModel):
+    current_password: str
+    new_password: str
+
+
 class TokenResponse(BaseModel):
     token: str
     user: UserRead
@@ -84,7 +90,15 @@ class ItemRead(BaseModel):
     season: Optional[Season] = None
     notes: Optional[str] = None
     verified: bool
+    classification_status: Optional[str] = None
     created_at: datetime
+    content_hash: Optional[str] = Field(default=None, exclude=True)
+
+    @computed_field
+    @property
+    def thumbnails(self) -> Dict[str, str]:
+        """WEBP thumbnail URLs by width (see services/thumbnails.py)."""
+        return thumbnail_urls(self.content_hash)
 
     class Config:
         from_attributes = True
@@ -104,6 +118,12 @@ class ItemUpdate(BaseModel):
     verified: Optional[bool] = None
 
 
+class ClassifyBatchRequest(BaseModel):
+    item_ids: Optional[List[int]] = None  # None = every item of the user
+    only_missing: bool = False  # skip items that are already classified
+    refresh: bool = False  # bypass the classification cache
+
+
 # ---------- Outfits ----------
 
 class OutfitCreate(BaseModel):
@@ -0,0 +1,165 @@
+"""
+Classify many items at once (POST /users/{id}/items/classify-batch and
+classify_items.py).
+
+Item paths are read up front and the session is left alone while the
+vision calls run, up to settings.classify_batch_concurrency at a time in a
+thread pool. Provider calls (classification cache misses) are spaced to at
+most settings.classify_rate_limit per second and the primary provider is
+retried with exponential backoff; the fallback providers in VISION_PROVIDERS
+only get an item once those retries are used up. Finished predictions are written BATCH_COMMIT_SIZE items per
+transaction as they come in, so a crash loses at most one group.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Optional
+
+from sqlmodel import Session, select
+
+from .. import crud
+from ..config import settings
+from ..models import Item
+from ..vision import PROVIDER, PROVIDER_CHAIN, classify_fallback, classify_image
+from .classification_cache import classify_cached
+
+BATCH_COMMIT_SIZE = 25
+RETRY_BACKOFF_SECONDS = 1.0
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads (rate <= 0: no limit)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.calls = 0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            self.calls += 1
+            if not self.interval:
+                return
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def select_items(
+    session: Session,
+    user_id: int,
+    item_ids: Optional[List[int]] = None,
+    only_missing: bool = False,
+) -> List[Item]:
+    """
+    The user's items to classify: the given ids, or all. ``only_missing``
+    keeps items without a primary-provider result (unclassified, failed or
+    only guessed by a fallback provider).
+    """
+    stmt = select(Item).where(Item.user_id == user_id)
+    if item_ids:
+        stmt = stmt.where(Item.id.in_(item_ids))
+    if only_missing:
+        stmt = stmt.where((Item.category == None) | (Item.classification_status != crud.CLASSIFIED))  # noqa: E711
+    return session.exec(stmt.order_by(Item.id)).all()
+
+
+def _classify_one(item_id: int, path: str, content_hash: Optional[str], refresh: bool,
+                  limiter: RateLimiter, max_retries: int) -> dict:
+    provider_calls = 0
+
+    def call_provider(image_path, h):
+        nonlocal provider_calls
+        for attempt in range(max_retries + 1):
+            limiter.wait()
+            provider_calls += 1
+            try:
+                return classify_image(image_path, h, fallback=False)
+            except Exception as e:
+                if attempt == max_retries:
+                    if len(PROVIDER_CHAIN) == 1:
+                        raise
+                    print(f"⚠️ Item {item_id}: {PROVIDER} failed {attempt + 1} times ({e}); using fallback")
+                    break
+                delay = RETRY_BACKOFF_SECONDS * 2 ** attempt
+                print(f"⚠️ Item {item_id}: vision call failed ({e}); retrying in {delay:.0f}s")
+                time.sleep(delay)
+        provider_calls += 1
+        return classify_fallback(image_path, h)
+
+    pred = classify_cached(path, content_hash, refresh=refresh, classify=call_provider)
+    return {"prediction": pred, "provider_calls": provider_calls}
+
+
+def classify_batch(
+    session: Session,
+    items: List[Item],
+    refresh: bool = False,
+    concurrency: Optional[int] = None,
+) -> dict:
+    """Classify ``items`` in parallel and store the results. Returns a per-item report."""
+    started = time.perf_counter()
+    concurrency = max(1, concurrency or settings.classify_batch_concurrency)
+    limiter = RateLimiter(settings.classify_rate_limit)
+
+    report = {}
+    work = []
+    item_ids = [item.id for item in items]
+    for item in items:
+        path = crud.STORAGE_ROOT / item.image_url
+        if not path.exists():
+            report[item.id] = {"item_id": item.id, "status": "failed", "error": "image file missing"}
+            continue
+        work.append((item.id, str(path), item.content_hash))
+    session.rollback()  # nothing to write yet; don't hold the connection during the calls
+
+    pending, failed = {}, []
+
+    def flush():
+        if pending or failed:
+            crud.apply_classifications(session, dict(pending), failed=list(failed))
+            pending.clear()
+            failed.clear()
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="classify") as pool:
+        futures = {
+            pool.submit(_classify_one, item_id, path, h, refresh, limiter, settings.classify_max_retries): item_id
+            for item_id, path, h in work
+        }
+        for future in as_completed(futures):
+            item_id = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"❌ Item {item_id}: classification failed: {e}")
+                report[item_id] = {"item_id": item_id, "status": "failed", "error": str(e)[:500]}
+                failed.append(item_id)
+            else:
+                pred = result["prediction"]
+                report[item_id] = {
+                    "item_id": item_id,
+                    "status": crud.CLASSIFIED_FALLBACK if crud.is_fallback_prediction(pred) else "done",
+                    "cached": result["provider_calls"] == 0,
+                    "category": pred.get("category"),
+                    "color": pred.get("color"),
+                    "provider": pred.get("provider"),
+                }
+                pending[item_id] = pred
+            if len(pending) + len(failed) >= BATCH_COMMIT_SIZE:
+                flush()
+    flush()
+
+    rows = [report[item_id] for item_id in item_ids]
+    return {
+        "total": len(rows),
+        "done": sum(r["status"] == "done" for r in rows),
+        "failed": sum(r["status"] == "failed" for r in rows),
+        "fallback": sum(r["status"] == crud.CLASSIFIED_FALLBACK for r in rows),
+        "cached": sum(bool(r.get("cached")) for r in rows),
+        "provider_calls": limiter.calls,
+        "elapsed_seconds": round(time.perf_counter() - started, 2),
+        "items": rows,
+    }
@@ -0,0 +1,162 @@
+"""
+Content-addressed image storage.
+
+Every image lives once under STORAGE_ROOT/blobs/<hash[:2]>/<hash><ext>,
+however many items (of however many users) uploaded the same bytes. The
+blob table counts the items pointing at each file; crud adjusts the count
+in the same transaction as the item insert/delete, and the file is removed
+only after the last reference is gone.
+
+Items stored under the old STORAGE_ROOT/<user_id>/<uuid>.<ext> layout are
+copied in by migrate_files_to_blobs() at startup; the originals are deleted
+only once that transaction has committed.
+"""
+import hashlib
+import os
+import shutil
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from sqlmodel import Session, select, update
+
+from ..db_config import dialect_insert
+from ..models import Blob, Item
+
+BLOB_DIRNAME = "blobs"
+EXTENSION_ALIASES = {".jpeg": ".jpg"}
+
+
+def blob_rel_path(content_hash: str, filename: str) -> str:
+    ext = (Path(filename).suffix or ".jpg").lower()
+    ext = EXTENSION_ALIASES.get(ext, ext)
+    return f"{BLOB_DIRNAME}/{content_hash[:2]}/{content_hash}{ext}"
+
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _add_reference(session: Session, content_hash: str, rel: str, size: int) -> None:
+    # one statement, so concurrent uploads of the same bytes can't lose a count
+    insert = dialect_insert(session.get_bind())
+    stmt = insert(Blob).values(content_hash=content_hash, path=rel, size=size, refcount=1)
+    session.exec(stmt.on_conflict_do_update(
+        index_elements=["content_hash"], set_={"refcount": Blob.refcount + 1}
+    ))
+
+
+def _copy_into(source: Path, dest: Path) -> None:
+    """Hard-link (or copy) ``source`` to ``dest`` atomically, replacing any leftover file."""
+    tmp = dest.with_name(dest.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    try:
+        os.link(source, tmp)
+    except OSError:
+        shutil.copyfile(source, tmp)
+    os.replace(tmp, dest)
+
+
+def store_blob(
+    session: Session, root: Path, temp_path: Path, content_hash: str, filename: str,
+    keep_source: bool = False,
+) -> Tuple[str, bool]:
+    """
+    Take a fully written temp file into the store and count one more
+    reference (uncommitted). Returns (path relative to ``root``, whether the
+    file is new) so a caller whose commit fails can remove what it added.
+    ``keep_source`` copies instead of moving, leaving ``temp_path`` alone.
+    """
+    blob = session.get(Blob, content_hash, populate_existing=True)
+    if blob is not None and (root / blob.path).exists():
+        rel = blob.path
+        size = blob.size
+        if not keep_source:
+            Path(temp_path).unlink(missing_ok=True)
+        created = False
+    else:
+        rel = blob.path if blob is not None else blob_rel_path(content_hash, filename)
+        abs_path = root / rel
+        abs_path.parent.mkdir(parents=True, exist_ok=True)
+        size = Path(temp_path).stat().st_size
+        if keep_source:
+            _copy_into(Path(temp_path), abs_path)
+        else:
+            os.replace(temp_path, abs_path)
+        created = True
+    _add_reference(session, content_hash, rel, size)
+    return rel, created
+
+
+def release_blob(session: Session, root: Path, content_hash: Optional[str]) -> Optional[Path]:
+    """
+    Drop one reference (uncommitted). Returns the file to delete once the
+    transaction has committed if this was the last one, else None.
+    """
+    if not content_hash:
+        return None
+    session.exec(
+        update(Blob).where(Blob.content_hash == content_hash).values(refcount=Blob.refcount - 1)
+    )
+    blob = session.get(Blob, content_hash, populate_existing=True)
+    if blob is None or blob.refcount > 0:
+        return None
+    session.delete(blob)
+    return root / blob.path
+
+
+def remove_released(session: Session, paths: List[Optional[Path]]) -> None:
+    """
+    Unlink files released by release_blob() after commit, with their
+    thumbnails, unless re-uploaded meanwhile.
+    """
+    from .thumbnails import remove_thumbnails  # thumbnails imports crud, which imports us
+    for path in paths:
+        if path is None:
+            continue
+        content_hash = path.stem
+        if session.get(Blob, content_hash) is not None:
+            continue
+        try:
+            path.unlink(missing_ok=True)
+            remove_thumbnails(content_hash)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not remove {path}: {e}")
+
+
+def migrate_files_to_blobs(session: Session, root: Path) -> List[Path]:
+    """
+    Copy items still in the per-user layout into the blob store and point
+    them at it. Returns the original files, to delete only after the
+    transaction has committed; until then a rollback leaves every item
+    pointing at a file that still exists, and a rerun starts over cleanly.
+    """
+    items = session.exec(
+        select(Item).where(~Item.image_url.startswith(f"{BLOB_DIRNAME}/"))
+    ).all()
+    originals = []
+    for item in items:
+        old = root / item.image_url
+        if not old.exists():
+            continue
+        content_hash = item.content_hash or _file_sha256(old)
+        item.image_url, _ = store_blob(session, root, old, content_hash, item.image_url, keep_source=True)
+        item.content_hash = content_hash
+        session.add(item)
+        session.flush()
+        originals.append(old)
+    session.commit()
+    return originals
+
+
+def blob_store_info(session: Session) -> dict:
+    blobs = session.exec(select(Blob.refcount, Blob.size)).all()
+    return {
+        "blobs": len(blobs),
+        "references": sum(r for r, _ in blobs),
+        "bytes_stored": sum(s for _, s in blobs),
+        "bytes_saved": sum((r - 1) * s for r, s in blobs if r > 1),
+    }
@@ -0,0 +1,171 @@
+"""
+Many images in one request (POST /users/{user_id}/items/bulk).
+
+Files are streamed to temp files one by one (services/upload_stream.py);
+a .zip is streamed whole and its image members are extracted the same
+way, each capped at settings.max_upload_bytes. Duplicates are then found
+with one IN query over all hashes plus a check within the batch, the new
+items are inserted in a single transaction, and classification is queued
+for all of them together. Every file gets an outcome in the response.
+"""
+import asyncio
+import uuid
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import List
+
+from fastapi import UploadFile
+from sqlmodel import Session
+
+from .. import crud
+from ..config import settings
+from .classification_queue import enqueue_classifications
+from .color_analysis import analyze_item_color
+from .thumbnails import make_thumbnails
+from .upload_stream import (
+    IMAGE_EXTENSIONS, TEMP_PREFIX, UploadTooLarge, copy_hashing, discard_upload, stream_upload,
+)
+
+BULK_MAX_FILES = 200
+
+
+def _is_image(name: str) -> bool:
+    return name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def _discard_entries(entries: List[dict]) -> None:
+    for entry in entries:
+        if "tmp" in entry:
+            discard_upload(entry.pop("tmp"))
+
+
+def _extract_zip(zip_path: Path, archive: str, dest_dir: Path, max_bytes: int, room: int) -> List[dict]:
+    """Image members of a zip as entries (temp file + hash); runs in a worker thread."""
+    entries = []
+    try:
+        with zipfile.ZipFile(zip_path) as zf:
+            for info in zf.infolist():
+                name = PurePosixPath(info.filename)
+                if info.is_dir() or name.name.startswith(".") or "__MACOSX" in name.parts:
+                    continue
+                entry = {"filename": name.name, "archive": archive, "member": info.filename}
+                entries.append(entry)
+                if not _is_image(name.name):
+                    entry.update(status="rejected", error="not a JPG, PNG or WEBP image")
+                    continue
+                if len([e for e in entries if "tmp" in e]) >= room:
+                    entry.update(status="rejected", error=f"more than {BULK_MAX_FILES} files")
+                    continue
+                tmp = dest_dir / f"{TEMP_PREFIX}{uuid.uuid4().hex}.part"
+                try:
+                    with zf.open(info) as src:
+                        entry["hash"], entry["size"] = copy_hashing(src, tmp, max_bytes)
+                    entry["tmp"] = tmp
+                except UploadTooLarge as e:
+                    entry.update(status="too_large", error=str(e))
+                except Exception as e:
+                    entry.update(status="rejected", error=f"unreadable zip member: {e}")
+    except BaseException:
+        _discard_entries(entries)
+        raise
+    return entries
+
+
+async def collect_uploads(files: List[UploadFile], dest_dir: Path) -> List[dict]:
+    """
+    Stream every upload (and every image inside uploaded zips) to a temp
+    file. Entries that made it have "tmp", "hash" and "size"; the others
+    already carry their final "status" and "error". If anything raises, the
+    temp files written so far are removed before the error propagates.
+    """
+    entries: List[dict] = []
+
+    def accepted() -> int:
+        return sum("tmp" in e for e in entries)
+
+    try:
+        for file in files:
+            name = file.filename or "upload"
+            if name.lower().endswith(".zip"):
+                try:
+                    zip_tmp, _, _ = await stream_upload(file, dest_dir, settings.max_bulk_upload_bytes)
+                except UploadTooLarge as e:
+                    entries.append({"filename": name, "status": "too_large", "error": str(e)})
+                    continue
+                try:
+                    entries.extend(await asyncio.to_thread(
+                        _extract_zip, zip_tmp, name, dest_dir, settings.max_upload_bytes, BULK_MAX_FILES - accepted()
+                    ))
+                except zipfile.BadZipFile:
+                    entries.append({"filename": name, "status": "rejected", "error": "not a valid zip archive"})
+                finally:
+                    discard_upload(zip_tmp)
+                continue
+
+            entry = {"filename": name}
+            entries.append(entry)
+            if not _is_image(name):
+                entry.update(status="rejected", error="not a JPG, PNG or WEBP image")
+            elif accepted() >= BULK_MAX_FILES:
+                entry.update(status="rejected", error=f"more than {BULK_MAX_FILES} files")
+            else:
+                try:
+                    entry["tmp"], entry["hash"], entry["size"] = await stream_upload(
+                        file, dest_dir, settings.max_upload_bytes
+                    )
+                except UploadTooLarge as e:
+                    entry.update(status="too_large", error=str(e))
+    except BaseException:
+        # a later file failed (or the request was cancelled): don't strand the earlier ones
+        _discard_entries(entries)
+        raise
+    return entries
+
+
+def store_uploads(session: Session, user_id: int, entries: List[dict], allow_duplicate: bool) -> dict:
+    """Dedupe the streamed entries, insert the new items in one commit and queue classification."""
+    streamed = [e for e in entries if "tmp" in e]
+    existing = crud.find_items_by_hashes(session, user_id, {e["hash"] for e in streamed})
+
+    new, first_in_batch = [], {}
+    for entry in streamed:
+        h = entry["hash"]
+        if not allow_duplicate and h in existing:
+            entry.update(status="duplicate", existing_item_id=existing[h])
+        elif not allow_duplicate and h in first_in_batch:
+            entry.update(status="duplicate", duplicate_of=first_in_batch[h])
+        else:
+            first_in_batch.setdefault(h, entry)
+            # colour and thumbnails are made locally, as for single uploads
+            entry["colors"] = analyze_item_color(str(entry["tmp"]))
+            make_thumbnails(str(entry["tmp"]), h)
+            new.append(entry)
+            continue
+        discard_upload(entry.pop("tmp"))
+
+    try:
+        items = crud.create_items_with_files(session, user_id, new)
+    except Exception:
+        for entry in new:
+            discard_upload(entry["tmp"])
+        raise
+    for entry, item in zip(new, items):
+        entry.update(status="created", item_id=item.id)
+    for entry in streamed:
+        first = entry.pop("duplicate_of", None)
+        if first is not None:
+            entry["existing_item_id"] = first["item_id"]
+
+    if items and settings.auto_classify_on_upload:
+        enqueue_classifications(session, items)
+        print(f"⏳ {len(items)} bulk-uploaded items queued for classification")
+
+    results = []
+    for entry in entries:
+        for key in ("tmp", "hash", "colors"):
+            entry.pop(key, None)
+        results.append(entry)
+    counts = {}
+    for entry in results:
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+    return {"total": len(results), "counts": counts, "results": results}
@@ -0,0 +1,147 @@
+"""
+Vision predictions cached by image content.
+
+The same picture gets classified over and over: stock product photos,
+re-uploads with allow_duplicate=true, images shared between accounts. The
+prediction depends only on the bytes and on the model, prompt and image
+preprocessing, so it is stored in the classificationcacheentry table keyed
+on (content_hash, vision.CLASSIFIER_VERSION) and shared across users.
+Changing any of those changes the version, so stale predictions are never
+served.
+
+Predictions that came back as outfit_part "other" (unreadable image, empty
+model reply) or from a fallback provider are not stored; those are worth
+retrying. Concurrent misses
+for the same hash wait for one vision call.
+
+Lookups are read-only. Per-entry hit counts are kept in memory and added
+to the hits column in the same transaction as the next stored prediction,
+so a run of cache hits never competes for the database's write lock.
+"""
+import hashlib
+import json
+import threading
+from datetime import datetime
+from typing import Callable, Optional
+
+from sqlmodel import Session, func, select, update
+
+from ..db import engine
+from ..models import ClassificationCacheEntry
+from ..vision import CLASSIFIER_VERSION, PROVIDER, Prediction, classify_image
+
+_lock = threading.Lock()
+# content_hash → [lock held by the thread classifying it, threads holding or waiting for it];
+# dropped only when the count returns to 0, so every waiter shares one lock
+_inflight: dict = {}
+_stats = {"hits": 0, "misses": 0, "coalesced": 0, "skipped": 0}
+_pending_hits: dict = {}  # content_hash → hits not yet added to its row
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _lookup(content_hash: str) -> Optional[Prediction]:
+    try:
+        with Session(engine) as session:
+            row = session.get(ClassificationCacheEntry, (content_hash, CLASSIFIER_VERSION))
+            if row is None:
+                return None
+            with _lock:
+                _pending_hits[content_hash] = _pending_hits.get(content_hash, 0) + 1
+            return json.loads(row.prediction)
+    except Exception as e:
+        print(f"⚠️ Classification cache read failed: {e}")
+        return None
+
+
+def _store(content_hash: str, pred: Prediction) -> None:
+    with _lock:
+        hits = dict(_pending_hits)
+        _pending_hits.clear()
+    try:
+        with Session(engine) as session:
+            session.merge(ClassificationCacheEntry(
+                content_hash=content_hash,
+                version=CLASSIFIER_VERSION,
+                prediction=json.dumps(pred),
+                created_at=datetime.utcnow(),
+            ))
+            for h, n in hits.items():
+                session.exec(
+                    update(ClassificationCacheEntry)
+                    .where(ClassificationCacheEntry.content_hash == h, ClassificationCacheEntry.version == CLASSIFIER_VERSION)
+                    .values(hits=ClassificationCacheEntry.hits + n)
+                )
+            session.commit()
+    except Exception as e:
+        print(f"⚠️ Classification cache write failed: {e}")
+
+
+def classify_cached(
+    image_path: str,
+    content_hash: Optional[str] = None,
+    refresh: bool = False,
+    classify: Optional[Callable[[str, Optional[str]], Prediction]] = None,
+) -> Prediction:
+    """
+    classify_image() with the result cache in front. ``content_hash`` is the
+    item's stored sha256; it is computed from the file when missing.
+    ``refresh`` skips the lookup and overwrites the stored prediction.
+    ``classify`` replaces classify_image on a miss (e.g. with retries).
+    """
+    content_hash = content_hash or file_sha256(image_path)
+
+    with _lock:
+        entry = _inflight.setdefault(content_hash, [threading.Lock(), 0])
+        entry[1] += 1
+    key_lock = entry[0]
+    waited = not key_lock.acquire(blocking=False)
+    if waited:
+        key_lock.acquire()
+    try:
+        if not refresh:
+            pred = _lookup(content_hash)
+            if pred is not None:
+                with _lock:
+                    _stats["coalesced" if waited else "hits"] += 1
+                print(f"⚡ Classification cache hit for {content_hash[:12]}")
+                return pred
+
+        with _lock:
+            _stats["misses"] += 1
+        pred = (classify or classify_image)(image_path, content_hash)
+        if pred.get("outfit_part") == "other" or pred.get("provider", PROVIDER) != PROVIDER:
+            with _lock:
+                _stats["skipped"] += 1
+        else:
+            _store(content_hash, pred)
+        return pred
+    finally:
+        key_lock.release()
+        with _lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _inflight[content_hash]
+
+
+def classification_cache_info() -> dict:
+    with _lock:
+        hits = _stats["hits"] + _stats["coalesced"]
+        lookups = hits + _stats["misses"]
+        stats = {
+            **_stats,
+            "hit_ratio": round(hits / lookups, 3) if lookups else None,
+            "version": CLASSIFIER_VERSION,
+        }
+    try:
+        with Session(engine) as session:
+            stats["entries"] = session.exec(select(func.count()).select_from(ClassificationCacheEntry)).one()
+    except Exception:
+        stats["entries"] = None
+    return stats
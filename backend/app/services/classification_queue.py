@@ -0,0 +1,202 @@
+"""
+Background vision classification.
+
+Uploads no longer call the vision provider inline: they add a
+ClassificationJob row and return with the item's classification_status set
+to "pending". A pool of asyncio workers (settings.classify_concurrency of
+them) pulls job ids off an in-process queue and runs the blocking
+classification in a worker thread, so the event loop never waits on the
+provider.
+
+The job table is the source of truth. Jobs still pending or running when
+the process stopped are re-queued at the next startup, and jobs enqueued
+while no workers are running (scripts, tests) are picked up the same way.
+"""
+import asyncio
+from datetime import datetime
+from typing import List, Optional
+
+from sqlmodel import Session, select
+
+from .. import crud
+from ..db import engine
+from ..models import ClassificationJob, Item
+from .classification_cache import classify_cached
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+_queue: Optional[asyncio.Queue] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_workers: List[asyncio.Task] = []
+
+
+def enqueue_classification(session: Session, item: Item) -> ClassificationJob:
+    """Record a job for ``item``, mark it pending and wake a worker."""
+    existing = session.exec(
+        select(ClassificationJob).where(
+            ClassificationJob.item_id == item.id,
+            ClassificationJob.status.in_([JOB_PENDING, JOB_RUNNING]),
+        )
+    ).first()
+    if existing is not None:
+        return existing
+    job = ClassificationJob(item_id=item.id, user_id=item.user_id)
+    item.classification_status = JOB_PENDING
+    session.add(job)
+    session.add(item)
+    session.commit()
+    session.refresh(job)
+    session.refresh(item)
+    _notify(job.id)
+    return job
+
+
+def enqueue_classifications(session: Session, items: List[Item]) -> List[ClassificationJob]:
+    """enqueue_classification() for many items with one commit."""
+    active = set(session.exec(
+        select(ClassificationJob.item_id).where(
+            ClassificationJob.item_id.in_([item.id for item in items]),
+            ClassificationJob.status.in_([JOB_PENDING, JOB_RUNNING]),
+        )
+    ).all())
+    jobs = []
+    for item in items:
+        if item.id in active:
+            continue
+        jobs.append(ClassificationJob(item_id=item.id, user_id=item.user_id))
+        item.classification_status = JOB_PENDING
+        session.add(item)
+    session.add_all(jobs)
+    session.commit()
+    for job in jobs:
+        _notify(job.id)
+    return jobs
+
+
+def _notify(job_id: int) -> None:
+    if _loop is None or _queue is None or _loop.is_closed():
+        return  # picked up by the next start_workers()
+    _loop.call_soon_threadsafe(_queue.put_nowait, job_id)
+
+
+def _set_item_status(session: Session, item_id: int, status: str) -> Optional[Item]:
+    item = session.get(Item, item_id)
+    if item is not None:
+        item.classification_status = status
+        session.add(item)
+    return item
+
+
+def _run_job(job_id: int) -> None:
+    """Classify one job's item. Runs in a worker thread."""
+    with Session(engine) as session:
+        job = session.get(ClassificationJob, job_id)
+        if job is None or job.status not in (JOB_PENDING, JOB_RUNNING):
+            return
+        job.status = JOB_RUNNING
+        job.attempts += 1
+        job.started_at = datetime.utcnow()
+        item = _set_item_status(session, job.item_id, "processing")
+        session.add(job)
+        session.commit()
+
+        if item is None:
+            job.status = JOB_FAILED
+            job.error = "item not found"
+            job.finished_at = datetime.utcnow()
+            session.add(job)
+            session.commit()
+            return
+
+        try:
+            abs_path = (crud.STORAGE_ROOT / item.image_url).resolve()
+            pred = classify_cached(str(abs_path), item.content_hash)
+            job.status = JOB_DONE
+            crud.update_item_classification(session, item.id, pred)
+            print(f"✓ Job {job_id}: item {item.id} classified as {pred.get('category')} / {pred.get('color')}")
+        except Exception as e:
+            session.rollback()
+            print(f"❌ Job {job_id}: classification of item {job.item_id} failed: {e}")
+            job = session.get(ClassificationJob, job_id)
+            job.status = JOB_FAILED
+            job.error = str(e)[:500]
+            _set_item_status(session, job.item_id, "failed")
+        job.finished_at = datetime.utcnow()
+        session.add(job)
+        session.commit()
+
+
+async def _worker(name: str) -> None:
+    while True:
+        job_id = await _queue.get()
+        try:
+            await asyncio.to_thread(_run_job, job_id)
+        except Exception as e:
+            print(f"❌ {name}: job {job_id} crashed: {e}")
+        finally:
+            _queue.task_done()
+
+
+def _unfinished_job_ids() -> List[int]:
+    with Session(engine) as session:
+        rows = session.exec(
+            select(ClassificationJob.id)
+            .where(ClassificationJob.status.in_([JOB_PENDING, JOB_RUNNING]))
+            .order_by(ClassificationJob.id)
+        ).all()
+    return list(rows)
+
+
+async def start_workers(concurrency: int) -> None:
+    """Start the worker pool on the running loop and re-queue unfinished jobs."""
+    global _queue, _loop
+    _loop = asyncio.get_running_loop()
+    _queue = asyncio.Queue()
+    for n in range(max(1, concurrency)):
+        _workers.append(asyncio.create_task(_worker(f"classifier-{n}")))
+    resumed = _unfinished_job_ids()
+    for job_id in resumed:
+        _queue.put_nowait(job_id)
+    print(f"✅ Started {len(_workers)} classification workers ({len(resumed)} queued jobs resumed)")
+
+
+async def stop_workers() -> None:
+    global _queue, _loop
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _queue = None
+    _loop = None
+
+
+def classification_progress(session: Session, user_id: int) -> dict:
+    """Per-status job counts for a user plus their unfinished jobs."""
+    jobs = session.exec(
+        select(ClassificationJob).where(ClassificationJob.user_id == user_id)
+    ).all()
+    counts = {JOB_PENDING: 0, JOB_RUNNING: 0, JOB_DONE: 0, JOB_FAILED: 0}
+    for job in jobs:
+        counts[job.status] = counts.get(job.status, 0) + 1
+    active = [
+        {
+            "job_id": job.id,
+            "item_id": job.item_id,
+            "status": job.status,
+            "attempts": job.attempts,
+            "created_at": job.created_at,
+            "error": job.error,
+        }
+        for job in jobs
+        if job.status in (JOB_PENDING, JOB_RUNNING, JOB_FAILED)
+    ]
+    return {
+        "counts": counts,
+        "total": len(jobs),
+        "queue_depth": _queue.qsize() if _queue is not None else None,
+        "workers": len(_workers),
+        "jobs": active,
+    }
@@ -0,0 +1,237 @@
+"""
+Local dominant-colour extraction.
+
+The colour model's most important inputs are the item's hex/HSV, and
+asking the vision model to guess them gives numbers that drift between
+calls. analyze_item_color() measures them instead, with no network:
+
+1. decode with Pillow at reduced size (JPEG draft mode) to ~ANALYSIS_EDGE px
+2. drop transparent pixels and pixels close to the border colour (background)
+3. k-means in CIE Lab, so cluster distances follow perceived colour, then
+   merge clusters that are only shades of each other
+4. biggest cluster → primary colour; the next clearly different cluster
+   with enough coverage → secondary colour
+
+Names come from the nearest reference swatch in Lab, using the same
+vocabulary the vision prompt allows. Runs in a few tens of milliseconds
+per photo.
+"""
+import colorsys
+from typing import Optional
+
+import numpy as np
+from PIL import Image, ImageOps
+
+# bump when the algorithm or constants change (part of vision.CLASSIFIER_VERSION)
+COLOR_ANALYZER_VERSION = "lab-kmeans-1"
+
+ANALYSIS_EDGE = 96
+CLUSTERS = 5
+KMEANS_ITERATIONS = 12
+BACKGROUND_DELTA_E = 18.0  # pixels this close to the border colour are background
+MIN_FOREGROUND = 0.05  # below this, the item fills the frame or matches the backdrop
+MERGE_DELTA_E = 12.0  # clusters this close are one colour (shading, folds)
+SECONDARY_MIN_SHARE = 0.15
+SECONDARY_MIN_DELTA_E = 20.0
+
+# a few swatches per name, since "blue" covers denim as well as sky blue
+REFERENCE_SWATCHES = {
+    "black": ["#000000", "#1c1c1c", "#2b2b2b"],
+    "white": ["#ffffff", "#f2f2f2"],
+    "gray": ["#808080", "#555555", "#b4b4b4"],
+    "navy": ["#000080", "#1f2a44", "#23305a"],
+    "blue": ["#2f5fa8", "#4a78b5", "#87ceeb", "#0000ff"],
+    "green": ["#2e7d32", "#556b2f", "#8fbc8f", "#008000"],
+    "red": ["#c62828", "#8b0000", "#800020", "#ff0000"],
+    "yellow": ["#fdd835", "#f0e68c", "#ffff00"],
+    "orange": ["#ef6c00", "#ffa500", "#d2691e"],
+    "brown": ["#6d4c41", "#8b5a2b", "#4e342e", "#a0522d"],
+    "beige": ["#d8c3a5", "#f5f5dc", "#d2b48c", "#c8b28e"],
+    "cream": ["#fffdd0", "#f3e9d2"],
+    "purple": ["#6a1b9a", "#800080", "#b39ddb"],
+    "pink": ["#f48fb1", "#ffc0cb", "#e75480"],
+}
+
+
+def _hex_to_rgb(hex_color: str) -> tuple:
+    h = hex_color.lstrip("#")
+    return int(h[0:2], 16), int(h[2:4], 16), int(h[4:6], 16)
+
+
+def rgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """(..., 3) sRGB 0-255 → (..., 3) CIE Lab (D65)."""
+    c = np.asarray(rgb, dtype=np.float64) / 255.0
+    c = np.where(c > 0.04045, ((c + 0.055) / 1.055) ** 2.4, c / 12.92)
+    xyz = c @ np.array([
+        [0.4124564, 0.2126729, 0.0193339],
+        [0.3575761, 0.7151522, 0.1191920],
+        [0.1804375, 0.0721750, 0.9503041],
+    ])
+    xyz /= np.array([0.95047, 1.0, 1.08883])
+    f = np.where(xyz > 216 / 24389, np.cbrt(xyz), (24389 / 27 * xyz + 16) / 116)
+    return np.stack([
+        116 * f[..., 1] - 16,
+        500 * (f[..., 0] - f[..., 1]),
+        200 * (f[..., 1] - f[..., 2]),
+    ], axis=-1)
+
+
+def lab_to_rgb(lab: np.ndarray) -> np.ndarray:
+    """Inverse of rgb_to_lab, clipped to 0-255 ints."""
+    lab = np.asarray(lab, dtype=np.float64)
+    fy = (lab[..., 0] + 16) / 116
+    fx = fy + lab[..., 1] / 500
+    fz = fy - lab[..., 2] / 200
+    f = np.stack([fx, fy, fz], axis=-1)
+    xyz = np.where(f ** 3 > 216 / 24389, f ** 3, (116 * f - 16) / (24389 / 27))
+    xyz *= np.array([0.95047, 1.0, 1.08883])
+    c = xyz @ np.array([
+        [3.2404542, -0.9692660, 0.0556434],
+        [-1.5371385, 1.8760108, -0.2040259],
+        [-0.4985314, 0.0415560, 1.0572252],
+    ])
+    c = np.clip(c, 0, 1)
+    c = np.where(c > 0.0031308, 1.055 * c ** (1 / 2.4) - 0.055, 12.92 * c)
+    return np.clip(np.round(c * 255), 0, 255).astype(int)
+
+
+_SWATCH_NAMES = [name for name, swatches in REFERENCE_SWATCHES.items() for _ in swatches]
+_SWATCH_LAB = rgb_to_lab(np.array([
+    _hex_to_rgb(h) for swatches in REFERENCE_SWATCHES.values() for h in swatches
+]))
+
+
+def nearest_color_name(lab) -> str:
+    d = np.linalg.norm(_SWATCH_LAB - np.asarray(lab), axis=1)
+    return _SWATCH_NAMES[int(np.argmin(d))]
+
+
+def _load_pixels(image_path: str) -> tuple:
+    """(rgb pixels (h, w, 3) uint8, opaque mask (h, w)) at analysis size."""
+    with Image.open(image_path) as img:
+        img.draft("RGB", (ANALYSIS_EDGE * 2, ANALYSIS_EDGE * 2))  # JPEG: decode at 1/2..1/8 scale
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((ANALYSIS_EDGE, ANALYSIS_EDGE))
+        if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+            rgba = np.asarray(img.convert("RGBA"))
+            return rgba[..., :3], rgba[..., 3] >= 128
+        rgb = np.asarray(img.convert("RGB"))
+    return rgb, np.ones(rgb.shape[:2], dtype=bool)
+
+
+def _foreground_mask(lab: np.ndarray, opaque: np.ndarray) -> np.ndarray:
+    """(h, w) mask of garment pixels: opaque and not the border colour."""
+    if not opaque.all():
+        return opaque  # cut-out: transparency already is the mask
+    border = np.concatenate([lab[0], lab[-1], lab[:, 0], lab[:, -1]])
+    background = np.median(border, axis=0)
+    keep = np.linalg.norm(lab - background, axis=2) > BACKGROUND_DELTA_E
+    if keep.mean() < MIN_FOREGROUND:
+        return np.ones_like(keep)
+    return keep
+
+
+def load_garment(image_path: str) -> tuple:
+    """(Lab image (h, w, 3), garment mask (h, w)) at analysis size. Raises if unreadable."""
+    rgb, opaque = _load_pixels(image_path)
+    lab = rgb_to_lab(rgb)
+    return lab, _foreground_mask(lab, opaque)
+
+
+def _kmeans(points: np.ndarray, k: int) -> tuple:
+    """Deterministic k-means (k-means++ seeding, fixed seed) → (centres, counts)."""
+    rng = np.random.default_rng(0)
+    k = min(k, len(points))
+    centres = [points[rng.integers(len(points))]]
+    for _ in range(1, k):
+        d2 = np.min(((points[:, None, :] - np.array(centres)[None]) ** 2).sum(axis=2), axis=1)
+        if d2.sum() == 0:
+            break
+        centres.append(points[rng.choice(len(points), p=d2 / d2.sum())])
+    centres = np.array(centres)
+
+    for _ in range(KMEANS_ITERATIONS):
+        labels = ((points[:, None, :] - centres[None]) ** 2).sum(axis=2).argmin(axis=1)
+        moved = np.array([
+            points[labels == j].mean(axis=0) if np.any(labels == j) else centres[j]
+            for j in range(len(centres))
+        ])
+        if np.allclose(moved, centres, atol=0.5):
+            centres = moved
+            break
+        centres = moved
+    labels = ((points[:, None, :] - centres[None]) ** 2).sum(axis=2).argmin(axis=1)
+    return centres, np.bincount(labels, minlength=len(centres))
+
+
+def _merge_close(centres: np.ndarray, counts: np.ndarray) -> tuple:
+    """Fold each cluster into a bigger one within MERGE_DELTA_E (count-weighted centres)."""
+    merged_c, merged_n = [], []
+    for j in np.argsort(-counts):
+        if counts[j] == 0:
+            continue
+        for m in range(len(merged_c)):
+            if np.linalg.norm(merged_c[m] - centres[j]) < MERGE_DELTA_E:
+                total = merged_n[m] + counts[j]
+                merged_c[m] = (merged_c[m] * merged_n[m] + centres[j] * counts[j]) / total
+                merged_n[m] = total
+                break
+        else:
+            merged_c.append(centres[j].astype(np.float64))
+            merged_n.append(counts[j])
+    return np.array(merged_c), np.array(merged_n)
+
+
+def _describe(lab) -> dict:
+    r, g, b = (int(v) for v in lab_to_rgb(lab))
+    h, s, v = colorsys.rgb_to_hsv(r / 255, g / 255, b / 255)
+    return {
+        "hex": f"#{r:02x}{g:02x}{b:02x}",
+        "hsv": f"{round(h * 360) % 360},{round(s * 100)},{round(v * 100)}",
+        "name": nearest_color_name(lab),
+    }
+
+
+def dominant_colors(points: np.ndarray) -> dict:
+    """Primary/secondary colour of garment pixels (n, 3) in Lab; see analyze_item_color()."""
+    centres, counts = _merge_close(*_kmeans(points, CLUSTERS))
+    order = np.argsort(-counts)
+    total = counts.sum()
+    primary = centres[order[0]]
+
+    secondary = None
+    for j in order[1:]:
+        if counts[j] / total < SECONDARY_MIN_SHARE:
+            break
+        if np.linalg.norm(centres[j] - primary) >= SECONDARY_MIN_DELTA_E:
+            secondary = _describe(centres[j])
+            break
+
+    main = _describe(primary)
+    if secondary is not None and secondary["name"] == main["name"]:
+        secondary = None
+    return {
+        "color": main["name"],
+        "color_hex": main["hex"],
+        "color_hsv": main["hsv"],
+        "secondary_color": secondary["name"] if secondary else "",
+        "secondary_color_hex": secondary["hex"] if secondary else None,
+        "coverage": round(float(counts[order[0]] / total), 3),
+    }
+
+
+def analyze_item_color(image_path: str) -> Optional[dict]:
+    """
+    Measured colours of the garment in ``image_path``, keyed like a vision
+    Prediction: color, color_hex, color_hsv, secondary_color (plus
+    secondary_color_hex and coverage, the primary cluster's share of the
+    garment). None if the image can't be read.
+    """
+    try:
+        lab, mask = load_garment(image_path)
+    except Exception as e:
+        print(f"⚠️ Colour analysis could not read {image_path}: {e}")
+        return None
+    if not mask.any():
+        return None
+    return dominant_colors(lab[mask])
@@ -0,0 +1,192 @@
+"""
+Rule-based colour scoring used when a combo lacks the HSV data the ML model
+needs. Works purely on colour names (COLOR_HEX_MAP + the vision vocabulary).
+
+The score only depends on the multiset of names, so results are memoized on
+the sorted name tuple (bounded LRU, see rule_score_cache_info()). With
+RULE_SCORE_LUT_MAX_COLORS set, every multiset up to that size is precomputed
+at startup (build_rule_score_lut) so those palettes cost one dict lookup.
+"""
+import itertools
+from functools import lru_cache
+from typing import Optional
+
+from ..aimodel import hue_distance
+
+
+def _color_key(c: Optional[str]) -> str:
+    return (c or "").lower().strip()
+
+
+COLOR_HEX_MAP = {
+    "black": "#000000", "white": "#ffffff", "gray": "#808080", "grey": "#808080",
+    "navy": "#000080", "blue": "#0000ff", "light blue": "#87ceeb", "dark blue": "#00008b",
+    "red": "#ff0000", "dark red": "#8b0000", "burgundy": "#800020", "green": "#008000",
+    "dark green": "#006400", "olive": "#808000", "yellow": "#ffff00", "orange": "#ffa500",
+    "brown": "#a52a2a", "beige": "#f5f5dc", "tan": "#d2b48c", "cream": "#fffdd0",
+    "pink": "#ffc0cb", "purple": "#800080", "lavender": "#e6e6fa", "maroon": "#800000",
+    "teal": "#008080", "khaki": "#f0e68c", "ivory": "#fffff0", "gold": "#ffd700",
+    "silver": "#c0c0c0", "multicolor": "#808080",
+}
+
+
+def hex_to_hsl(hex_color: str):
+    hex_color = hex_color.lstrip("#")
+    r = int(hex_color[0:2], 16) / 255.0
+    g = int(hex_color[2:4], 16) / 255.0
+    b = int(hex_color[4:6], 16) / 255.0
+    c_max = max(r, g, b)
+    c_min = min(r, g, b)
+    delta = c_max - c_min
+    l = (c_max + c_min) / 2.0
+    if delta == 0:
+        return 0.0, 0.0, l
+    s = delta / (1 - abs(2 * l - 1))
+    if c_max == r:
+        h = 60 * (((g - b) / delta) % 6)
+    elif c_max == g:
+        h = 60 * (((b - r) / delta) + 2)
+    else:
+        h = 60 * (((r - g) / delta) + 4)
+    return h, s, l
+
+
+# HSL of every named colour, converted once instead of per combo
+_NAME_HSL = {name: hex_to_hsl(hex_val) for name, hex_val in COLOR_HEX_MAP.items()}
+_UNKNOWN_HSL = hex_to_hsl("#808080")
+
+
+def is_neutral_fallback(h: float, s: float, l: float) -> bool:
+    if s < 0.18:
+        return True
+    if 200 <= h <= 260 and l < 0.35 and s < 0.6:
+        return True
+    if 10 <= h <= 70 and s < 0.65 and 0.2 <= l <= 0.9:
+        return True
+    return False
+
+
+def _score_palette(colors: tuple) -> float:
+    """Score a tuple of normalised colour names (at least two)."""
+    hsl_colors = [_NAME_HSL.get(c, _UNKNOWN_HSL) for c in colors]
+    neutrals = 0
+    brights = 0
+    has_light = False
+    has_dark = False
+    hues = []
+    has_navy = False
+    has_white = False
+    earth_tones = 0
+
+    for i, (h, s, l) in enumerate(hsl_colors):
+        color_name = colors[i]
+        if color_name in (
+            "black","white","grey","gray","navy","brown",
+            "beige","tan","khaki","cream","ivory",
+            "olive","silver","multicolor"
+        ):
+            neutrals += 1
+        elif is_neutral_fallback(h, s, l):
+            neutrals += 1
+        if (
+            s > 0.65 and 0.25 < l < 0.8
+            and color_name not in ("khaki","beige","tan","brown","olive","navy")
+        ):
+            brights += 1
+        if l > 0.7:
+            has_light = True
+        if l < 0.3:
+            has_dark = True
+        hues.append(h)
+        if color_name == "navy":
+            has_navy = True
+        if color_name in ("white", "cream", "ivory"):
+            has_white = True
+        if color_name in ("beige", "tan", "brown", "khaki", "olive"):
+            earth_tones += 1
+
+    score = 0.0
+    n = len(colors)
+    if n <= 3:
+        if neutrals >= 2:
+            score += 3
+        elif neutrals == 1:
+            score += 2
+    else:
+        if neutrals >= 3:
+            score += 4
+        elif neutrals == 2:
+            score += 3
+        elif neutrals == 1:
+            score += 1
+    if brights <= 1:
+        score += 3
+    elif brights == 2:
+        score += 1
+    if has_light and has_dark:
+        score += 2
+    complementary = False
+    analogous = False
+    for i in range(len(hues)):
+        for j in range(i + 1, len(hues)):
+            d = hue_distance(hues[i], hues[j])
+            if d <= 30:
+                analogous = True
+            if 150 <= d <= 210:
+                complementary = True
+    if analogous:
+        score += 1
+    if complementary:
+        score += 1
+    if earth_tones >= 2 and neutrals >= 2:
+        score += 1.5
+    if has_navy and has_white and neutrals >= 2:
+        score += 1
+    return round(min(score, 10.0), 1)
+
+
+RULE_CACHE_SIZE = 4096
+
+# multiset → score, filled by build_rule_score_lut()
+_RULE_LUT: dict = {}
+
+
+@lru_cache(maxsize=RULE_CACHE_SIZE)
+def _score_palette_cached(colors: tuple) -> float:
+    return _score_palette(colors)
+
+
+def _palette_key(color_names) -> tuple:
+    return tuple(sorted(_color_key(c) for c in color_names if c))
+
+
+def score_outfit_colors(color_names: list[str]) -> float:
+    key = _palette_key(color_names)
+    if len(key) < 2:
+        return 5.0
+    score = _RULE_LUT.get(key)
+    if score is None:
+        score = _score_palette_cached(key)
+    return score
+
+
+def build_rule_score_lut(max_colors: int) -> int:
+    """Precompute scores for every multiset of 2..max_colors known colour names."""
+    names = sorted(COLOR_HEX_MAP)
+    for size in range(2, max_colors + 1):
+        for key in itertools.combinations_with_replacement(names, size):
+            _RULE_LUT[key] = _score_palette(key)
+    return len(_RULE_LUT)
+
+
+def rule_score_cache_info() -> dict:
+    info = _score_palette_cached.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_ratio": round(info.hits / lookups, 3) if lookups else None,
+        "size": info.currsize,
+        "maxsize": info.maxsize,
+        "lut_size": len(_RULE_LUT),
+    }
@@ -252,20 +252,29 @@ def _template_match_count(wardrobe: List[Item], template: Dict) -> int:
 
 
 
-def compute_gap_recommendations(session: Session, user_id: int, limit: int = 3) -> List[Dict]:
+def compute_gap_recommendations(
+    session: Session,
+    user_id: int,
+    limit: int = 3,
+    wardrobe: Optional[List[Item]] = None,
+    history: Optional[List[OutfitHistory]] = None,
+) -> List[Dict]:
+    """Pass ``wardrobe``/``history`` (e.g. from a wardrobe snapshot) to skip the queries."""
     target_limit = max(1, min(limit, 6))
     min_needed = 3 if target_limit >= 3 else target_limit
 
     templates = load_templates()
     templates_by_id = {str(t.get("id")): t for t in templates}
 
-    wardrobe = session.exec(select(Item).where(Item.user_id == user_id)).all()
-    history = session.exec(
-        select(OutfitHistory)
-        .where(OutfitHistory.user_id == user_id)
-        .order_by(OutfitHistory.created_at.desc())
-        .limit(50)
-    ).all()
+    if wardrobe is None:
+        wardrobe = session.exec(select(Item).where(Item.user_id == user_id)).all()
+    if history is None:
+        history = session.exec(
+            select(OutfitHistory)
+            .where(OutfitHistory.user_id == user_id)
+            .order_by(OutfitHistory.created_at.desc())
+            .limit(50)
+        ).all()
 
     slot_counts = Counter(_norm(getattr(item, "outfit_part", None)) for item in wardrobe)
     has_neutral_top = any(
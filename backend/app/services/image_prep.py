@@ -0,0 +1,122 @@
+"""
+Shrink uploaded photos before they go to the vision provider.
+
+Phone photos are 3-12 MB; the provider needs far less to name a garment.
+prepare_for_vision() applies the EXIF orientation, crops to the area that
+differs from the background, downscales to settings.vision_max_edge and
+re-encodes as JPEG. The result is written to STORAGE_ROOT/vision/ under the
+image's content hash, so reclassifying the same picture (any user, any
+item) reuses it.
+
+Files Pillow can't open are sent as-is with the MIME type from their
+extension.
+"""
+import hashlib
+import mimetypes
+import os
+import uuid
+from io import BytesIO
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from .. import crud
+from ..config import settings
+
+CACHE_DIRNAME = "vision"
+CROP_PROBE_EDGE = 256  # bounding box is found on a thumbnail this size
+CROP_THRESHOLD = 60  # summed RGB distance from the background colour
+CROP_MIN_FILL = 0.02  # fraction of a row/column that must be foreground
+CROP_PADDING = 0.05
+
+
+def prep_version() -> str:
+    """Identifies the preprocessing settings (part of the classification cache key)."""
+    return f"jpeg{settings.vision_max_edge}q{settings.vision_jpeg_quality}"
+
+
+def _cache_path(content_hash: str) -> Path:
+    return crud.STORAGE_ROOT / CACHE_DIRNAME / f"{content_hash}-{prep_version()}.jpg"
+
+
+def _flatten(img: Image.Image) -> Image.Image:
+    """RGB on a white background (transparent PNG/WEBP cut-outs stay readable)."""
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        img = img.convert("RGBA")
+        bg = Image.new("RGB", img.size, (255, 255, 255))
+        bg.paste(img, mask=img.getchannel("A"))
+        return bg
+    return img.convert("RGB")
+
+
+def garment_box(img: Image.Image) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Bounding box of whatever stands out from the border colour, padded, in
+    ``img`` coordinates. None when nothing stands out or the box is
+    practically the whole frame.
+    """
+    probe = img.copy()
+    probe.thumbnail((CROP_PROBE_EDGE, CROP_PROBE_EDGE))
+    a = np.asarray(probe, dtype=np.int16)
+    h, w = a.shape[:2]
+    border = np.concatenate([a[0], a[-1], a[:, 0], a[:, -1]])
+    background = np.median(border, axis=0)
+    fg = np.abs(a - background).sum(axis=2) > CROP_THRESHOLD
+
+    rows = np.flatnonzero(fg.mean(axis=1) > CROP_MIN_FILL)
+    cols = np.flatnonzero(fg.mean(axis=0) > CROP_MIN_FILL)
+    if len(rows) == 0 or len(cols) == 0:
+        return None
+
+    pad_y, pad_x = int(h * CROP_PADDING), int(w * CROP_PADDING)
+    top, bottom = max(0, rows[0] - pad_y), min(h, rows[-1] + 1 + pad_y)
+    left, right = max(0, cols[0] - pad_x), min(w, cols[-1] + 1 + pad_x)
+    if (bottom - top) * (right - left) > 0.9 * h * w:
+        return None
+
+    sx, sy = img.width / w, img.height / h
+    return (int(left * sx), int(top * sy), int(round(right * sx)), int(round(bottom * sy)))
+
+
+def preprocess_image(data: bytes) -> bytes:
+    """Orient, crop, downscale and JPEG-encode raw image bytes."""
+    with Image.open(BytesIO(data)) as src:
+        img = _flatten(ImageOps.exif_transpose(src))
+    box = garment_box(img)
+    if box is not None:
+        img = img.crop(box)
+    edge = settings.vision_max_edge
+    img.thumbnail((edge, edge), Image.LANCZOS)
+    out = BytesIO()
+    img.save(out, format="JPEG", quality=settings.vision_jpeg_quality, optimize=True)
+    return out.getvalue()
+
+
+def prepare_for_vision(image_path: str, content_hash: Optional[str] = None) -> Tuple[bytes, str]:
+    """(payload, mime type) to send for ``image_path``, from the disk cache when possible."""
+    data = None
+    if content_hash is None:
+        data = Path(image_path).read_bytes()
+        content_hash = hashlib.sha256(data).hexdigest()
+
+    cached = _cache_path(content_hash)
+    if cached.exists():
+        return cached.read_bytes(), "image/jpeg"
+
+    if data is None:
+        data = Path(image_path).read_bytes()
+    try:
+        payload = preprocess_image(data)
+    except Exception as e:
+        print(f"⚠️ Could not preprocess {image_path}: {e}; sending the original")
+        mime = mimetypes.guess_type(image_path)[0] or "image/jpeg"
+        return data, mime
+
+    cached.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cached.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    tmp.write_bytes(payload)
+    os.replace(tmp, cached)
+    print(f"🗜️ Vision payload {len(data) // 1024} KB → {len(payload) // 1024} KB")
+    return payload, "image/jpeg"
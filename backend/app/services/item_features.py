@@ -0,0 +1,103 @@
+"""
+Per-item colour/formality features stored on the Item row.
+
+The scorer needs HSV as floats and the formality rank for every piece of
+every combo. Parsing ``primary_color_hsv`` strings on each request is wasted
+work, so the numbers are computed once whenever an item's colour or
+formality is written (crud.update_item / crud.update_item_classification)
+and read back from the row. The saturation/value thresholds are applied by
+aimodel.extract_features_batch() over the whole HSV matrix. Rows written
+before these columns existed are filled by backfill_color_features() in
+migration 6 (migrations.py).
+"""
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy import or_
+from sqlmodel import Session, select
+
+from ..enums import formality_rank
+from ..models import Item
+
+FEATURE_COLUMNS = ("color_hue", "color_sat", "color_val", "formality_rank")
+
+
+def parse_hsv(value: Optional[str]) -> Optional[tuple]:
+    """"h,s,v" → (h, s, v) floats, or None if missing/unparseable."""
+    if not value:
+        return None
+    try:
+        parts = value.split(",")
+        return float(parts[0]), float(parts[1]), float(parts[2])
+    except (ValueError, IndexError):
+        return None
+
+
+def compute_color_features(hsv_str: Optional[str], formality) -> dict:
+    """Column values for an item with the given HSV string and formality."""
+    hsv = parse_hsv(hsv_str)
+    if hsv is None:
+        features = {name: None for name in FEATURE_COLUMNS}
+    else:
+        h, s, v = hsv
+        features = {"color_hue": h, "color_sat": s, "color_val": v}
+    features["formality_rank"] = formality_rank(formality) if formality else None
+    return features
+
+
+def refresh_color_features(item) -> None:
+    """Recompute the cached feature columns from the item's current fields."""
+    features = compute_color_features(item.primary_color_hsv, item.formality)
+    for name, value in features.items():
+        setattr(item, name, value)
+
+
+def item_hsv(item) -> Optional[tuple]:
+    """(h, s, v) for an item, from the cached columns when they are filled."""
+    if item is None:
+        return None
+    hue = getattr(item, "color_hue", None)
+    if hue is not None:
+        return hue, item.color_sat, item.color_val
+    return parse_hsv(getattr(item, "primary_color_hsv", None))
+
+
+def item_formality_rank(item) -> Optional[int]:
+    if item is None:
+        return None
+    rank = getattr(item, "formality_rank", None)
+    if rank is not None:
+        return rank
+    form = getattr(item, "formality", None)
+    return formality_rank(form) if form else None
+
+
+def hsv_matrix(outfits: List[list]):
+    """
+    Stack [top, bottom, outer, shoes] item lists into the (hsv_matrix, missing)
+    pair score_outfits_ml_batch() takes, like aimodel.parse_hsv_rows().
+    """
+    matrix = np.zeros((len(outfits), 4, 3))
+    missing = np.ones((len(outfits), 4), dtype=bool)
+    for i, pieces in enumerate(outfits):
+        for j, piece in enumerate(pieces):
+            hsv = item_hsv(piece)
+            if hsv is not None:
+                matrix[i, j] = hsv
+                missing[i, j] = False
+    return matrix, missing
+
+
+def backfill_color_features(session: Session) -> int:
+    """Fill the feature columns for rows that have colour/formality data but no cache yet."""
+    stmt = select(Item).where(or_(
+        (Item.primary_color_hsv.is_not(None)) & (Item.color_hue.is_(None)),
+        (Item.formality.is_not(None)) & (Item.formality_rank.is_(None)),
+    ))
+    items = session.exec(stmt).all()
+    for item in items:
+        refresh_color_features(item)
+        session.add(item)
+    if items:
+        session.commit()
+    return len(items)
@@ -0,0 +1,74 @@
+"""
+Offline item classification: measured colours plus a silhouette heuristic.
+
+This is the "local" vision provider. It answers in tens of milliseconds
+with no network, so it serves as the fallback when the remote provider is
+slow or down (VISION_PROVIDERS=openai,local) or as the only provider.
+
+Colours come from color_analysis. The outfit part is guessed from the
+garment's bounding box on a plain backdrop: tall and narrow → bottom, wide
+and low → shoes, anything else → top. The category is a fixed default per
+part (blue/navy bottoms → jeans, other bottoms → pants, shoes → sneakers,
+tops → t_shirt); formality is always casual and season all_season. It is
+deliberately rough: users can correct it, and a later remote
+classification overwrites it.
+"""
+import numpy as np
+
+from .color_analysis import dominant_colors, load_garment
+
+# bump when the rules change (part of vision.CLASSIFIER_VERSION when local is primary)
+LOCAL_CLASSIFIER_VERSION = "silhouette-1"
+
+BOTTOM_MIN_ASPECT = 1.45  # box height / width
+SHOES_MAX_ASPECT = 0.65
+FULL_FRAME = 0.95  # the garment fills the photo; the box says nothing about shape
+MIN_FILL = 0.02  # share of a row/column that must be garment to count
+
+
+def silhouette(mask: np.ndarray) -> dict:
+    """Bounding-box aspect (h / w) and frame coverage of a garment mask."""
+    rows = np.flatnonzero(mask.mean(axis=1) > MIN_FILL)
+    cols = np.flatnonzero(mask.mean(axis=0) > MIN_FILL)
+    if len(rows) == 0 or len(cols) == 0:
+        return {"aspect": 1.0, "coverage": 1.0}
+    h, w = rows[-1] - rows[0] + 1, cols[-1] - cols[0] + 1
+    return {"aspect": h / w, "coverage": (h * w) / mask.size}
+
+
+def _outfit_part(shape: dict) -> str:
+    if shape["coverage"] >= FULL_FRAME:
+        return "top"
+    if shape["aspect"] >= BOTTOM_MIN_ASPECT:
+        return "bottom"
+    if shape["aspect"] <= SHOES_MAX_ASPECT:
+        return "shoes"
+    return "top"
+
+
+def _category(part: str, color: str) -> str:
+    if part == "bottom":
+        return "jeans" if color in ("blue", "navy") else "pants"
+    if part == "shoes":
+        return "sneakers"
+    return "t_shirt"
+
+
+def classify_locally(image_path: str, content_hash=None) -> dict:
+    """A vision Prediction for ``image_path`` without any network call."""
+    lab, mask = load_garment(image_path)
+    if not mask.any():
+        raise ValueError("image is fully transparent")
+    colors = dominant_colors(lab[mask])
+    part = _outfit_part(silhouette(mask))
+    return {
+        "category": _category(part, colors["color"]),
+        "outfit_part": part,
+        "color": colors["color"],
+        "color_hex": colors["color_hex"],
+        "color_hsv": colors["color_hsv"],
+        "secondary_color": colors["secondary_color"],
+        # a wrong season hides the item from suggestions, so don't guess one
+        "season": "all_season",
+        "formality": "casual",
+    }
@@ -0,0 +1,480 @@
+"""
+Exhaustive, vectorized outfit search.
+
+Every candidate item is turned into numeric features once (hue, saturation,
+value, formality rank, season mask, colour ids).  Combos are then scored with
+NumPy broadcasting over flat index ranges of the full
+top × bottom × outer × shoes product, one chunk at a time, keeping a running
+top-K — so the best outfit is always found instead of hoping it lands in a
+random sample.
+
+Scoring mirrors _score_outfit in main.py:
+
+    score = colour score (ML when top+bottom have HSV, rule-based otherwise)
+          - distance of each piece from the requested formality
+          - 0.5 × formality spread across the pieces
+          - 10 if the colour fingerprint was already liked/disliked
+
+Combos whose formality spread is more than one level are incompatible and
+never returned.
+
+top_k_bnb() is a branch-and-bound alternative for anchor-less searches on
+large wardrobes: it bounds the best score reachable from every
+(top, bottom) pair, expands pairs best-first and stops once no remaining
+pair can beat the current K-th best.
+"""
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+from ..aimodel import trained_model, forest_upper_bound, score_outfits_ml_batch
+from ..enums import formality_rank
+from .color_rules import score_outfit_colors
+from .item_features import item_hsv, item_formality_rank
+
+SLOTS = ("top", "bottom", "outer", "shoes")
+
+SEASON_BITS = {"spring": 1, "summer": 2, "fall": 4, "winter": 8}
+ALL_SEASONS = 15
+
+TOP_K = 50
+CHUNK_ROWS = 65536
+BOUND_CHUNK = 1024
+# below this many combos exhaustive search is already cheap
+BNB_MIN_COMBOS = 20000
+FINGERPRINT_PENALTY = 10.0
+
+def _enum_value(value) -> Optional[str]:
+    if value is None:
+        return None
+    return str(value.value) if hasattr(value, "value") else str(value)
+
+
+def season_mask(value) -> int:
+    """Bitmask of the seasons an item (or a requested season) covers."""
+    raw = _enum_value(value)
+    if not raw or raw in ("all_season", "any"):
+        return ALL_SEASONS
+    bits = 0
+    for part in raw.split("_"):
+        bits |= SEASON_BITS.get(part, 0)
+    return bits
+
+
+def outfit_color_fingerprint(outfit: dict) -> str:
+    colors = sorted(
+        c for c in (
+            getattr(outfit.get("top"),    "primary_color", None),
+            getattr(outfit.get("bottom"), "primary_color", None),
+            getattr(outfit.get("outer"),  "primary_color", None),
+            getattr(outfit.get("shoes"),  "primary_color", None),
+        ) if c
+    )
+    return ",".join(colors)
+
+
+def item_feature_row(item) -> tuple:
+    """
+    Everything SlotFeatures needs from one item:
+    (hsv or None, has_hsv, formality rank or None, season bits, primary colour, palette).
+    """
+    primary = getattr(item, "primary_color", None)
+    return (
+        item_hsv(item),
+        getattr(item, "primary_color_hsv", None) is not None,
+        item_formality_rank(item),
+        season_mask(getattr(item, "season", None)),
+        primary or None,
+        (primary, getattr(item, "secondary_color", None)),
+    )
+
+
+class SlotFeatures:
+    """
+    Numeric view of one slot's candidate pool. ``None`` entries are an empty slot.
+
+    ``feature_rows`` optionally maps item id → item_feature_row() computed
+    ahead of time (see services/wardrobe_cache.py).
+    """
+
+    def __init__(self, items: Iterable, feature_rows: Optional[dict] = None):
+        self.items = list(items)
+        n = len(self.items)
+        self.hsv = np.zeros((n, 3))
+        self.has_hsv = np.zeros(n, dtype=bool)   # HSV string set → ML eligible
+        self.parsed = np.zeros(n, dtype=bool)    # HSV string parsed → counts as a piece
+        self.rank = np.full(n, np.nan)           # NaN when formality is unknown
+        self.season = np.full(n, ALL_SEASONS, dtype=np.int64)
+        self.colors: List[Optional[str]] = []
+        self.palettes: List[tuple] = []
+
+        for i, item in enumerate(self.items):
+            if item is None:
+                self.colors.append(None)
+                self.palettes.append((None, None))
+                continue
+            row = feature_rows.get(item.id) if feature_rows else None
+            if row is None:
+                row = item_feature_row(item)
+            hsv, self.has_hsv[i], rank, self.season[i], primary, palette = row
+            if hsv is not None:
+                self.hsv[i] = hsv
+                self.parsed[i] = True
+            if rank is not None:
+                self.rank[i] = rank
+            self.colors.append(primary)
+            self.palettes.append(palette)
+
+
+def _hue_dist(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    d = np.abs(a[:, None] - b[None, :])
+    return np.minimum(d, 360 - d)
+
+
+def _range(values: np.ndarray):
+    return values.min(), values.max()
+
+
+def _merge_top_k(scores, flat, new_scores, new_flat, k: int):
+    scores = np.concatenate([scores, new_scores])
+    flat = np.concatenate([flat, new_flat])
+    if len(scores) > k:
+        keep = np.argpartition(-scores, k - 1)[:k]
+        scores, flat = scores[keep], flat[keep]
+    return scores, flat
+
+
+class OutfitSearch:
+    """
+    Scores combos drawn from four candidate pools.
+
+    Pools may contain ``None`` to allow an empty slot (no outerwear, no shoes).
+    ``season`` is optional: pools built by suggest_outfit are already
+    season-filtered, but callers that pass a whole wardrobe can let the
+    season masks do the filtering here.
+    """
+
+    def __init__(
+        self,
+        tops, bottoms, outers, shoes,
+        formality: Optional[str] = None,
+        season: Optional[str] = None,
+        avoid_fps: Optional[set] = None,
+        feature_rows: Optional[dict] = None,
+    ):
+        self.slots = [
+            SlotFeatures(pool, feature_rows) for pool in (tops, bottoms, outers, shoes)
+        ]
+        self.shape = tuple(len(s.items) for s in self.slots)
+        self.want_rank = (
+            formality_rank(formality) if formality and formality != "any" else None
+        )
+        self.season_bits = (
+            season_mask(season) if season and season not in ("any", "all_season") else None
+        )
+        self.avoid_fps = set(avoid_fps or ())
+        self.evaluated = 0
+        self.pruned_pairs = 0
+
+        # shared colour vocabulary so fingerprints pack into one int per combo;
+        # ids follow string order, so sorting ids == sorting colour names
+        vocab = sorted({c for s in self.slots for c in s.colors if c})
+        color_index = {c: i for i, c in enumerate(vocab)}
+        self._fp_base = len(vocab) + 1
+        for s in self.slots:
+            s.color_id = np.array(
+                [color_index[c] if c else len(vocab) for c in s.colors], dtype=np.int64
+            )
+        avoid_codes = []
+        for fp in self.avoid_fps:
+            parts = fp.split(",")
+            if len(parts) > 4 or any(p not in color_index for p in parts):
+                continue  # can't be produced by these pools
+            ids = sorted(color_index[p] for p in parts) + [len(vocab)] * (4 - len(parts))
+            avoid_codes.append(self._pack(np.array([ids], dtype=np.int64), self._fp_base)[0])
+        self._avoid_codes = np.array(sorted(avoid_codes), dtype=np.int64)
+
+        # (primary, secondary) palettes for the rule-based fallback
+        palette_index: dict = {}
+        for s in self.slots:
+            s.palette_id = np.array(
+                [palette_index.setdefault(p, len(palette_index)) for p in s.palettes],
+                dtype=np.int64,
+            )
+        self._palettes = list(palette_index)
+        self._palette_base = len(self._palettes) + 1
+        self._rule_scores: dict = {}
+
+    @staticmethod
+    def _pack(ids: np.ndarray, base: int) -> np.ndarray:
+        code = np.zeros(len(ids), dtype=np.int64)
+        for col in range(ids.shape[1]):
+            code = code * base + ids[:, col]
+        return code
+
+    def _gather(self, attr: str, idx) -> np.ndarray:
+        return np.stack(
+            [getattr(slot, attr)[i] for slot, i in zip(self.slots, idx)], axis=1
+        )
+
+    def _ml_color_scores(self, idx) -> np.ndarray:
+        return score_outfits_ml_batch(self._gather("hsv", idx), ~self._gather("parsed", idx))
+
+    def _rule_color_scores(self, idx) -> np.ndarray:
+        # the rule scorer only looks at the colour multiset, so piece order is irrelevant
+        ids = np.sort(self._gather("palette_id", idx), axis=1)
+        codes = self._pack(ids, self._palette_base)
+        uniq, inverse = np.unique(codes, return_inverse=True)
+        out = np.empty(len(uniq))
+        for n, code in enumerate(uniq.tolist()):
+            score = self._rule_scores.get(code)
+            if score is None:
+                ids, rest = [], code
+                for _ in range(4):
+                    rest, pid = divmod(rest, self._palette_base)
+                    ids.append(pid)
+                palettes = [self._palettes[pid] for pid in reversed(ids)]
+                colors = [p[0] for p in palettes] + [p[1] for p in palettes]
+                score = score_outfit_colors([c for c in colors if c])
+                self._rule_scores[code] = score
+            out[n] = score
+        return out[inverse.ravel()]
+
+    def score_rows(self, t, b, o, s):
+        """
+        Score combos given as parallel index arrays into the four pools.
+
+        Returns (scores, fp_hit); incompatible or out-of-season combos score -inf.
+        """
+        idx = (t, b, o, s)
+        n = len(t)
+        ok = np.ones(n, dtype=bool)
+        if self.season_bits is not None:
+            for slot, i in zip(self.slots, idx):
+                ok &= (slot.season[i] & self.season_bits) != 0
+
+        rank = self._gather("rank", idx)
+        ranked = ~np.isnan(rank)
+        n_ranked = ranked.sum(axis=1)
+        hi = np.where(ranked, rank, -np.inf).max(axis=1)
+        lo = np.where(ranked, rank, np.inf).min(axis=1)
+        spread = np.where(n_ranked >= 2, hi - lo, 0.0)
+        ok &= spread <= 1
+
+        penalty = spread * 0.5
+        if self.want_rank is not None:
+            penalty += np.where(ranked, np.abs(rank - self.want_rank), 0.0).sum(axis=1)
+
+        fp_hit = np.zeros(n, dtype=bool)
+        if len(self._avoid_codes):
+            ids = np.sort(self._gather("color_id", idx), axis=1)
+            fp_hit = np.isin(self._pack(ids, self._fp_base), self._avoid_codes)
+        penalty += FINGERPRINT_PENALTY * fp_hit
+
+        color = np.zeros(n)
+        rows = np.flatnonzero(ok)
+        if len(rows):
+            sub = tuple(i[rows] for i in idx)
+            use_ml = self.slots[0].has_hsv[sub[0]] & self.slots[1].has_hsv[sub[1]]
+            if trained_model is None:
+                use_ml[:] = False
+            if use_ml.any():
+                color[rows[use_ml]] = self._ml_color_scores(tuple(i[use_ml] for i in sub))
+            if (~use_ml).any():
+                color[rows[~use_ml]] = self._rule_color_scores(tuple(i[~use_ml] for i in sub))
+
+        scores = np.where(ok, color - penalty, -np.inf)
+        return scores, fp_hit
+
+    def top_k(self, k: int = TOP_K) -> List[dict]:
+        """Score the full product in chunks and return the k best entries, best first."""
+        total = int(np.prod(self.shape))
+        best_scores = np.empty(0)
+        best_flat = np.empty(0, dtype=np.int64)
+        for start in range(0, total, CHUNK_ROWS):
+            flat = np.arange(start, min(total, start + CHUNK_ROWS), dtype=np.int64)
+            scores, _ = self.score_rows(*np.unravel_index(flat, self.shape))
+            keep = np.isfinite(scores)
+            self.evaluated += int(keep.sum())
+            best_scores, best_flat = _merge_top_k(
+                best_scores, best_flat, scores[keep], flat[keep], k
+            )
+        return self._entries(best_scores, best_flat)
+
+    def _fits(self, slot: SlotFeatures) -> np.ndarray:
+        if self.season_bits is None:
+            return np.ones(len(slot.items), dtype=bool)
+        return (slot.season & self.season_bits) != 0
+
+    def _ml_upper_bounds(self, t: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """
+        Bound the ML colour score of each (top, bottom) pair over every
+        outer/shoes completion: build a box around each of the six features
+        and ask the forest for the best leaf reachable inside it.
+        """
+        top, bottom, outer, shoes = self.slots
+        th, bh = top.hsv[t], bottom.hsv[b]
+        sh = shoes.hsv[self._fits(shoes)]
+        o_fit = self._fits(outer)
+        oh = outer.hsv[o_fit]
+        o_parsed = outer.parsed[o_fit]
+        o_absent = (~o_parsed).any()
+        op = oh[o_parsed]
+
+        # hue distances — same six pairs as extract_features_batch(); a missing
+        # outer has hue 0 there too, so the zero rows in oh are exactly right
+        d_tb = np.abs(th[:, 0] - bh[:, 0])
+        d_tb = np.minimum(d_tb, 360 - d_tb)
+        d_ts, d_bs = _hue_dist(th[:, 0], sh[:, 0]), _hue_dist(bh[:, 0], sh[:, 0])
+        d_to, d_bo = _hue_dist(th[:, 0], oh[:, 0]), _hue_dist(bh[:, 0], oh[:, 0])
+        so_lo, so_hi = _range(_hue_dist(sh[:, 0], oh[:, 0]))
+        mins = np.column_stack([d_tb, d_ts.min(1), d_bs.min(1), d_to.min(1), d_bo.min(1),
+                                np.full(len(t), so_lo)])
+        maxs = np.column_stack([d_tb, d_ts.max(1), d_bs.max(1), d_to.max(1), d_bo.max(1),
+                                np.full(len(t), so_hi)])
+
+        # average saturation: shoes always count, outer only when present
+        base = th[:, 1] + bh[:, 1]
+        s_lo, s_hi = _range(sh[:, 1])
+        sat_lo, sat_hi = [], []
+        if o_absent:
+            sat_lo.append((base + s_lo) / 3)
+            sat_hi.append((base + s_hi) / 3)
+        if len(op):
+            o_lo, o_hi = _range(op[:, 1])
+            sat_lo.append((base + s_lo + o_lo) / 4)
+            sat_hi.append((base + s_hi + o_hi) / 4)
+
+        def _count_range(flag_t, flag_b, flag_s, flag_o):
+            fixed = flag_t.astype(int) + flag_b
+            o_max = int(flag_o.any())
+            o_min = int(not o_absent and flag_o.all())
+            return fixed + int(flag_s.all()) + o_min, fixed + int(flag_s.any()) + o_max
+
+        high_lo, high_hi = _count_range(th[:, 1] >= 60, bh[:, 1] >= 60, sh[:, 1] >= 60, op[:, 1] >= 60)
+        neut_lo, neut_hi = _count_range(th[:, 1] < 20, bh[:, 1] < 20, sh[:, 1] < 20, op[:, 1] < 20)
+
+        tb_light = (th[:, 2] > 70) | (bh[:, 2] > 70)
+        tb_dark = (th[:, 2] < 30) | (bh[:, 2] < 30)
+        light_lo = tb_light | (sh[:, 2] > 70).all()
+        dark_lo = tb_dark | (sh[:, 2] < 30).all()
+        light_hi = tb_light | (sh[:, 2] > 70).any() | (op[:, 2] > 70).any()
+        dark_hi = tb_dark | (sh[:, 2] < 30).any() | (op[:, 2] < 30).any()
+
+        eps = 1e-6
+        lo = np.column_stack([
+            mins.sum(1) / 6 - eps, mins.max(1) - eps, np.minimum.reduce(sat_lo) - eps,
+            high_lo, neut_lo, (light_lo & dark_lo).astype(float),
+        ])
+        hi = np.column_stack([
+            maxs.sum(1) / 6 + eps, maxs.max(1) + eps, np.maximum.reduce(sat_hi) + eps,
+            high_hi, neut_hi, (light_hi & dark_hi).astype(float),
+        ])
+
+        # pairs with the same colours share a box — bound each box once
+        boxes, inverse = np.unique(np.hstack([lo, hi]), axis=0, return_inverse=True)
+        raw = np.concatenate([
+            forest_upper_bound(boxes[i:i + BOUND_CHUNK, :6], boxes[i:i + BOUND_CHUNK, 6:])
+            for i in range(0, len(boxes), BOUND_CHUNK)
+        ])
+        return np.round(np.clip(raw + eps, 0.0, 10.0), 1)[inverse.ravel()]
+
+    def pair_upper_bounds(self) -> np.ndarray:
+        """
+        Admissible upper bound on the final score of every (top, bottom) pair,
+        flattened top-major. Pairs that can't form a compatible, in-season
+        outfit get -inf.
+
+        The bound is the best possible colour score (the forest bound, or 10
+        for the rule-based fallback) minus the smallest penalty any outer/shoes
+        completion could add: formality distances of the fixed pieces plus the
+        cheapest outer and shoes, and the top/bottom formality spread, which
+        extra pieces can only widen. The fingerprint penalty is taken as 0.
+        """
+        top, bottom, outer, shoes = self.slots
+        nt, nb = len(top.items), len(bottom.items)
+        t = np.repeat(np.arange(nt), nb)
+        b = np.tile(np.arange(nb), nt)
+        o_fit, s_fit = self._fits(outer), self._fits(shoes)
+        if not o_fit.any() or not s_fit.any():
+            return np.full(nt * nb, -np.inf)
+
+        ok = self._fits(top)[t] & self._fits(bottom)[b]
+        rt, rb = top.rank[t], bottom.rank[b]
+        spread = np.where(np.isnan(rt) | np.isnan(rb), 0.0, np.abs(rt - rb))
+        ok &= spread <= 1
+        penalty = spread * 0.5
+        if self.want_rank is not None:
+            def _pen(rank):
+                return np.where(np.isnan(rank), 0.0, np.abs(rank - self.want_rank))
+            penalty += _pen(rt) + _pen(rb)
+            penalty += _pen(outer.rank[o_fit]).min() + _pen(shoes.rank[s_fit]).min()
+
+        color = np.full(len(t), 10.0)
+        use_ml = top.has_hsv[t] & bottom.has_hsv[b] & ok
+        if trained_model is not None and use_ml.any():
+            color[use_ml] = self._ml_upper_bounds(t[use_ml], b[use_ml])
+        return np.where(ok, color - penalty, -np.inf)
+
+    def top_k_bnb(self, k: int = TOP_K) -> List[dict]:
+        """
+        Branch-and-bound top-K: expand (top, bottom) pairs in order of their
+        upper bound and stop as soon as the next bound can't beat the K-th best.
+        Returns the same entries top_k() would, up to ties.
+        """
+        bounds = self.pair_upper_bounds()
+        order = np.argsort(-bounds, kind="stable")
+        order = order[np.isfinite(bounds[order])]
+
+        nb, no, ns = self.shape[1], self.shape[2], self.shape[3]
+        per_pair = no * ns
+        block = max(1, CHUNK_ROWS // max(per_pair, 1))
+        o_tail = np.repeat(np.arange(no), ns)
+        s_tail = np.tile(np.arange(ns), no)
+
+        best_scores = np.empty(0)
+        best_flat = np.empty(0, dtype=np.int64)
+        self.pruned_pairs = 0
+        for start in range(0, len(order), block):
+            pairs = order[start:start + block]
+            if len(best_scores) >= k:
+                live = bounds[pairs] > best_scores.min()
+                if not live.any():
+                    # pairs are sorted by bound, so nothing further can win either
+                    self.pruned_pairs += len(order) - start
+                    break
+                self.pruned_pairs += int((~live).sum())
+                pairs = pairs[live]
+            t, b = np.divmod(pairs, nb)
+            idx = (
+                np.repeat(t, per_pair),
+                np.repeat(b, per_pair),
+                np.tile(o_tail, len(pairs)),
+                np.tile(s_tail, len(pairs)),
+            )
+            scores, _ = self.score_rows(*idx)
+            keep = np.isfinite(scores)
+            self.evaluated += int(keep.sum())
+            flat = np.ravel_multi_index(idx, self.shape)
+            best_scores, best_flat = _merge_top_k(
+                best_scores, best_flat, scores[keep], flat[keep], k
+            )
+        return self._entries(best_scores, best_flat)
+
+    def _entries(self, scores: np.ndarray, flat: np.ndarray) -> List[dict]:
+        order = np.lexsort((flat, -scores))
+        entries = []
+        for n in order:
+            idx = np.unravel_index(int(flat[n]), self.shape)
+            outfit = {
+                slot: pool.items[int(i)]
+                for slot, pool, i in zip(SLOTS, self.slots, idx)
+            }
+            fp = outfit_color_fingerprint(outfit)
+            entries.append({
+                "outfit": outfit,
+                "score": float(scores[n]),
+                "color_fingerprint": fp,
+                "fp_penalized": fp in self.avoid_fps,
+            })
+        return entries
@@ -0,0 +1,82 @@
+"""
+Authenticated users kept in process memory.
+
+get_current_user() runs on every authenticated request; with this cache a
+valid token resolves to its User without a query. Entries are detached
+User rows, shared read-only between requests: handlers that change a user
+load their own copy, and crud calls invalidate_principal() after every
+user write.
+
+Tokens carry the user's token_version; changing the password bumps it, so
+older tokens stop matching the cached (or freshly loaded) principal.
+Entries expire after PRINCIPAL_TTL_SECONDS and the least recently used one
+is evicted beyond PRINCIPAL_CACHE_SIZE users. The cache is per process, so
+with several workers a password change or profile edit made in another
+process takes effect within the TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from ..models import User
+
+PRINCIPAL_TTL_SECONDS = 30
+PRINCIPAL_CACHE_SIZE = 1024
+
+_principals: "OrderedDict[int, Tuple[User, float]]" = OrderedDict()  # id → (user, loaded_at)
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+# bumped on every invalidation so a load that raced with a write isn't cached
+_generations: dict = {}
+
+
+def cached_principal(user_id: int) -> Tuple[Optional[User], int]:
+    """(cached user or None, generation to pass to store_principal() after a load)."""
+    now = time.monotonic()
+    with _lock:
+        entry = _principals.get(user_id)
+        if entry is not None and now - entry[1] < PRINCIPAL_TTL_SECONDS:
+            _principals.move_to_end(user_id)
+            _stats["hits"] += 1
+            return entry[0], 0
+        _stats["misses"] += 1
+        return None, _generations.get(user_id, 0)
+
+
+def store_principal(user: User, generation: int) -> None:
+    """Cache a detached ``user`` unless it was invalidated since cached_principal()."""
+    with _lock:
+        if _generations.get(user.id, 0) != generation:
+            return
+        _principals[user.id] = (user, time.monotonic())
+        _principals.move_to_end(user.id)
+        while len(_principals) > PRINCIPAL_CACHE_SIZE:
+            _principals.popitem(last=False)
+
+
+def invalidate_principal(user_id: Optional[int]) -> None:
+    """Drop a cached user after their row changes (profile, password, deletion)."""
+    if user_id is None:
+        return
+    with _lock:
+        _generations[user_id] = _generations.get(user_id, 0) + 1
+        if _principals.pop(user_id, None) is not None:
+            _stats["invalidations"] += 1
+
+
+def clear_principal_cache() -> None:
+    with _lock:
+        _principals.clear()
+
+
+def principal_cache_info() -> dict:
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "hit_ratio": round(_stats["hits"] / lookups, 3) if lookups else None,
+            "size": len(_principals),
+            "maxsize": PRINCIPAL_CACHE_SIZE,
+            "ttl_seconds": PRINCIPAL_TTL_SECONDS,
+        }
@@ -0,0 +1,102 @@
+"""
+WEBP thumbnails for item images.
+
+The wardrobe grid and outfit cards show items at 80-300 px, but /storage
+serves the original 3-12 MB photo. Each stored image therefore gets WEBP
+derivatives at settings.thumbnail_widths, kept under
+STORAGE_ROOT/thumbs/<hash[:2]>/<hash>-<width>.webp next to the blob store.
+They are made on upload (one decode for all widths) and otherwise lazily on
+first request to GET /thumbs/{content_hash}/{width}.webp.
+
+Because the URL names the content hash, a thumbnail never changes: it is
+served with a strong ETag and an immutable Cache-Control, so browsers fetch
+each one once. Thumbnails are deleted together with their blob file, and
+are only served while the blob exists; any left behind (e.g. by a crash
+between the two) are removed on the next request for them.
+"""
+import os
+import re
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from PIL import Image, ImageOps
+
+from .. import crud
+from ..config import settings
+
+THUMBS_DIRNAME = "thumbs"
+THUMB_VERSION = "webp1"  # bump when the encoding changes; part of the ETag
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+CONTENT_HASH_RE = re.compile(r"[0-9a-f]{64}")  # sha256 hex, as stored in Item.content_hash
+
+
+def is_content_hash(value: str) -> bool:
+    return CONTENT_HASH_RE.fullmatch(value) is not None
+
+
+def thumbnail_path(content_hash: str, width: int) -> Path:
+    # the hash becomes a path segment: never let anything else through
+    if not is_content_hash(content_hash):
+        raise ValueError(f"not a content hash: {content_hash!r}")
+    return crud.STORAGE_ROOT / THUMBS_DIRNAME / content_hash[:2] / f"{content_hash}-{width}.webp"
+
+
+def thumbnail_etag(content_hash: str, width: int) -> str:
+    return f'"{content_hash}-{width}-{settings.thumbnail_quality}-{THUMB_VERSION}"'
+
+
+def thumbnail_urls(content_hash: Optional[str]) -> Dict[str, str]:
+    """{width: URL} for an item's image; empty for items without a content hash."""
+    if not content_hash:
+        return {}
+    return {str(w): f"/thumbs/{content_hash}/{w}.webp" for w in settings.thumbnail_widths}
+
+
+def remove_thumbnails(content_hash: str) -> None:
+    """Drop the thumbnails of an image whose blob is gone."""
+    for w in settings.thumbnail_widths:
+        thumbnail_path(content_hash, w).unlink(missing_ok=True)
+
+
+def _save_atomic(img: Image.Image, dest: Path) -> None:
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{uuid.uuid4().hex}.tmp")
+    try:
+        img.save(tmp, "WEBP", quality=settings.thumbnail_quality, method=4)
+        os.replace(tmp, dest)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def make_thumbnails(image_path: str, content_hash: str, widths: Optional[List[int]] = None) -> List[Path]:
+    """
+    Write the missing thumbnails of ``image_path`` (all configured widths by
+    default), decoding the image once and downscaling largest first.
+    Returns the paths written; an unreadable image writes nothing.
+    """
+    todo = sorted(
+        (w for w in (widths or settings.thumbnail_widths) if not thumbnail_path(content_hash, w).exists()),
+        reverse=True,
+    )
+    if not todo:
+        return []
+    try:
+        with Image.open(image_path) as img:
+            # JPEG decodes at 1/2..1/8 scale directly, far cheaper than a full 12 MP decode;
+            # both sides stay >= the widest thumbnail so an EXIF rotation can't leave it short
+            img.draft("RGB", (todo[0], todo[0]))
+            img = ImageOps.exif_transpose(img)
+            img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+    except Exception as e:
+        print(f"⚠️ Could not make thumbnails for {image_path}: {e}")
+        return []
+
+    written = []
+    for w in todo:
+        if img.width > w:
+            img = img.resize((w, max(1, round(img.height * w / img.width))), Image.LANCZOS)
+        dest = thumbnail_path(content_hash, w)
+        _save_atomic(img, dest)
+        written.append(dest)
+    return written
@@ -0,0 +1,67 @@
+"""
+Streaming ingest for uploaded images.
+
+The upload is copied in UPLOAD_CHUNK_SIZE pieces into a temp file next to
+its final location (STORAGE_ROOT/<user_id>/.upload-*.part), hashing as it
+goes, so memory per upload stays constant however big the photo is.
+Uploads over settings.max_upload_bytes are cut off and their temp file
+removed. crud.create_item_with_file() then renames the temp file into
+the blob store (services/blob_store.py), which is atomic because both live
+under STORAGE_ROOT.
+"""
+import asyncio
+import hashlib
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Tuple
+
+from fastapi import UploadFile
+
+UPLOAD_CHUNK_SIZE = 1 << 20
+TEMP_PREFIX = ".upload-"
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, limit: int):
+        super().__init__(f"upload exceeds {limit // (1 << 20)} MB")
+        self.limit = limit
+
+
+def copy_hashing(src: BinaryIO, dest: Path, max_bytes: int) -> Tuple[str, int]:
+    """Copy ``src`` to ``dest`` in chunks → (sha256 hex, size); ``dest`` is removed on any error."""
+    h = hashlib.sha256()
+    size = 0
+    try:
+        with open(dest, "wb") as out:
+            while True:
+                chunk = src.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                h.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        dest.unlink(missing_ok=True)
+        raise
+    return h.hexdigest(), size
+
+
+async def stream_upload(file: UploadFile, dest_dir: Path, max_bytes: int) -> Tuple[Path, str, int]:
+    """
+    Copy ``file`` into a temp file in ``dest_dir``. Returns (temp path,
+    sha256 hex, size). Raises UploadTooLarge past ``max_bytes``. The caller
+    renames or deletes the temp file.
+    """
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    tmp = dest_dir / f"{TEMP_PREFIX}{uuid.uuid4().hex}.part"
+    await file.seek(0)
+    # one thread hop for the whole copy instead of one per chunk
+    content_hash, size = await asyncio.to_thread(copy_hashing, file.file, tmp, max_bytes)
+    return tmp, content_hash, size
+
+
+def discard_upload(tmp: Path) -> None:
+    tmp.unlink(missing_ok=True)
@@ -0,0 +1,134 @@
+"""
+Per-user wardrobe snapshots kept in process memory.
+
+suggest_outfit and the gap recommendations need the same things on every
+request: the user's items, their search features, the liked/disliked colour
+fingerprints and the recent outfit history. A snapshot holds all of it,
+detached from the session that loaded it, so a repeat request reads no rows.
+
+Snapshots expire after WARDROBE_TTL_SECONDS and the least recently used one
+is evicted beyond WARDROBE_CACHE_SIZE users. Every write to a user's items or
+fingerprints calls invalidate_wardrobe(); new history rows are appended with
+record_outfit_history() instead. The cache is per process, so with several
+workers a change made in another process shows up within the TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from sqlmodel import Session, select
+
+from ..models import Item, LikedOutfit, DislikedOutfit, OutfitHistory
+from .outfit_search import item_feature_row
+
+WARDROBE_TTL_SECONDS = 300
+WARDROBE_CACHE_SIZE = 256
+HISTORY_LIMIT = 50  # what compute_gap_recommendations looks at
+
+
+class WardrobeSnapshot:
+    def __init__(
+        self,
+        user_id: int,
+        items: List[Item],
+        liked_fps: set,
+        disliked_fps: set,
+        history: List[OutfitHistory],
+    ):
+        self.user_id = user_id
+        self.items = items
+        self.feature_rows = {item.id: item_feature_row(item) for item in items}
+        self.liked_fps = liked_fps
+        self.disliked_fps = disliked_fps
+        self.history = history
+        self.loaded_at = time.monotonic()
+
+
+_snapshots: "OrderedDict[int, WardrobeSnapshot]" = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+# bumped on every invalidation so a load that raced with a write isn't cached
+_generations: dict = {}
+
+
+def _load_snapshot(session: Session, user_id: int) -> WardrobeSnapshot:
+    items = session.exec(
+        select(Item).where(Item.user_id == user_id).order_by(Item.id.desc())
+    ).all()
+    liked = session.exec(select(LikedOutfit).where(LikedOutfit.user_id == user_id)).all()
+    disliked = session.exec(select(DislikedOutfit).where(DislikedOutfit.user_id == user_id)).all()
+    history = session.exec(
+        select(OutfitHistory)
+        .where(OutfitHistory.user_id == user_id)
+        .order_by(OutfitHistory.created_at.desc())
+        .limit(HISTORY_LIMIT)
+    ).all()
+    # detach so a later commit on this session can't expire the cached rows
+    for row in (*items, *liked, *disliked, *history):
+        session.expunge(row)
+    return WardrobeSnapshot(
+        user_id,
+        list(items),
+        {r.color_fingerprint for r in liked if r.color_fingerprint},
+        {r.color_fingerprint for r in disliked if r.color_fingerprint},
+        list(history),
+    )
+
+
+def get_wardrobe(session: Session, user_id: int) -> WardrobeSnapshot:
+    """The user's cached snapshot, loading it with ``session`` when missing or stale."""
+    now = time.monotonic()
+    with _lock:
+        snap = _snapshots.get(user_id)
+        if snap is not None and now - snap.loaded_at < WARDROBE_TTL_SECONDS:
+            _snapshots.move_to_end(user_id)
+            _stats["hits"] += 1
+            return snap
+        _stats["misses"] += 1
+        generation = _generations.get(user_id, 0)
+
+    snap = _load_snapshot(session, user_id)
+    with _lock:
+        if _generations.get(user_id, 0) != generation:
+            return snap
+        _snapshots[user_id] = snap
+        _snapshots.move_to_end(user_id)
+        while len(_snapshots) > WARDROBE_CACHE_SIZE:
+            _snapshots.popitem(last=False)
+    return snap
+
+
+def invalidate_wardrobe(user_id: Optional[int]) -> None:
+    """Drop a user's snapshot after their items or liked/disliked combos change."""
+    if user_id is None:
+        return
+    with _lock:
+        _generations[user_id] = _generations.get(user_id, 0) + 1
+        if _snapshots.pop(user_id, None) is not None:
+            _stats["invalidations"] += 1
+
+
+def record_outfit_history(user_id: int, row: OutfitHistory) -> None:
+    """Write a freshly saved (detached) history row through to the cached snapshot."""
+    with _lock:
+        snap = _snapshots.get(user_id)
+        if snap is not None:
+            snap.history = [row, *snap.history][:HISTORY_LIMIT]
+
+
+def clear_wardrobe_cache() -> None:
+    with _lock:
+        _snapshots.clear()
+
+
+def wardrobe_cache_info() -> dict:
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "hit_ratio": round(_stats["hits"] / lookups, 3) if lookups else None,
+            "size": len(_snapshots),
+            "maxsize": WARDROBE_CACHE_SIZE,
+            "ttl_seconds": WARDROBE_TTL_SECONDS,
+        }
@@ -0,0 +1,379 @@
+"""
+Open-Meteo weather lookups with a two-level cache.
+
+City → lat/lon (geocoding) never changes and a daily forecast changes
+slowly, so both are cached: first in an in-process LRU, then in the
+weathercacheentry table so restarts and other workers reuse them.
+Geocoding entries never expire; forecast days expire after
+FORECAST_TTL_SECONDS. Concurrent misses for the same key wait for one
+fetch instead of each calling the API.
+
+A forecast miss fetches PREFETCH_DAYS days in one request and caches each
+of them, so a week of suggestions (or one get_weather_range call) costs a
+single round trip. Days past the forecast horizon never reach the API:
+they get the calendar estimate straight away.
+"""
+import json
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Callable, Optional
+
+import requests
+from sqlmodel import Session
+
+from ..db import engine
+from ..models import WeatherCacheEntry
+
+GEOCODE_URL = "https://geocoding-api.open-meteo.com/v1/search"
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+REQUEST_TIMEOUT = 5
+
+FORECAST_TTL_SECONDS = 3 * 3600
+PREFETCH_DAYS = 7
+# Open-Meteo forecasts reach 16 days ahead (today + 15)
+FORECAST_HORIZON_DAYS = 16
+MEMORY_CACHE_SIZE = 1024
+
+_memory: "OrderedDict[str, tuple]" = OrderedDict()  # key → (payload, expires_at or None)
+_lock = threading.Lock()
+# key → [lock held by the thread fetching it, threads holding or waiting for it];
+# an entry is dropped only when its count returns to 0, so every waiter shares one lock
+_inflight: dict = {}
+_stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0, "errors": 0, "beyond_horizon": 0}
+
+
+def _weather_condition_from_code(code: Optional[int]) -> str:
+    if code is None:
+        return "unknown"
+    if code in {0, 1}:
+        return "clear"
+    if code in {2, 3, 45, 48}:
+        return "cloudy"
+    if code in {51, 53, 55, 56, 57, 61, 63, 65, 66, 67, 80, 81, 82}:
+        return "rain"
+    if code in {71, 73, 75, 77, 85, 86}:
+        return "snow"
+    if code in {95, 96, 99}:
+        return "storm"
+    return "unknown"
+
+
+# ---- cache levels ----
+
+def _memory_get(key: str):
+    with _lock:
+        entry = _memory.get(key)
+        if entry is None:
+            return None
+        payload, expires_at = entry
+        if expires_at is not None and expires_at <= datetime.utcnow():
+            del _memory[key]
+            return None
+        _memory.move_to_end(key)
+        return payload
+
+
+def _memory_put(key: str, payload, expires_at: Optional[datetime]) -> None:
+    with _lock:
+        _memory[key] = (payload, expires_at)
+        _memory.move_to_end(key)
+        while len(_memory) > MEMORY_CACHE_SIZE:
+            _memory.popitem(last=False)
+
+
+def _disk_get(key: str):
+    try:
+        with Session(engine) as session:
+            row = session.get(WeatherCacheEntry, key)
+    except Exception as e:
+        print(f"⚠️ Weather cache read failed: {e}")
+        return None
+    if row is None:
+        return None
+    if row.expires_at is not None and row.expires_at <= datetime.utcnow():
+        return None
+    payload = json.loads(row.payload)
+    _memory_put(key, payload, row.expires_at)
+    return payload
+
+
+def _disk_put(entries: dict, expires_at: Optional[datetime]) -> None:
+    try:
+        with Session(engine) as session:
+            for key, payload in entries.items():
+                session.merge(WeatherCacheEntry(
+                    key=key,
+                    payload=json.dumps(payload),
+                    fetched_at=datetime.utcnow(),
+                    expires_at=expires_at,
+                ))
+            session.commit()
+    except Exception as e:
+        print(f"⚠️ Weather cache write failed: {e}")
+
+
+def _store(entries: dict, ttl_seconds: Optional[int]) -> None:
+    expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds) if ttl_seconds else None
+    for key, payload in entries.items():
+        _memory_put(key, payload, expires_at)
+    _disk_put(entries, expires_at)
+
+
+def _cached(key: str, fetch: Callable[[], None]):
+    """
+    Return the cached payload for ``key``, calling ``fetch()`` (which must
+    _store() it) on a miss. Only one thread fetches a given key at a time;
+    the others wait and then read what it stored.
+    """
+    payload = _memory_get(key)
+    if payload is not None:
+        with _lock:
+            _stats["memory_hits"] += 1
+        return payload
+
+    with _lock:
+        entry = _inflight.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    key_lock = entry[0]
+    waited = not key_lock.acquire(blocking=False)
+    if waited:
+        key_lock.acquire()
+    try:
+        payload = _memory_get(key)
+        if payload is not None:
+            with _lock:
+                _stats["coalesced" if waited else "memory_hits"] += 1
+            return payload
+        payload = _disk_get(key)
+        if payload is not None:
+            with _lock:
+                _stats["disk_hits"] += 1
+            return payload
+        with _lock:
+            _stats["misses"] += 1
+        fetch()
+        return _memory_get(key)
+    finally:
+        key_lock.release()
+        with _lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _inflight[key]
+
+
+# ---- Open-Meteo ----
+
+def _geo_key(city: str) -> str:
+    return f"geo:{city.strip().lower()}"
+
+
+def _forecast_key(lat: float, lon: float, day: date) -> str:
+    return f"forecast:{lat:.4f},{lon:.4f}:{day.isoformat()}"
+
+
+def geocode(city: str) -> tuple:
+    """(lat, lon) for a city name. Raises ValueError if Open-Meteo doesn't know it."""
+    key = _geo_key(city)
+
+    def fetch():
+        resp = requests.get(
+            GEOCODE_URL,
+            params={"name": city, "count": 1, "language": "en", "format": "json"},
+            timeout=REQUEST_TIMEOUT,
+        )
+        data = resp.json()
+        if not data.get("results"):
+            raise ValueError(f"City '{city}' not found")
+        result = data["results"][0]
+        _store({key: {"lat": result["latitude"], "lon": result["longitude"]}}, None)
+
+    payload = _cached(key, fetch)
+    return payload["lat"], payload["lon"]
+
+
+def _fetch_forecast(lat: float, lon: float, start: date, end: date) -> None:
+    """Fetch daily forecasts for start..end and cache one entry per day."""
+    resp = requests.get(
+        FORECAST_URL,
+        params={
+            "latitude": lat,
+            "longitude": lon,
+            "daily": "temperature_2m_max,temperature_2m_min,weathercode",
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "timezone": "auto",
+        },
+        timeout=REQUEST_TIMEOUT,
+    )
+    daily = resp.json().get("daily", {})
+    if not daily or "time" not in daily:
+        raise ValueError("Invalid weather response")
+
+    weather_codes = daily.get("weathercode") or daily.get("weather_code") or []
+    entries = {}
+    for idx, day in enumerate(daily["time"]):
+        entries[_forecast_key(lat, lon, date.fromisoformat(day))] = {
+            "temp_max": daily["temperature_2m_max"][idx],
+            "temp_min": daily["temperature_2m_min"][idx],
+            "weathercode": weather_codes[idx] if idx < len(weather_codes) else None,
+        }
+    _store(entries, FORECAST_TTL_SECONDS)
+
+
+def _last_forecast_day() -> date:
+    return date.today() + timedelta(days=FORECAST_HORIZON_DAYS - 1)
+
+
+def _prefetch_window(day: date, through: Optional[date] = None) -> tuple:
+    """Days to request when ``day`` misses: PREFETCH_DAYS (or up to ``through``), within the horizon."""
+    end = max(day + timedelta(days=PREFETCH_DAYS - 1), through or day)
+    return day, max(min(end, _last_forecast_day()), day)
+
+
+def daily_forecast(lat: float, lon: float, day: date, through: Optional[date] = None) -> dict:
+    """
+    Cached forecast for one day. A miss fetches the whole prefetch window
+    starting at ``day`` (extended to ``through`` when given).
+    """
+    if day > _last_forecast_day():
+        raise ValueError(f"{day.isoformat()} is past the forecast horizon")
+    key = _forecast_key(lat, lon, day)
+    start, end = _prefetch_window(day, through)
+    payload = _cached(key, lambda: _fetch_forecast(lat, lon, start, end))
+    if payload is None:
+        raise ValueError(f"No forecast for {day.isoformat()}")
+    return payload
+
+
+def _season_from_temp(temp: float) -> str:
+    if temp < 5:
+        return "winter"
+    elif temp < 12:
+        return "fall"
+    elif temp < 20:
+        return "spring"
+    return "summer"
+
+
+def _calendar_fallback(city: str, target_date: date) -> dict:
+    month = target_date.month
+
+    if month in [12, 1, 2]:
+        season, temp = "winter", 0
+    elif month in [3, 4, 5]:
+        season, temp = "spring", 12
+    elif month in [6, 7, 8]:
+        season, temp = "summer", 22
+    else:
+        season, temp = "fall", 10
+
+    return {
+        "temperature": temp,
+        "temp_min": temp - 5,
+        "temp_max": temp + 5,
+        "season": season,
+        "city": city,
+        "condition": "unknown",
+    }
+
+
+def _weather_from_forecast(city: str, day: dict) -> dict:
+    temp_max = day["temp_max"]
+    temp_min = day["temp_min"]
+    temp = temp_min * 0.7 + temp_max * 0.3
+    return {
+        "temperature": round(temp, 1),
+        "temp_min": temp_min,
+        "temp_max": temp_max,
+        "season": _season_from_temp(temp),
+        "city": city,
+        "condition": _weather_condition_from_code(day["weathercode"]),
+    }
+
+
+def _beyond_horizon(day: date) -> bool:
+    if day <= _last_forecast_day():
+        return False
+    with _lock:
+        _stats["beyond_horizon"] += 1
+    return True
+
+
+def get_weather(city: str, target_date: date) -> dict:
+    if _beyond_horizon(target_date):
+        return _calendar_fallback(city, target_date)
+    try:
+        lat, lon = geocode(city)
+        return _weather_from_forecast(city, daily_forecast(lat, lon, target_date))
+    except Exception as e:
+        with _lock:
+            _stats["errors"] += 1
+        print(f"Weather API failed: {e}. Using calendar-based fallback.")
+        return _calendar_fallback(city, target_date)
+
+
+def cached_weather(city: str, target_date: date) -> Optional[dict]:
+    """get_weather() from the in-memory level only; None when answering needs the table or the API."""
+    geo = _memory_get(_geo_key(city))
+    day = _memory_get(_forecast_key(geo["lat"], geo["lon"], target_date)) if geo else None
+    if day is None:
+        return None
+    with _lock:
+        _stats["memory_hits"] += 2
+    return _weather_from_forecast(city, day)
+
+
+def get_weather_range(city: str, start: date, end: date) -> list:
+    """
+    get_weather() for every day from start to end inclusive, with a "date"
+    key added. Cold days are fetched together, one request per
+    FORECAST_HORIZON_DAYS-day window; days past the horizon get the
+    calendar estimate without a request, as do days the API can't serve.
+    """
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    forecast_days = [d for d in days if not _beyond_horizon(d)]
+    if not forecast_days:
+        return [{**_calendar_fallback(city, d), "date": d.isoformat()} for d in days]
+    try:
+        lat, lon = geocode(city)
+    except Exception as e:
+        with _lock:
+            _stats["errors"] += 1
+        print(f"Weather API failed: {e}. Using calendar-based fallback.")
+        return [{**_calendar_fallback(city, d), "date": d.isoformat()} for d in days]
+
+    out = []
+    for d in days:
+        if d > forecast_days[-1]:
+            out.append({**_calendar_fallback(city, d), "date": d.isoformat()})
+            continue
+        try:
+            weather = _weather_from_forecast(city, daily_forecast(lat, lon, d, through=end))
+        except Exception as e:
+            with _lock:
+                _stats["errors"] += 1
+            print(f"Weather API failed for {d.isoformat()}: {e}. Using calendar-based fallback.")
+            weather = _calendar_fallback(city, d)
+        out.append({**weather, "date": d.isoformat()})
+    return out
+
+
+def clear_weather_cache() -> None:
+    """Empty the in-memory level (the table is left alone)."""
+    with _lock:
+        _memory.clear()
+
+
+def weather_cache_info() -> dict:
+    with _lock:
+        hits = _stats["memory_hits"] + _stats["disk_hits"] + _stats["coalesced"]
+        lookups = hits + _stats["misses"]
+        return {
+            **_stats,
+            "hit_ratio": round(hits / lookups, 3) if lookups else None,
+            "memory_size": len(_memory),
+            "memory_maxsize": MEMORY_CACHE_SIZE,
+            "forecast_ttl_seconds": FORECAST_TTL_SECONDS,
+            "prefetch_days": PREFETCH_DAYS,
+        }
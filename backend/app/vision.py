@@ -1,11 +1,18 @@
+import hashlib
 import json, re
-from typing import Literal, TypedDict
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Dict, List, Literal, Optional, TypedDict
 from .enums import Season, OutfitPart, Formality
 from .enums import Category
 from .config import settings
+from .services.image_prep import prepare_for_vision, prep_version
+from .services.color_analysis import COLOR_ANALYZER_VERSION, analyze_item_color
+from .services.local_classifier import LOCAL_CLASSIFIER_VERSION, classify_locally
 
-# choose your provider here (kept minimal; easy to swap)
-PROVIDER = "openai"
+# providers are tried in the order of settings.vision_providers; see the registry
+# at the bottom of this file
 
 # enums we’ll accept
 Color = Literal[
@@ -184,60 +191,68 @@ def _extract_json(text: str) -> dict:
         s = re.sub(r",\s*([}\]])", r"\1", m.group(0))
         return json.loads(s)
 
-def classify_with_openai(image_path: str) -> Prediction:
+# gpt-4o is good; mini is cheaper; swap model if you want
+OPENAI_MODEL = "gpt-4o-mini"
+
+CLASSIFY_PROMPT = (
+    "You are an AI wardrobe assistant analyzing a single clothing photo. "
+    "Focus on the main clothing item, ignoring background (bed, floor, other objects). "
+    "If the background is cluttered, estimate best you can. "
+    "Return STRICT JSON with the keys: category, outfit_part, color, color_hex, color_hsv, secondary_color, season, formality.\n"
+    "Allowed values:\n"
+    f"- category: {', '.join([e.value for e in Category])}\n"
+    f"- outfit_part: {', '.join([e.value for e in OutfitPart])}, other\n"
+    "- color: black, white, gray, navy, blue, green, red, yellow, orange, brown, beige, cream, purple, pink, multicolor\n"
+    "- color_hex: RGB color in hex format (e.g., #1a2b3c). Analyze the actual color of the item and provide the closest hex value.\n"
+    "- color_hsv: HSV color values as 'hue,saturation,value' (e.g., '240,50,80'). "
+    "Hue: 0-360 degrees, Saturation: 0-100%, Value: 0-100%. Analyze the dominant color of the clothing item.\n"
+    "- secondary_color: the second most prominent color on the item (same allowed values as color). "
+    "Use an empty string if the item is a solid single color.\n"
+    f"- season: {', '.join([e.value for e in Season])}\n"
+    f"- formality: {', '.join([e.value for e in Formality])}\n"
+    "SEASON RULES:\n"
+    "- Choose ONE OR TWO seasons maximum.\n"
+    "- Allowed values: spring, summer, fall, winter, spring_summer, fall_winter, all_season.\n"
+    "- Use spring_summer for light warm-weather items (t-shirts, polos, shorts, linen shirts).\n"
+    "- Use fall_winter for medium-weight items (hoodies, sweaters, bomber jackets, leather jackets).\n"
+    "- Use winter ONLY for thick padded jackets, down jackets, parkas, or visibly insulated coats.\n"
+    "- Use fall for light jackets, flannels, cardigans, or light sweaters.\n"
+    "- Use all_season for items usable year-round (jeans, chinos, basic t-shirts).\n"
+    "FORMALITY RULES:\n"
+    "- Allowed values: casual, smart_casual, polished.\n"
+    "- Treat gym wear, hoodies, t-shirts, sweatpants, shorts, sneakers as casual.\n"
+    "- Treat polos, nice knitwear, chinos, clean sneakers/loafers as smart_casual.\n"
+    "- Treat blazers, sport coats, dress shirts, dress pants, suits, and formal wear as polished.\n"
+    "Example output: {"
+    "\"outfit_part\":\"top\","
+    "\"category\":\"sweater\","
+    "\"color\":\"navy\","
+    "\"color_hex\":\"#001f3f\","
+    "\"color_hsv\":\"210,100,25\","
+    "\"secondary_color\":\"\","
+    "\"season\":\"fall_winter\","
+    "\"formality\":\"smart_casual\""
+    "}"
+    "Do not add commentary or explanations. Output JSON only."
+)
+
+# fields analyze_item_color() measures; they replace the model's guesses
+MEASURED_COLOR_FIELDS = ("color", "color_hex", "color_hsv", "secondary_color")
+LOCAL_TIMEOUT = 5.0
+
+
+def classify_with_openai(image_path: str, content_hash: Optional[str] = None) -> Prediction:
     from openai import OpenAI
-    client = OpenAI(api_key=settings.openai_api_key)
-
-    prompt = (
-        "You are an AI wardrobe assistant analyzing a single clothing photo. "
-        "Focus on the main clothing item, ignoring background (bed, floor, other objects). "
-        "If the background is cluttered, estimate best you can. "
-        "Return STRICT JSON with the keys: category, outfit_part, color, color_hex, color_hsv, secondary_color, season, formality.\n"
-        "Allowed values:\n"
-        f"- category: {', '.join([e.value for e in Category])}\n"
-        f"- outfit_part: {', '.join([e.value for e in OutfitPart])}, other\n"
-        "- color: black, white, gray, navy, blue, green, red, yellow, orange, brown, beige, cream, purple, pink, multicolor\n"
-        "- color_hex: RGB color in hex format (e.g., #1a2b3c). Analyze the actual color of the item and provide the closest hex value.\n"
-        "- color_hsv: HSV color values as 'hue,saturation,value' (e.g., '240,50,80'). "
-        "Hue: 0-360 degrees, Saturation: 0-100%, Value: 0-100%. Analyze the dominant color of the clothing item.\n"
-        "- secondary_color: the second most prominent color on the item (same allowed values as color). "
-        "Use an empty string if the item is a solid single color.\n"
-        f"- season: {', '.join([e.value for e in Season])}\n"
-        f"- formality: {', '.join([e.value for e in Formality])}\n"
-        "SEASON RULES:\n"
-        "- Choose ONE OR TWO seasons maximum.\n"
-        "- Allowed values: spring, summer, fall, winter, spring_summer, fall_winter, all_season.\n"
-        "- Use spring_summer for light warm-weather items (t-shirts, polos, shorts, linen shirts).\n"
-        "- Use fall_winter for medium-weight items (hoodies, sweaters, bomber jackets, leather jackets).\n"
-        "- Use winter ONLY for thick padded jackets, down jackets, parkas, or visibly insulated coats.\n"
-        "- Use fall for light jackets, flannels, cardigans, or light sweaters.\n"
-        "- Use all_season for items usable year-round (jeans, chinos, basic t-shirts).\n"
-        "FORMALITY RULES:\n"
-        "- Allowed values: casual, smart_casual, polished.\n"
-        "- Treat gym wear, hoodies, t-shirts, sweatpants, shorts, sneakers as casual.\n"
-        "- Treat polos, nice knitwear, chinos, clean sneakers/loafers as smart_casual.\n"
-        "- Treat blazers, sport coats, dress shirts, dress pants, suits, and formal wear as polished.\n"
-        "Example output: {"
-        "\"outfit_part\":\"top\","
-        "\"category\":\"sweater\","
-        "\"color\":\"navy\","
-        "\"color_hex\":\"#001f3f\","
-        "\"color_hsv\":\"210,100,25\","
-        "\"secondary_color\":\"\","
-        "\"season\":\"fall_winter\","
-        "\"formality\":\"smart_casual\""
-        "}"
-        "Do not add commentary or explanations. Output JSON only."
-    )
+    client = OpenAI(api_key=settings.openai_api_key, timeout=settings.openai_timeout)
 
-    ...
+    prompt = CLASSIFY_PROMPT
 
 
-    with open(image_path, "rb") as f:
-        b64 = __import__("base64").b64encode(f.read()).decode("utf-8")
+    # downscaled JPEG (cached per content hash), or the original file if Pillow can't read it
+    payload, mime = prepare_for_vision(image_path, content_hash)
+    b64 = __import__("base64").b64encode(payload).decode("utf-8")
 
-    # gpt-4o is good; mini is cheaper; swap model if you want
-    model = "gpt-4o-mini"
+    model = OPENAI_MODEL
 
     resp = client.chat.completions.create(
         model=model,
@@ -246,7 +261,7 @@ def classify_with_openai(image_path: str) -> Prediction:
                 "role":"user",
                 "content": [
                     {"type":"text","text": prompt},
-                    {"type":"image_url","image_url":{"url": f"data:image/jpeg;base64,{b64}"}}
+                    {"type":"image_url","image_url":{"url": f"data:{mime};base64,{b64}"}}
                 ]
             }
         ],
@@ -269,7 +284,7 @@ def classify_with_openai(image_path: str) -> Prediction:
                     "role": "user",
                     "content": [
                         {"type": "text", "text": force_prompt},
-                        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{b64}"}},
+                        {"type": "image_url", "image_url": {"url": f"data:{mime};base64,{b64}"}},
                     ],
                 }
             ],
@@ -288,7 +303,123 @@ def classify_with_openai(image_path: str) -> Prediction:
 
     return _postprocess(raw)
 
-def classify_image(image_path: str) -> Prediction:
-    if PROVIDER == "openai":
-        return classify_with_openai(image_path)
-    raise RuntimeError("No provider configured")
+# ---- provider registry ----
+
+class VisionProvider:
+    """
+    A classification backend: ``classify(image_path, content_hash)`` returns
+    a Prediction. At most ``concurrency`` calls run at once; a call that
+    can't start or finish within ``timeout`` seconds counts as failed, so
+    the next provider in the chain gets its turn.
+    """
+
+    def __init__(self, name: str, classify: Callable, version: str, timeout: float,
+                 concurrency: int, measures_color: bool = False):
+        self.name = name
+        self.classify = classify
+        self.version = version
+        self.timeout = timeout
+        self.concurrency = max(1, concurrency)
+        self.measures_color = measures_color  # colours already come from color_analysis
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=f"vision-{name}")
+
+    def __call__(self, image_path: str, content_hash: Optional[str] = None) -> Prediction:
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"all {self.concurrency} slots busy for {self.timeout}s")
+        try:
+            future = self._pool.submit(self.classify, image_path, content_hash)
+        except Exception:
+            self._slots.release()
+            raise
+        # the slot frees when the call really ends, even if we stop waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise TimeoutError(f"no answer within {self.timeout}s")
+
+
+PROVIDERS: Dict[str, VisionProvider] = {}
+
+
+def register_provider(name: str, classify: Callable, version: str, timeout: float = 30.0,
+                      concurrency: int = 4, measures_color: bool = False) -> VisionProvider:
+    provider = VisionProvider(name, classify, version, timeout, concurrency, measures_color)
+    PROVIDERS[name] = provider
+    return provider
+
+
+register_provider(
+    "openai",
+    classify_with_openai,
+    version=f"{OPENAI_MODEL}:{hashlib.sha256(CLASSIFY_PROMPT.encode('utf-8')).hexdigest()[:12]}",
+    timeout=settings.openai_timeout,
+    concurrency=settings.openai_concurrency,
+)
+register_provider(
+    "local",
+    classify_locally,
+    version=LOCAL_CLASSIFIER_VERSION,
+    timeout=LOCAL_TIMEOUT,
+    concurrency=os.cpu_count() or 2,
+    measures_color=True,
+)
+
+
+def _resolve_chain(names: str) -> List[VisionProvider]:
+    chain = []
+    for name in (n.strip() for n in names.split(",")):
+        if not name:
+            continue
+        if name not in PROVIDERS:
+            print(f"⚠️ Unknown vision provider '{name}' in VISION_PROVIDERS (known: {', '.join(PROVIDERS)})")
+            continue
+        chain.append(PROVIDERS[name])
+    return chain or [PROVIDERS["local"]]
+
+
+PROVIDER_CHAIN = _resolve_chain(settings.vision_providers)
+PROVIDER = PROVIDER_CHAIN[0].name
+
+# identifies the primary provider (model + prompt) + image preprocessing + colour
+# analyzer behind a stored prediction (classification cache key); changes whenever
+# any of them does, so old results are simply not reused
+CLASSIFIER_VERSION = (
+    f"{PROVIDER}:{PROVIDER_CHAIN[0].version}:{prep_version()}:{COLOR_ANALYZER_VERSION}"
+)
+
+
+def _classify_with(chain: List[VisionProvider], image_path: str, content_hash: Optional[str]) -> Prediction:
+    errors = []
+    for provider in chain:
+        try:
+            pred = provider(image_path, content_hash)
+        except Exception as e:
+            print(f"⚠️ Vision provider {provider.name} failed: {e}")
+            errors.append(f"{provider.name}: {e}")
+            continue
+
+        if not provider.measures_color:
+            # colour is measured from the pixels; the model's hex/HSV are only a fallback
+            measured = analyze_item_color(image_path)
+            if measured:
+                pred.update({k: measured[k] for k in MEASURED_COLOR_FIELDS})
+        pred["provider"] = provider.name
+        return pred
+    raise RuntimeError("all vision providers failed: " + "; ".join(errors))
+
+
+def classify_image(image_path: str, content_hash: Optional[str] = None, fallback: bool = True) -> Prediction:
+    """
+    Classify with the first provider in PROVIDER_CHAIN that answers in time.
+    The prediction's "provider" key names the one that did. With
+    ``fallback=False`` only the primary provider is tried, so a caller that
+    retries it can call classify_fallback() once it gives up.
+    """
+    return _classify_with(PROVIDER_CHAIN if fallback else PROVIDER_CHAIN[:1], image_path, content_hash)
+
+
+def classify_fallback(image_path: str, content_hash: Optional[str] = None) -> Prediction:
+    """Classify with the providers after the primary one (raises if there are none)."""
+    return _classify_with(PROVIDER_CHAIN[1:], image_path, content_hash)
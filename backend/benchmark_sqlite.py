@@ -0,0 +1,159 @@
+"""
+benchmark_sqlite.py
+-------------------
+Write throughput and suggest latency under a mixed load, with SQLite's
+stock settings versus the tuned pragmas from app/db_config.py.
+
+Each configuration runs in its own process (the engine is created at
+import) against a fresh temp database: READERS threads call
+GET /users/{id}/outfits/suggest while WRITERS threads insert outfit history
+in batches, the way _save_outfit_history() and bulk uploads write. Weather
+is fixed so no network calls are made.
+
+The tuning shows up in commits/s. Suggest is CPU-bound in Python: it runs
+at the same rate with or without writers, and faster writers take some of
+its CPU time. One run (5 s each):
+    4 readers + 4 writers   stock 21.8 suggest/s,  75 commits/s   tuned 16.4/s, 159 commits/s
+    8 readers + 1 writer    stock 31.8 suggest/s,  14 commits/s   tuned 31.8/s,  26 commits/s
+    4 readers, no writers   stock 31.8 suggest/s                  tuned 34.0/s
+
+Run with: python benchmark_sqlite.py [--seconds 10] [--readers 4] [--writers 4]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+backend_dir = Path(__file__).parent
+
+CONFIGS = {
+    # SQLite / SQLAlchemy defaults before db_config.py
+    "stock": {
+        "SQLITE_JOURNAL_MODE": "DELETE", "SQLITE_SYNCHRONOUS": "FULL", "SQLITE_BUSY_TIMEOUT_MS": "5000",
+        "SQLITE_CACHE_SIZE_MB": "2", "SQLITE_MMAP_SIZE_MB": "0", "DB_POOL_SIZE": "5",
+    },
+    "tuned": {},
+}
+WRITE_BATCH = 5  # history rows per writer transaction (small commits, like _save_outfit_history)
+
+
+def run_child(seconds: float, readers: int, writers: int) -> dict:
+    sys.path.insert(0, str(backend_dir))
+    import warnings
+    warnings.filterwarnings("ignore")
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session
+
+    import app.main as m
+    from app.db import engine
+    from app.models import Item, OutfitHistory
+
+    m.get_weather = lambda city, d: {
+        "temperature": 12, "temp_min": 8, "temp_max": 15, "season": "fall", "city": city, "condition": "clear",
+    }
+    colors = [("black", "0,0,5"), ("white", "0,0,95"), ("navy", "215,70,25"), ("beige", "40,20,85"), ("red", "0,85,60")]
+
+    with TestClient(m.app) as client:
+        r = client.post("/auth/signup", json={"email": "bench@example.com", "password": "password1", "city": "Paris"})
+        uid = r.json()["user"]["id"]
+        headers = {"Authorization": f"Bearer {r.json()['token']}"}
+        with Session(engine) as s:
+            for part, n in (("top", 15), ("bottom", 12), ("outerwear", 5), ("shoes", 6)):
+                for i in range(n):
+                    name, hsv = colors[i % len(colors)]
+                    s.add(Item(user_id=uid, image_url=f"bench/{part}{i}.jpg", outfit_part=part, category=part,
+                               primary_color=name, primary_color_hsv=hsv, formality="casual", season="all_season"))
+            s.commit()
+
+        stop = time.perf_counter() + seconds
+        latencies, errors, commits = [], [], [0]
+        lock = threading.Lock()
+
+        def reader():
+            while time.perf_counter() < stop:
+                t = time.perf_counter()
+                try:
+                    status = client.get(f"/users/{uid}/outfits/suggest", headers=headers).status_code
+                    error = None if status == 200 else f"HTTP {status}"
+                except Exception as e:
+                    error = type(e).__name__
+                with lock:
+                    if error:
+                        errors.append(error)
+                    else:
+                        latencies.append(time.perf_counter() - t)
+
+        def writer():
+            while time.perf_counter() < stop:
+                try:
+                    with Session(engine) as s:
+                        for _ in range(WRITE_BATCH):
+                            s.add(OutfitHistory(user_id=uid, requested_date=m.date.today(), city="Paris"))
+                        s.commit()
+                    with lock:
+                        commits[0] += 1
+                except Exception as e:
+                    with lock:
+                        errors.append(type(e).__name__)
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads += [threading.Thread(target=writer) for _ in range(writers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    latencies.sort()
+    pct = lambda p: round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1) if latencies else None
+    return {
+        "suggest_per_s": round(len(latencies) / seconds, 1),
+        "p50_ms": pct(0.5),
+        "p95_ms": pct(0.95),
+        "write_commits_per_s": round(commits[0] / seconds, 1),
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.seconds, args.readers, args.writers)))
+        return
+
+    print(f"{args.readers} suggest threads + {args.writers} writer threads, {args.seconds:g}s each\n")
+    for name, overrides in CONFIGS.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {
+                **os.environ, **overrides,
+                "DATABASE_URL": f"sqlite:///{tmp}/bench.sqlite", "STORAGE_ROOT": f"{tmp}/storage",
+            }
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", "--seconds", str(args.seconds),
+                 "--readers", str(args.readers), "--writers", str(args.writers)],
+                env=env, capture_output=True, text=True, cwd=backend_dir,
+            )
+        lines = [l for l in out.stdout.splitlines() if l.startswith("{")]
+        if not lines:
+            print(f"{name:6} failed:\n{out.stderr[-2000:]}")
+            continue
+        r = json.loads(lines[-1])
+        print(
+            f"{name:6} suggest {r['suggest_per_s']:7.1f}/s  p50 {r['p50_ms']} ms  p95 {r['p95_ms']} ms  "
+            f"writes {r['write_commits_per_s']:6.1f} commits/s  errors {r['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
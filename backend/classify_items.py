@@ -0,0 +1,78 @@
+"""
+Classify wardrobe items in bulk (replaces update_missing_hsv.py).
+
+    python classify_items.py --user 3                 # every item of user 3
+    python classify_items.py --all --only-missing     # unclassified items of everyone
+    python classify_items.py --user 3 --colors-only   # local colour analysis only, no API calls
+
+Vision calls run in parallel (CLASSIFY_BATCH_CONCURRENCY), are rate limited
+(CLASSIFY_RATE_LIMIT per second) and go through the classification cache.
+"""
+import argparse
+
+from sqlmodel import Session, select
+
+from app import crud
+from app.db import engine
+from app.models import Item, User
+from app.services.batch_classify import classify_batch, select_items
+from app.services.color_analysis import analyze_item_color
+
+
+def backfill_colors(session: Session, items) -> int:
+    """Measure colours locally for ``items`` and commit once; returns how many were updated."""
+    measured = []
+    for item in items:
+        image_path = crud.STORAGE_ROOT / item.image_url
+        if not image_path.exists():
+            print(f"  ❌ Item {item.id}: image not found ({image_path})")
+            continue
+        colors = analyze_item_color(str(image_path))
+        if not colors:
+            print(f"  ⚠️  Item {item.id}: no color data")
+            continue
+        measured.append((item, colors))
+    crud.update_items_colors(session, measured)
+    return len(measured)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--user", type=int, help="user id to classify")
+    target.add_argument("--all", action="store_true", help="every user")
+    parser.add_argument("--only-missing", action="store_true", help="skip items that are already classified "
+                        "(with --colors-only: items without HSV)")
+    parser.add_argument("--refresh", action="store_true", help="ignore the classification cache")
+    parser.add_argument("--colors-only", action="store_true", help="local colour analysis only (no API calls)")
+    parser.add_argument("--concurrency", type=int, default=None, help="parallel vision calls")
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        user_ids = [args.user] if args.user else session.exec(select(User.id).order_by(User.id)).all()
+        for user_id in user_ids:
+            if args.colors_only:
+                stmt = select(Item).where(Item.user_id == user_id)
+                if args.only_missing:
+                    stmt = stmt.where(Item.primary_color_hsv == None)  # noqa: E711
+                items = session.exec(stmt.order_by(Item.id)).all()
+                print(f"User {user_id}: measuring colours of {len(items)} items")
+                print(f"  ✅ Updated {backfill_colors(session, items)} items")
+                continue
+
+            items = select_items(session, user_id, only_missing=args.only_missing)
+            print(f"User {user_id}: classifying {len(items)} items")
+            if not items:
+                continue
+            report = classify_batch(session, items, refresh=args.refresh, concurrency=args.concurrency)
+            for row in report["items"]:
+                if row["status"] == "failed":
+                    print(f"  ❌ Item {row['item_id']}: {row['error']}")
+            print(
+                f"  ✅ {report['done']} done ({report['cached']} from cache), {report['failed']} failed, "
+                f"{report['provider_calls']} vision calls in {report['elapsed_seconds']}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -10,7 +10,6 @@ Prints a row for each example, then overall MAE for both.
 """
 
 import csv
-import pickle
 from pathlib import Path
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -35,16 +34,10 @@ def formula_score(avg_hue_distance, avg_saturation, high_sat_count,
 #  LOAD MODEL (optional)
 # ─────────────────────────────────────────────────────────────────────────────
 
-MODEL_PATH = Path(__file__).parent / "color_model.pkl"
-model = None
-try:
-    with open(MODEL_PATH, "rb") as f:
-        model = pickle.load(f)
-    print(f"Loaded model from {MODEL_PATH}\n")
-except FileNotFoundError:
+from app.aimodel import trained_model as model, score_features_ml_batch
+
+if model is None:
     print("No model found — only formula scores will be shown.\n")
-except Exception as e:
-    print(f"Could not load model ({e}) — only formula scores will be shown.\n")
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -75,6 +68,21 @@ formula_errors = []
 model_errors   = []
 fm_errors      = []  # formula vs model
 
+# one batched model call for every row instead of predict() per example
+model_scores = None
+if model:
+    model_scores = score_features_ml_batch([
+        [
+            r["avg_hue_distance"],
+            r["max_hue_distance"],
+            r["avg_saturation"],
+            r["high_sat_count"],
+            r["neutral_count"],
+            r["has_contrast"],
+        ]
+        for r in rows
+    ])
+
 if model:
     header = f"{'#':>4}  {'Actual':>7}  {'Formula':>8}  {'F-Err':>7}  {'Model':>7}  {'M-Err':>7}"
 else:
@@ -95,18 +103,7 @@ for i, r in enumerate(rows, 1):
     formula_errors.append(f_err)
 
     if model:
-        features = [
-            r["avg_hue_distance"],
-            r["max_hue_distance"],
-            r["avg_saturation"],
-            r["high_sat_count"],
-            r["neutral_count"],
-            r["has_contrast"],
-        ]
-        import warnings
-        with warnings.catch_warnings():
-            warnings.filterwarnings("ignore")
-            ms = round(float(model.predict([features])[0]), 1)
+        ms = round(float(model_scores[i - 1]), 1)
         ms = max(0.0, min(ms, 10.0))
         m_err = abs(ms - r["actual"])
         model_errors.append(m_err)
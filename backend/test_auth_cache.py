@@ -0,0 +1,77 @@
+"""
+Checks the auth principal cache: a repeat request resolves its user without
+a query, and changing the password revokes the tokens issued before it.
+Run with: python -m pytest test_auth_cache.py
+"""
+
+import sys
+from pathlib import Path
+
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine
+from starlette.requests import Request
+
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from app import crud
+from app.auth import create_access_token, get_current_user
+from app.models import User
+from app.services.principal_cache import clear_principal_cache
+
+
+def _setup():
+    clear_principal_cache()
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as s:
+        user = User(name="a", city="Paris", email="a@b.co", hashed_password="x")
+        s.add(user)
+        s.commit()
+        s.refresh(user)
+        return engine, user.id
+
+
+def _resolve(engine, token: str) -> Request:
+    request = Request({"type": "http", "headers": []})
+    with Session(engine) as s:
+        get_current_user(request, HTTPAuthorizationCredentials(scheme="Bearer", credentials=token), s)
+    return request
+
+
+def test_repeat_request_skips_the_user_query():
+    engine, user_id = _setup()
+    token = create_access_token(user_id)
+    _resolve(engine, token)
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    request = _resolve(engine, token)
+    assert statements == []
+    assert request.state.user.id == user_id and request.state.user.city == "Paris"
+
+
+def test_password_change_revokes_older_tokens():
+    engine, user_id = _setup()
+    old_token = create_access_token(user_id)
+    _resolve(engine, old_token)
+
+    with Session(engine) as s:
+        user = crud.change_password(s, crud.get_user(s, user_id), "y")
+    new_token = create_access_token(user_id, user.token_version)
+
+    try:
+        _resolve(engine, old_token)
+    except HTTPException as e:
+        assert e.status_code == 401
+    else:
+        raise AssertionError("token from before the password change was accepted")
+    assert _resolve(engine, new_token).state.user.token_version == 1
+
+
+if __name__ == "__main__":
+    test_repeat_request_skips_the_user_query()
+    test_password_change_revokes_older_tokens()
+    print("✅ principals are cached and revoked on password change")
@@ -0,0 +1,66 @@
+"""
+Checks batch classification retries: the primary vision provider is retried
+before the fallback providers get the item.
+Run with: python -m pytest test_batch_classify.py
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+from PIL import Image
+
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from app import vision
+from app.services import batch_classify
+
+
+def _run(primary_failures: int, max_retries: int = 2) -> dict:
+    primary = vision.PROVIDER_CHAIN[0]
+    calls = []
+
+    def flaky(image_path, content_hash):
+        calls.append(image_path)
+        if len(calls) <= primary_failures:
+            raise ConnectionError("rate limited")
+        return {"outfit_part": "top", "category": "shirt", "color": "navy", "formality": "casual"}
+
+    classify, chain = primary.classify, list(vision.PROVIDER_CHAIN)
+    classify_cached, backoff = batch_classify.classify_cached, batch_classify.RETRY_BACKOFF_SECONDS
+    primary.classify = flaky
+    vision.PROVIDER_CHAIN[1:] = [vision.PROVIDERS["local"]]
+    # the result cache isn't under test here (and would write to the app's database)
+    batch_classify.classify_cached = lambda path, h, refresh, classify: classify(path, h)
+    batch_classify.RETRY_BACKOFF_SECONDS = 0
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            image = Path(tmp) / "shirt.png"
+            Image.new("RGB", (64, 64), "navy").save(image)
+            result = batch_classify._classify_one(
+                1, str(image), "ab" * 32, False, batch_classify.RateLimiter(0), max_retries,
+            )
+    finally:
+        primary.classify, vision.PROVIDER_CHAIN[:] = classify, chain
+        batch_classify.classify_cached, batch_classify.RETRY_BACKOFF_SECONDS = classify_cached, backoff
+    result["primary_calls"] = len(calls)
+    return result
+
+
+def test_primary_provider_is_retried_before_fallback():
+    result = _run(primary_failures=1)
+    assert result["prediction"]["provider"] == vision.PROVIDER
+    assert result["primary_calls"] == 2 and result["provider_calls"] == 2
+
+
+def test_fallback_after_retries_are_used_up():
+    result = _run(primary_failures=10, max_retries=2)
+    assert result["prediction"]["provider"] == "local"
+    assert result["primary_calls"] == 3 and result["provider_calls"] == 4
+
+
+if __name__ == "__main__":
+    test_primary_provider_is_retried_before_fallback()
+    test_fallback_after_retries_are_used_up()
+    print("✅ batch classification retries the primary provider first")
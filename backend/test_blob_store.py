@@ -0,0 +1,58 @@
+"""
+Checks that a shared image and its thumbnails stay until the last item
+using them is deleted.
+Run with: python -m pytest test_blob_store.py
+"""
+
+import hashlib
+import sys
+import tempfile
+from pathlib import Path
+
+from PIL import Image
+from sqlmodel import Session, SQLModel, create_engine
+
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from app import crud
+from app.models import User
+from app.services.thumbnails import make_thumbnails
+
+
+def test_deleting_last_item_removes_thumbnails():
+    storage_root = crud.STORAGE_ROOT
+    with tempfile.TemporaryDirectory() as tmp:
+        crud.STORAGE_ROOT = Path(tmp)
+        try:
+            engine = create_engine("sqlite://")
+            SQLModel.metadata.create_all(engine)
+            with Session(engine) as s:
+                user = User(name="a", city="Paris")
+                s.add(user)
+                s.commit()
+
+                image = Path(tmp) / "shirt.png"
+                Image.new("RGB", (600, 400), "navy").save(image)
+                content_hash = hashlib.sha256(image.read_bytes()).hexdigest()
+                items = []
+                for name in ("a.png", "b.png"):
+                    upload = Path(tmp) / f".upload-{name}"
+                    upload.write_bytes(image.read_bytes())
+                    items.append(crud.create_item_with_file(s, user.id, name, upload, content_hash))
+                blob = crud.STORAGE_ROOT / items[0].image_url
+                thumbs = make_thumbnails(str(blob), content_hash)
+                assert thumbs
+
+                crud.delete_item(s, items[0])
+                assert blob.exists() and all(t.exists() for t in thumbs)
+                crud.delete_item(s, items[1])
+                assert not blob.exists()
+                assert not any(t.exists() for t in thumbs)
+        finally:
+            crud.STORAGE_ROOT = storage_root
+
+
+if __name__ == "__main__":
+    test_deleting_last_item_removes_thumbnails()
+    print("✅ thumbnails are removed with their blob")
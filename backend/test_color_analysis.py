@@ -0,0 +1,105 @@
+"""
+Checks the local dominant-colour extractor on synthetic garment photos.
+Run with: python -m pytest test_color_analysis.py
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from app.services.color_analysis import analyze_item_color, rgb_to_lab, lab_to_rgb
+from app.services.local_classifier import classify_locally
+
+
+def _photo(path: Path, garment, background=(236, 234, 230), stripe=None, seed=0):
+    """An ellipse-shaped garment with top-to-bottom shading on a plain backdrop."""
+    rng = np.random.default_rng(seed)
+    h, w = 800, 600
+    a = np.empty((h, w, 3), np.float32)
+    a[:] = background
+    yy, xx = np.mgrid[0:h, 0:w]
+    mask = ((xx - w / 2) / (w * 0.3)) ** 2 + ((yy - h / 2) / (h * 0.35)) ** 2 < 1
+    shading = (0.85 + 0.3 * yy / h)[..., None]
+    a[mask] = (np.array(garment, np.float32) * shading)[mask]
+    if stripe is not None:
+        a[mask & ((yy // 40) % 3 == 0)] = stripe
+    a += rng.normal(0, 5, a.shape)
+    Image.fromarray(np.clip(a, 0, 255).astype(np.uint8)).save(path, quality=92)
+    return str(path)
+
+
+def _hsv(result):
+    return tuple(float(x) for x in result["color_hsv"].split(","))
+
+
+def test_lab_round_trip():
+    rgb = np.random.default_rng(0).integers(0, 256, (1000, 3))
+    assert np.abs(lab_to_rgb(rgb_to_lab(rgb)) - rgb).max() <= 1
+
+
+def test_primary_colour_ignores_background_and_shading():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        navy = analyze_item_color(_photo(tmp / "navy.jpg", (31, 42, 68)))
+        red = analyze_item_color(_photo(tmp / "red.jpg", (190, 30, 35), background=(40, 40, 40)))
+        beige = analyze_item_color(_photo(tmp / "beige.jpg", (210, 190, 160)))
+
+    assert navy["color"] == "navy" and navy["coverage"] > 0.8
+    h, s, v = _hsv(navy)
+    assert 210 <= h <= 235 and v < 35
+    assert red["color"] == "red"
+    assert _hsv(red)[1] > 70
+    assert beige["color"] == "beige"
+    assert navy["secondary_color"] == ""
+
+
+def test_secondary_colour_and_cutouts():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        striped = analyze_item_color(
+            _photo(tmp / "striped.jpg", (245, 245, 240), background=(60, 60, 60), stripe=(30, 40, 150))
+        )
+        cut = np.zeros((600, 400, 4), np.uint8)
+        cut[100:500, 50:350] = (200, 30, 30, 255)
+        cut[100:250, 50:350] = (240, 240, 240, 255)
+        Image.fromarray(cut).save(tmp / "cutout.png")
+        cutout = analyze_item_color(str(tmp / "cutout.png"))
+        (tmp / "broken.webp").write_bytes(b"not an image")
+        broken = analyze_item_color(str(tmp / "broken.webp"))
+
+    assert striped["color"] == "white"
+    assert striped["secondary_color"] in ("navy", "blue")
+    assert cutout["color"] == "red" and cutout["secondary_color"] == "white"
+    assert broken is None
+
+
+def test_local_classifier_guesses_part_from_silhouette():
+    with tempfile.TemporaryDirectory() as tmp:
+        preds = {}
+        for name, (y0, y1, x0, x1), color in [
+            ("shirt", (80, 320, 60, 340), (190, 30, 35)),
+            ("jeans", (20, 390, 130, 270), (60, 90, 140)),
+            ("shoe", (230, 320, 40, 360), (20, 20, 20)),
+        ]:
+            a = np.full((400, 400, 3), 235, np.uint8)
+            a[y0:y1, x0:x1] = color
+            Image.fromarray(a).save(Path(tmp) / f"{name}.png")
+            preds[name] = classify_locally(str(Path(tmp) / f"{name}.png"))
+
+    assert (preds["shirt"]["outfit_part"], preds["shirt"]["color"]) == ("top", "red")
+    assert (preds["jeans"]["outfit_part"], preds["jeans"]["category"]) == ("bottom", "jeans")
+    assert (preds["shoe"]["outfit_part"], preds["shoe"]["color"]) == ("shoes", "black")
+
+
+if __name__ == "__main__":
+    test_lab_round_trip()
+    test_primary_colour_ignores_background_and_shading()
+    test_secondary_colour_and_cutouts()
+    test_local_classifier_guesses_part_from_silhouette()
+    print("✅ colour analysis works")
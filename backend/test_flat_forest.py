@@ -0,0 +1,59 @@
+"""
+Checks the flattened NumPy forest against the sklearn model it came from.
+Run with: python -m pytest test_flat_forest.py
+"""
+
+import pickle
+import sys
+import tempfile
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from app.aimodel import FlatForest, MODEL_PATH
+
+
+def _load_sklearn_model():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        with open(MODEL_PATH, "rb") as f:
+            return pickle.load(f)
+
+
+def _random_features(n: int, seed: int):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.uniform(0, 180, n), rng.uniform(0, 180, n), rng.uniform(0, 100, n),
+        rng.integers(0, 5, n), rng.integers(0, 5, n), rng.integers(0, 2, n),
+    ])
+
+
+def test_flat_forest_matches_sklearn():
+    model = _load_sklearn_model()
+    flat = FlatForest.from_sklearn(model)
+    X = _random_features(5000, seed=0)
+    # put every split threshold on the boundary once
+    split = flat.left != -1
+    X[np.arange(split.sum()) % len(X), flat.feature[split]] = flat.threshold[split]
+    assert np.array_equal(flat.predict(X), model.predict(X))
+    assert np.array_equal(flat.predict(X[:1]), model.predict(X[:1]))
+
+
+def test_flat_forest_round_trips_through_npz():
+    flat = FlatForest.from_sklearn(_load_sklearn_model())
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "forest.npz"
+        flat.save(path)
+        loaded = FlatForest.load(path)
+    X = _random_features(500, seed=1)
+    assert np.array_equal(loaded.predict(X), flat.predict(X))
+
+
+if __name__ == "__main__":
+    test_flat_forest_matches_sklearn()
+    test_flat_forest_round_trips_through_npz()
+    print("✅ flat forest matches sklearn")
@@ -0,0 +1,155 @@
+"""
+Checks the versioned migration runner on a pre-runner database and on
+failing migrations (including the blob store step, which touches files).
+Run with: python -m pytest test_migrations.py
+"""
+
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+from sqlalchemy import event, text
+from sqlmodel import create_engine
+
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from app import crud, migrations
+from app.migrations import LATEST_VERSION, current_version, run_migrations
+
+LEGACY_SCHEMA = """
+CREATE TABLE user (id INTEGER PRIMARY KEY, name TEXT, city TEXT, style_preferences TEXT, created_at TIMESTAMP);
+CREATE TABLE item (id INTEGER PRIMARY KEY, user_id INTEGER, content_hash TEXT, image_url TEXT,
+  original_filename TEXT, outfit_part TEXT, category TEXT, primary_color TEXT, secondary_color TEXT,
+  formality TEXT, season TEXT, is_graphic BOOLEAN, notes TEXT, verified BOOLEAN, created_at TIMESTAMP);
+INSERT INTO user VALUES (1, 'a', 'Paris', NULL, '2024-01-01');
+INSERT INTO item (user_id, image_url, formality, verified, created_at)
+  VALUES (1, '1/a.jpg', 'formal', 0, '2024-01-01'), (1, '1/b.jpg', 'sporty', 0, '2024-01-01');
+"""
+
+
+def _legacy_db(tmp: str) -> str:
+    path = f"{tmp}/legacy.sqlite"
+    con = sqlite3.connect(path)
+    con.executescript(LEGACY_SCHEMA)
+    con.close()
+    return f"sqlite:///{path}"
+
+
+def test_upgrades_legacy_database_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(_legacy_db(tmp))
+        assert run_migrations(engine) == LATEST_VERSION
+        with engine.connect() as conn:
+            rows = conn.execute(text("SELECT formality, formality_rank FROM item ORDER BY id")).fetchall()
+        assert [tuple(r) for r in rows] == [("polished", 2), ("casual", 0)]
+
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        assert run_migrations(engine) == 0
+        assert statements == ["SELECT MAX(version) FROM schema_version"]
+        engine.dispose()
+
+
+def test_drops_colour_flag_columns_left_by_migration_6():
+    flags = ["color_is_neutral", "color_is_high_sat", "color_is_light", "color_is_dark"]
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(_legacy_db(tmp))
+        with engine.begin() as conn:
+            for name in flags:
+                conn.exec_driver_sql(f"ALTER TABLE item ADD COLUMN {name} BOOLEAN")
+        assert run_migrations(engine) == LATEST_VERSION
+        with engine.connect() as conn:
+            columns = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(item)")}
+        assert not columns & set(flags) and "color_hue" in columns
+        engine.dispose()
+
+
+def test_failed_migration_is_rolled_back():
+    def broken(conn):
+        conn.execute(text("UPDATE item SET notes = 'half done'"))
+        raise RuntimeError("boom")
+
+    original = migrations.MIGRATIONS
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(_legacy_db(tmp))
+        migrations.MIGRATIONS = original[:2] + [(3, "broken", broken)]
+        try:
+            run_migrations(engine)
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("the failing migration didn't raise")
+        finally:
+            migrations.MIGRATIONS = original
+        assert current_version(engine) == 2
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT COUNT(*) FROM item WHERE notes IS NOT NULL")).scalar() == 0
+        engine.dispose()
+
+
+def test_failed_migration_rolls_back_schema_changes():
+    def broken(conn):
+        migrations._add_missing_columns(conn, "item", {"half_done": "TEXT"})
+        raise RuntimeError("boom")
+
+    original = migrations.MIGRATIONS
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(_legacy_db(tmp))
+        migrations.MIGRATIONS = original[:2] + [(3, "broken ddl", broken)]
+        try:
+            run_migrations(engine)
+        except RuntimeError:
+            pass
+        finally:
+            migrations.MIGRATIONS = original
+        assert current_version(engine) == 2
+        with engine.connect() as conn:
+            columns = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(item)")}
+        assert "half_done" not in columns
+        engine.dispose()
+
+
+def test_failed_blob_migration_keeps_original_files():
+    def broken(conn):
+        migrations._blob_store(conn)
+        raise RuntimeError("boom")
+
+    original, storage_root = migrations.MIGRATIONS, crud.STORAGE_ROOT
+    with tempfile.TemporaryDirectory() as tmp:
+        crud.STORAGE_ROOT = Path(tmp) / "storage"
+        for name, data in (("a.jpg", b"same"), ("b.jpg", b"same")):
+            (crud.STORAGE_ROOT / "1").mkdir(parents=True, exist_ok=True)
+            (crud.STORAGE_ROOT / "1" / name).write_bytes(data)
+        engine = create_engine(_legacy_db(tmp))
+        migrations.MIGRATIONS = original[:7] + [(8, "broken blob store", broken)]
+        try:
+            try:
+                run_migrations(engine)
+            except RuntimeError:
+                pass
+            with engine.connect() as conn:
+                urls = [r[0] for r in conn.execute(text("SELECT image_url FROM item ORDER BY id"))]
+            assert urls == ["1/a.jpg", "1/b.jpg"]
+            assert all((crud.STORAGE_ROOT / url).exists() for url in urls)
+
+            migrations.MIGRATIONS = original
+            run_migrations(engine)
+            with engine.connect() as conn:
+                urls = {r[0] for r in conn.execute(text("SELECT image_url FROM item"))}
+            assert len(urls) == 1 and (crud.STORAGE_ROOT / urls.pop()).read_bytes() == b"same"
+            assert not (crud.STORAGE_ROOT / "1" / "a.jpg").exists()
+            assert not (crud.STORAGE_ROOT / "1" / "b.jpg").exists()
+        finally:
+            migrations.MIGRATIONS, crud.STORAGE_ROOT = original, storage_root
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    test_upgrades_legacy_database_once()
+    test_drops_colour_flag_columns_left_by_migration_6()
+    test_failed_migration_is_rolled_back()
+    test_failed_migration_rolls_back_schema_changes()
+    test_failed_blob_migration_keeps_original_files()
+    print("✅ migrations apply once and roll back on failure")
@@ -2,7 +2,7 @@
 Test the trained color harmony model with various outfit combinations.
 """
 
-from app.aimodel import score_outfit_ml
+from app.aimodel import parse_hsv_rows, score_outfits_ml_batch
 
 
 def test_model():
@@ -334,10 +334,13 @@ def test_model():
         },
     ]
     
-    # Run tests
+    # Run tests — score every outfit with one batched model call
+    hsv_matrix, missing = parse_hsv_rows([outfit["hsvs"] for outfit in test_outfits])
+    scores = score_outfits_ml_batch(hsv_matrix, missing)
+
     results = []
-    for i, outfit in enumerate(test_outfits, 1):
-        score = score_outfit_ml(outfit["colors"], outfit["hsvs"])
+    for i, (outfit, score) in enumerate(zip(test_outfits, scores), 1):
+        score = float(score)
         results.append({
             "outfit": outfit,
             "score": score
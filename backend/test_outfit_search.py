@@ -0,0 +1,111 @@
+"""
+Checks the vectorized outfit search against a brute-force loop over
+_score_outfit().
+Run with: python -m pytest test_outfit_search.py
+"""
+
+import itertools
+import random
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from app.main import _score_outfit, _compatible
+from app.services.outfit_search import OutfitSearch, outfit_color_fingerprint
+
+COLORS = [
+    ("black", "0,0,5"), ("white", "0,0,95"), ("navy", "215,70,25"), ("red", "0,85,60"),
+    ("beige", "40,20,85"), ("green", "120,60,45"), ("gray", "0,0,50"), ("pink", "340,40,90"),
+]
+FORMALITIES = [None, "casual", "smart_casual", "polished"]
+SEASONS = [None, "all_season", "summer", "fall_winter", "spring_summer", "winter"]
+
+
+def _make_items(part: str, n: int, rng: random.Random, start_id: int):
+    items = []
+    for i in range(n):
+        color, hsv = rng.choice(COLORS)
+        items.append(SimpleNamespace(
+            id=start_id + i,
+            outfit_part=part,
+            category=part,
+            primary_color=color,
+            primary_color_hsv=hsv if rng.random() > 0.15 else None,
+            secondary_color=rng.choice([None, None, "white", "black"]),
+            formality=rng.choice(FORMALITIES),
+            season=rng.choice(SEASONS),
+        ))
+    return items
+
+
+def _brute_force(tops, bottoms, outers, shoes, formality, avoid):
+    scored = []
+    for combo in itertools.product(tops, bottoms, outers, shoes):
+        if not _compatible(*combo):
+            continue
+        score = _score_outfit(*combo, None, formality, verbose=False)
+        outfit = dict(zip(("top", "bottom", "outer", "shoes"), combo))
+        if outfit_color_fingerprint(outfit) in avoid:
+            score -= 10.0
+        scored.append(score)
+    return sorted(scored, reverse=True)
+
+
+def test_top_k_matches_brute_force():
+    rng = random.Random(7)
+    for trial in range(6):
+        tops = _make_items("top", rng.randint(1, 9), rng, 0)
+        bottoms = _make_items("bottom", rng.randint(1, 7), rng, 100)
+        outers = _make_items("outerwear", rng.randint(0, 4), rng, 200) + [None]
+        shoes = _make_items("shoes", rng.randint(1, 5), rng, 300)
+        formality = rng.choice([None, "casual", "polished"])
+        avoid = {"black,navy,white", "black,white"}
+
+        expected = _brute_force(tops, bottoms, outers, shoes, formality, avoid)
+        search = OutfitSearch(tops, bottoms, outers, shoes, formality=formality, avoid_fps=avoid)
+        got = search.top_k(k=10)
+
+        assert search.evaluated == len(expected)
+        assert len(got) == min(10, len(expected))
+        for entry, want in zip(got, expected):
+            # numpy and Python round ties differently in the last decimal
+            assert abs(entry["score"] - want) <= 0.1 + 1e-9, (trial, entry["score"], want)
+        assert [e["score"] for e in got] == sorted((e["score"] for e in got), reverse=True)
+
+
+def test_branch_and_bound_matches_exhaustive():
+    rng = random.Random(11)
+    for trial in range(6):
+        tops = _make_items("top", rng.randint(5, 25), rng, 0)
+        bottoms = _make_items("bottom", rng.randint(5, 25), rng, 100)
+        outers = _make_items("outerwear", rng.randint(0, 6), rng, 200) + [None]
+        shoes = _make_items("shoes", rng.randint(1, 6), rng, 300)
+        kwargs = dict(
+            formality=rng.choice([None, "smart_casual"]),
+            season=rng.choice([None, "winter"]),
+            avoid_fps={"black,white", "black,gray,navy"},
+        )
+        full = OutfitSearch(tops, bottoms, outers, shoes, **kwargs).top_k(k=8)
+        bnb_search = OutfitSearch(tops, bottoms, outers, shoes, **kwargs)
+        bnb = bnb_search.top_k_bnb(k=8)
+        assert [e["score"] for e in bnb] == [e["score"] for e in full], trial
+
+
+def test_season_mask_filters_pools():
+    rng = random.Random(3)
+    tops = _make_items("top", 6, rng, 0)
+    bottoms = _make_items("bottom", 6, rng, 100)
+    search = OutfitSearch(tops, bottoms, [None], [None], season="summer")
+    for entry in search.top_k(k=100):
+        for piece in (entry["outfit"]["top"], entry["outfit"]["bottom"]):
+            assert piece.season in (None, "all_season", "summer", "spring_summer")
+
+
+if __name__ == "__main__":
+    test_top_k_matches_brute_force()
+    test_branch_and_bound_matches_exhaustive()
+    test_season_mask_filters_pools()
+    print("✅ outfit search matches brute force")
@@ -0,0 +1,132 @@
+"""
+Checks the Postgres backend: migrations (legacy upgrade and workers
+starting together) and the like/dislike and blob refcount upserts.
+
+Runs against TEST_DATABASE_URL, e.g. a local container:
+    docker run -d -p 5432:5432 -e POSTGRES_PASSWORD=pw postgres:16
+    TEST_DATABASE_URL=postgresql://postgres:pw@localhost/postgres python -m pytest test_postgres.py
+The database is wiped, so point it at a throwaway one. Without
+TEST_DATABASE_URL an embedded server is started if pgserver is installed
+(pip install pgserver); otherwise the tests are skipped.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event, text
+from sqlmodel import Session, create_engine
+
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from app import crud
+from app.db_config import normalize_url
+from app.migrations import LATEST_VERSION, current_version, run_migrations
+from app.models import Blob, DislikedOutfit, LikedOutfit, User
+from app.services.blob_store import release_blob, store_blob
+
+LEGACY_SCHEMA = """
+CREATE TABLE "user" (id SERIAL PRIMARY KEY, name TEXT, city TEXT, style_preferences TEXT, created_at TIMESTAMP);
+CREATE TABLE item (id SERIAL PRIMARY KEY, user_id INTEGER, content_hash TEXT, image_url TEXT,
+  original_filename TEXT, outfit_part TEXT, category TEXT, primary_color TEXT, secondary_color TEXT,
+  formality TEXT, season TEXT, is_graphic BOOLEAN, notes TEXT, verified BOOLEAN, created_at TIMESTAMP);
+INSERT INTO "user" (name, city, created_at) VALUES ('a', 'Paris', '2024-01-01');
+INSERT INTO item (user_id, image_url, formality, verified, created_at)
+  VALUES (1, '1/a.jpg', 'formal', FALSE, '2024-01-01'), (1, '1/b.jpg', 'sporty', FALSE, '2024-01-01');
+"""
+
+_embedded = None
+
+
+def _database_url() -> str:
+    global _embedded
+    url = os.getenv("TEST_DATABASE_URL")
+    if url:
+        return normalize_url(url)
+    if _embedded is None:
+        try:
+            import pgserver
+        except ImportError:
+            pytest.skip("set TEST_DATABASE_URL or pip install pgserver")
+        _embedded = pgserver.get_server(tempfile.mkdtemp(), cleanup_mode="stop")
+    return normalize_url(_embedded.get_uri())
+
+
+def _empty_engine(legacy: bool = False):
+    engine = create_engine(_database_url())
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+        if legacy:
+            conn.exec_driver_sql(LEGACY_SCHEMA)
+    return engine
+
+
+def test_migrations_upgrade_legacy_database():
+    engine = _empty_engine(legacy=True)
+    assert run_migrations(engine) == LATEST_VERSION
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT formality, formality_rank FROM item ORDER BY id")).fetchall()
+    assert [tuple(r) for r in rows] == [("polished", 2), ("casual", 0)]
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    assert run_migrations(engine) == 0
+    assert statements == ["SELECT MAX(version) FROM schema_version"]
+    engine.dispose()
+
+
+def test_workers_starting_together_migrate_once():
+    engine = _empty_engine(legacy=True)
+    applied, errors = [], []
+
+    def worker():
+        try:
+            applied.append(run_migrations(engine))
+        except Exception as e:  # surfaced by the asserts below
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors, errors
+    assert sorted(applied) == [0, 0, 0, LATEST_VERSION]
+    assert current_version(engine) == LATEST_VERSION
+    engine.dispose()
+
+
+def test_combo_and_blob_upserts():
+    engine = _empty_engine()
+    run_migrations(engine)
+    with Session(engine) as s, tempfile.TemporaryDirectory() as root:
+        user = User(name="a", city="Paris")
+        s.add(user)
+        s.commit()
+        for model in (LikedOutfit, DislikedOutfit):
+            assert crud.add_combo(s, model, user.id, "black,white") is not None
+            assert crud.add_combo(s, model, user.id, "black,white") is None
+
+        for name in ("a.jpg", "b.jpg"):
+            tmp = Path(root) / name
+            tmp.write_bytes(b"same bytes")
+            store_blob(s, Path(root), tmp, "ab" * 32, name)
+            s.commit()
+        assert s.get(Blob, "ab" * 32, populate_existing=True).refcount == 2
+        assert release_blob(s, Path(root), "ab" * 32) is None
+        assert release_blob(s, Path(root), "ab" * 32) is not None
+        s.commit()
+        assert s.get(Blob, "ab" * 32) is None
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    test_migrations_upgrade_legacy_database()
+    test_workers_starting_together_migrate_once()
+    test_combo_and_blob_upserts()
+    print("✅ migrations and upserts work on Postgres")
@@ -0,0 +1,101 @@
+"""
+Checks that the per-user hot queries use the HOT_INDEXES in app/models.py:
+every table access in their EXPLAIN QUERY PLAN must be an index SEARCH,
+never a full SCAN.
+Run with: python -m pytest test_query_plans.py
+"""
+
+import sys
+from pathlib import Path
+
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from app import crud
+from app.models import DislikedOutfit, Item, LikedOutfit, OutfitHistory, User
+from app.services.batch_classify import select_items
+from app.services.wardrobe_cache import _load_snapshot
+
+
+def _engine_with_data():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as s:
+        # enough users that ANALYZE statistics make the per-user indexes worthwhile
+        for uid in range(1, 41):
+            s.add(User(id=uid, name=f"u{uid}", city="Paris"))
+            for i in range(25):
+                s.add(Item(user_id=uid, image_url=f"{uid}/{i}.jpg", content_hash=f"{uid}-{i}"))
+                s.add(OutfitHistory(user_id=uid))
+            for fp in ("black,white", "navy,white", "beige,black"):
+                s.add(LikedOutfit(user_id=uid, color_fingerprint=fp))
+            for fp in ("red,green", "orange,pink"):
+                s.add(DislikedOutfit(user_id=uid, color_fingerprint=fp))
+        s.commit()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    return engine
+
+
+def _full_scans(engine, run) -> list:
+    """Run ``run(session)`` and return the plan lines of its SELECTs that don't use an index."""
+    statements = []
+
+    def capture(conn, cursor, sql, params, context, executemany):
+        if sql.lstrip().upper().startswith("SELECT"):
+            statements.append((sql, params))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        with Session(engine) as session:
+            run(session)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    assert statements, "nothing was queried"
+
+    bad = []
+    with engine.connect() as conn:
+        for sql, params in statements:
+            for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params).fetchall():
+                detail = row[-1]
+                if detail.startswith("SCAN"):
+                    bad.append(f"{detail}  ←  {' '.join(sql.split())}")
+    return bad
+
+
+def test_hot_queries_use_indexes():
+    engine = _engine_with_data()
+    queries = {
+        "wardrobe snapshot": lambda s: _load_snapshot(s, 1),
+        "list items": lambda s: crud.list_items_for_user(s, 1),
+        "duplicate check": lambda s: crud.find_item_by_hash(s, 1, "1-7"),
+        "bulk duplicate check": lambda s: crud.find_items_by_hashes(s, 1, {"1-7", "1-8", "x"}),
+        "classify-batch selection": lambda s: select_items(s, 1, None, False),
+        "liked lookup": lambda s: s.exec(select(LikedOutfit).where(
+            LikedOutfit.user_id == 1, LikedOutfit.color_fingerprint == "black,white")).first(),
+        "disliked lookup": lambda s: s.exec(select(DislikedOutfit).where(
+            DislikedOutfit.user_id == 1, DislikedOutfit.color_fingerprint == "red,green")).first(),
+    }
+    failures = {name: _full_scans(engine, run) for name, run in queries.items()}
+    assert not any(failures.values()), {k: v for k, v in failures.items() if v}
+
+
+def test_fingerprints_are_unique_per_user():
+    engine = _engine_with_data()
+    with Session(engine) as s:
+        s.add(LikedOutfit(user_id=1, color_fingerprint="black,white"))
+        try:
+            s.commit()
+        except Exception as e:
+            assert "UNIQUE" in str(e)
+        else:
+            raise AssertionError("duplicate like was stored")
+
+
+if __name__ == "__main__":
+    test_hot_queries_use_indexes()
+    test_fingerprints_are_unique_per_user()
+    print("✅ hot queries use their indexes")
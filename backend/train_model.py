@@ -4,8 +4,12 @@ Train the color harmony ML model from collected training data.
 Steps:
 1. Collect training data using save_training_data() in aimodel.py
 2. Run this script: python train_model.py
-3. Model will be saved as color_model.pkl
+3. Model will be saved as color_model.pkl, plus a flattened
+   color_model.npz that the server loads without sklearn
 4. score_outfit_ml() will automatically use it
+
+To re-export color_model.npz from an existing color_model.pkl:
+    python train_model.py --export
 """
 
 import pandas as pd
@@ -13,10 +17,15 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
 import pickle
+import sys
 from pathlib import Path
 from datetime import datetime
 import shutil
 
+import numpy as np
+
+from app.aimodel import FlatForest
+
 
 def train_model():
     """Train the color harmony model from CSV data."""
@@ -101,6 +110,7 @@ def train_model():
         pickle.dump(model, f)
     
     print(f"\n✅ Model saved to {model_file}")
+    export_forest(model, X_test.to_numpy(), backup_dir=backup_dir, timestamp=timestamp)
     print(f"   score_outfit_ml() will now use this trained model!")
     print(f"\n📂 Backups saved in: {backup_dir}")
     print(f"   - training_data_{timestamp}.csv")
@@ -108,5 +118,40 @@ def train_model():
         print(f"   - color_model_{timestamp}.pkl")
 
 
+def export_forest(model=None, X_check=None, backup_dir=None, timestamp=None):
+    """
+    Flatten the forest into color_model.npz for the NumPy predictor.
+
+    With no model, the existing color_model.pkl is loaded. The flat
+    predictor is checked against sklearn before anything is written.
+    """
+    base = Path(__file__).parent
+    if model is None:
+        with open(base / "color_model.pkl", 'rb') as f:
+            model = pickle.load(f)
+    if X_check is None:
+        rng = np.random.default_rng(0)
+        X_check = np.column_stack([
+            rng.uniform(0, 180, 2000), rng.uniform(0, 180, 2000), rng.uniform(0, 100, 2000),
+            rng.integers(0, 5, 2000), rng.integers(0, 5, 2000), rng.integers(0, 2, 2000),
+        ])
+
+    flat = FlatForest.from_sklearn(model)
+    expected = model.predict(np.asarray(X_check, dtype=float))
+    got = flat.predict(X_check)
+    if not np.allclose(got, expected, rtol=0, atol=1e-9):
+        print(f"❌ Flat forest disagrees with sklearn (max diff {np.abs(got - expected).max():.2e}); not exported")
+        return
+
+    forest_file = base / "color_model.npz"
+    if forest_file.exists() and backup_dir is not None:
+        shutil.copy2(forest_file, backup_dir / f"color_model_{timestamp}.npz")
+    flat.save(forest_file)
+    print(f"✅ Flat forest saved to {forest_file} ({len(flat.value)} nodes, {flat.n_trees} trees)")
+
+
 if __name__ == "__main__":
-    train_model()
+    if "--export" in sys.argv:
+        export_forest()
+    else:
+        train_model()
@@ -147,3 +147,12 @@ export function imageSrc(it) {
 
   return `${API.defaults.baseURL}/storage/${raw}`;
 }
+
+// WEBP thumbnails ("/thumbs/<hash>/<width>.webp") as an <img srcSet>, so grids
+// and outfit cards download a few KB instead of the original photo.
+export function imageSrcSet(it) {
+  const thumbs = it?.thumbnails || {};
+  const widths = Object.keys(thumbs);
+  if (!widths.length) return undefined;
+  return widths.map((w) => `${API.defaults.baseURL}${thumbs[w]} ${w}w`).join(", ");
+}
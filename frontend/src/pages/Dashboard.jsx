@@ -6,6 +6,7 @@ import {
   patchItem,
   classifyItem,
   imageSrc,
+  imageSrcSet,
 } from "../api";
 import { useNavigate } from "react-router-dom";
 
@@ -131,6 +132,8 @@ export default function Dashboard() {
                   {imageSrc(it) ? (
                     <img
                       src={imageSrc(it)}
+                      srcSet={imageSrcSet(it)}
+                      sizes="(min-width: 1024px) 25vw, 50vw"
                       alt={it.name || it.original_filename || "Item"}
                       className="w-full h-full object-cover"
                     />
@@ -1,6 +1,6 @@
 import { useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom";
-import { API, listUserItems, suggestOutfit, likeCombo, unlikeCombo, dislikeCombo, undislikeCombo, listDislikedCombos } from "../api";
+import { API, imageSrcSet, listUserItems, suggestOutfit, likeCombo, unlikeCombo, dislikeCombo, undislikeCombo, listDislikedCombos } from "../api";
 
 function imageSrc(item) {
   const url = item?.image_url || "";
@@ -330,6 +330,8 @@ export default function GenerateOutfit() {
                     <img
                       className="mt-1 w-full h-20 object-cover rounded-xl"
                       src={imageSrc(item)}
+                      srcSet={imageSrcSet(item)}
+                      sizes="160px"
                       alt={item.category || item.outfit_part || "item"}
                       loading="lazy"
                     />
@@ -554,6 +556,8 @@ export default function GenerateOutfit() {
                                 <img
                                   className="w-full h-48 object-cover rounded-2xl shadow-md"
                                   src={imageSrc(it)}
+                                  srcSet={imageSrcSet(it)}
+                                  sizes="320px"
                                   alt={it.category || it.outfit_part || part}
                                   loading="lazy"
                                 />
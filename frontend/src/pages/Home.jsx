@@ -1,7 +1,7 @@
 import { useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import Container from "../components/Container";
-import { API, listUserItems, imageSrc } from "../api";
+import { API, listUserItems, imageSrc, imageSrcSet } from "../api";
 
 // ── Content card — subtle fill + hover ────────────────────────────────────
 function Card({ className = "", children }) {
@@ -186,6 +186,8 @@ function WardrobePreview({ items }) {
             >
               <img
                 src={imageSrc(item)}
+                srcSet={imageSrcSet(item)}
+                sizes="160px"
                 alt={item.category || item.outfit_part || "item"}
                 className="h-full w-full object-cover transition-transform duration-300 hover:scale-105"
                 loading="lazy"
@@ -1,6 +1,6 @@
 import { useEffect, useState, useCallback } from "react";
 import { useNavigate } from "react-router-dom";
-import { API, listUserItems, scoreOutfit } from "../api";
+import { API, imageSrcSet, listUserItems, scoreOutfit } from "../api";
 
 function imageSrc(item) {
   const url = item?.image_url || "";
@@ -248,6 +248,8 @@ export default function StyleLab() {
                         {item.image_url ? (
                           <img
                             src={imageSrc(item)}
+                            srcSet={imageSrcSet(item)}
+                            sizes="320px"
                             alt={item.category || label}
                             className="w-full h-36 object-cover rounded-xl"
                             loading="lazy"
@@ -306,6 +308,8 @@ export default function StyleLab() {
                               {it.image_url ? (
                                 <img
                                   src={imageSrc(it)}
+                                  srcSet={imageSrcSet(it)}
+                                  sizes="160px"
                                   alt={it.category}
                                   className="w-full h-20 object-cover rounded-lg"
                                   loading="lazy"